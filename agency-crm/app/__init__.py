@@ -3,8 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from config import Config
+from app import db_routing
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': db_routing.RoutingSession})
 migrate = Migrate()
 login_manager = LoginManager()
 
@@ -14,7 +15,13 @@ def create_app(config_class=Config):
     config_class.init_app(app)
     
     db.init_app(app)
-    migrate.init_app(app, db)
+    from app import sqlite_tuning, sql_stats, metrics
+    sqlite_tuning.init_app(app)
+    sql_stats.init_app(app)
+    metrics.init_app(app)
+    db_routing.init_app(app)
+    # Batch mode lets migrations alter columns on SQLite, which has little ALTER TABLE support
+    migrate.init_app(app, db, render_as_batch=True, compare_type=True)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
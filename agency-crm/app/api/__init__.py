@@ -1,5 +1,6 @@
 from flask import Blueprint
+from app.db_routing import read_only_blueprint
 
-api_bp = Blueprint('api', __name__)
+api_bp = read_only_blueprint(Blueprint('api', __name__))
 
 from . import routes, management
\ No newline at end of file
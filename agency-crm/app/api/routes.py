@@ -2,8 +2,9 @@ from flask import jsonify, request, current_app
 from app.api import api_bp
 from app.models import Company, Brand, ClientContact, Invoice, StatusUpdate, PlanningInfo, db
 from app.api_auth import require_api_key
+from app.search import search_documents, snippet_text
 from datetime import datetime
-import requests
+from sqlalchemy.dialects.postgresql import JSONB
 import json
 
 @api_bp.route('/companies', methods=['GET'])
@@ -159,40 +160,75 @@ def get_planning_info():
         'created_at': p.created_at.isoformat() if p.created_at else None
     } for p in planning])
 
+@api_bp.route('/documents/search', methods=['GET'])
+@require_api_key
+def search_documents_api():
+    """Search the text of agreements and attachments"""
+    hits = search_documents(
+        request.args.get('q', ''),
+        brand_id=request.args.get('brand_id', type=int),
+        company_id=request.args.get('company_id', type=int),
+        limit=min(request.args.get('limit', 50, type=int), 200)
+    )
+    return jsonify([{
+        'sha256': hit.sha256,
+        'snippet': snippet_text(hit.snippet),
+        'files': [{
+            'kind': f.kind.lower(),
+            'filename': f.filename,
+            'company_id': f.company.id if f.company else None,
+            'company_name': f.company.name if f.company else None,
+            'brand_id': f.brand.id if f.brand else None,
+            'brand_name': f.brand.name if f.brand else None
+        } for f in hit.files]
+    } for hit in hits])
+
 # Webhook trigger function
 def trigger_webhooks(event, data):
     """Trigger webhooks for a specific event"""
     from app.models import Webhook, WebhookLog
+    from app.metrics import WEBHOOK_DELIVERIES, WEBHOOK_SECONDS
     import hashlib
+    import time
+    # Imported here: requests (with urllib3 and certifi) only serves this function, and takes
+    # longer to import than the rest of the API
+    import requests
     
     print(f"🔍 TRIGGER WEBHOOKS: Event '{event}' triggered")
     
-    # Get all active webhooks and filter in Python since JSON array queries are complex
-    active_webhooks = Webhook.query.filter(Webhook.is_active == True).all()
-    webhooks = []
-    for webhook in active_webhooks:
-        if event in webhook.events:
-            webhooks.append(webhook)
+    active_webhooks = Webhook.query.filter(Webhook.is_active == True)
+    if db.engine.dialect.name == 'postgresql':
+        # JSONB containment, served by the GIN index on events
+        webhooks = active_webhooks.filter(db.type_coerce(Webhook.events, JSONB).contains([event])).all()
+    else:
+        # Elsewhere JSON arrays cannot be searched, so filter in Python
+        webhooks = [webhook for webhook in active_webhooks if event in webhook.events]
     
     print(f"📋 Found {len(webhooks)} active webhooks for event '{event}'")
     
     for webhook in webhooks:
         print(f"📡 Calling webhook: {webhook.url}")
+        response = None
         try:
             payload = json.dumps(data)
             signature = hashlib.sha256(
                 f"{webhook.secret}{payload}".encode()
             ).hexdigest()
             
-            response = requests.post(
-                webhook.url,
-                json=data,
-                headers={
-                    'X-Webhook-Event': event,
-                    'X-Webhook-Signature': signature
-                },
-                timeout=10
-            )
+            started = time.perf_counter()
+            try:
+                response = requests.post(
+                    webhook.url,
+                    json=data,
+                    headers={
+                        'X-Webhook-Event': event,
+                        'X-Webhook-Signature': signature
+                    },
+                    timeout=10
+                )
+            finally:
+                WEBHOOK_SECONDS.labels(event).observe(time.perf_counter() - started)
+            WEBHOOK_DELIVERIES.labels(event, 'ok' if 200 <= response.status_code < 300 else 'http_error').inc()
             
             print(f"✅ Webhook response: {response.status_code} - {response.text[:200]}")
             
@@ -211,6 +247,8 @@ def trigger_webhooks(event, data):
             
         except Exception as e:
             current_app.logger.error(f"Webhook error: {str(e)}")
+            if response is None:
+                WEBHOOK_DELIVERIES.labels(event, 'error').inc()
             # Log failed webhook
             log = WebhookLog(
                 webhook_id=webhook.id,
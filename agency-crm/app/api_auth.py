@@ -25,31 +25,37 @@ def require_api_key(f):
         elif 'api_key' in request.args:
             api_key = request.args.get('api_key')
         
-        if not api_key:
-            return jsonify({'error': 'No API key provided'}), 401
-        
         # Import here to avoid circular imports
         from app.models import APIKey
+        from app import db
+        from app.db_routing import primary
+        from app.metrics import API_REQUESTS
         
-        # Hash the provided key and check against database
-        hashed_key = hash_api_key(api_key)
-        api_key_record = APIKey.query.filter_by(
-            key_hash=hashed_key, 
-            is_active=True
-        ).first()
-        
-        if not api_key_record:
-            return jsonify({'error': 'Invalid API key'}), 401
-        
-        # Update last used timestamp
-        api_key_record.last_used_at = datetime.utcnow()
-        api_key_record.use_count += 1
+        if not api_key:
+            API_REQUESTS.labels('missing', request.endpoint).inc()
+            return jsonify({'error': 'No API key provided'}), 401
         
-        from app import db
-        db.session.commit()
+        # Looked up on the primary, so new keys work at once and use_count is not counted from a stale row
+        with primary():
+            # Hash the provided key and check against database
+            hashed_key = hash_api_key(api_key)
+            api_key_record = APIKey.query.filter_by(
+                key_hash=hashed_key, 
+                is_active=True
+            ).first()
+            
+            if not api_key_record:
+                API_REQUESTS.labels('invalid', request.endpoint).inc()
+                return jsonify({'error': 'Invalid API key'}), 401
+            
+            # Update last used timestamp
+            api_key_record.last_used_at = datetime.utcnow()
+            api_key_record.use_count += 1
+            db.session.commit()
         
         # Add API key record to request context
         request.api_key = api_key_record
+        API_REQUESTS.labels(str(api_key_record.id), request.endpoint).inc()
         
         return f(*args, **kwargs)
     
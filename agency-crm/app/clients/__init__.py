@@ -2,4 +2,4 @@ from flask import Blueprint
 
 bp = Blueprint('clients', __name__)
 
-from app.clients import routes
\ No newline at end of file
+from app.clients import routes, commands
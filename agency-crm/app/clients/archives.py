@@ -0,0 +1,128 @@
+"""ZIP downloads of attachments, streamed as they are generated.
+
+The archive is written with zipfile into a write-only buffer that is
+emptied after every chunk, so neither the archive nor any single file is
+held in memory or written to disk; each attachment is copied from the
+storage backend in small chunks straight into the response. Entries are
+stored uncompressed since attachments are mostly PDFs, Office documents
+and images, which are compressed already.
+"""
+import io
+import posixpath
+import zipfile
+from datetime import datetime
+from flask import Response, stream_with_context
+from sqlalchemy.orm import selectinload
+from app.models import PlanningInfo, KeyMeeting
+from app.clients.exports import invoice_query
+from app.storage_backends import get_backend
+
+CHUNK_SIZE = 64 * 1024
+
+class _ZipBuffer(io.RawIOBase):
+    """Write-only, unseekable sink; zipfile then writes data descriptors instead of seeking back"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _safe_name(name):
+    # Keep archive paths flat and portable
+    return (name or 'file').replace('/', '_').replace('\\', '_').strip() or 'file'
+
+def stream_zip(entries):
+    """Yield a ZIP archive of (archive path, storage key) entries chunk by chunk"""
+    backend = get_backend()
+    buffer = _ZipBuffer()
+    used_names = set()
+    missing = []
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for arcname, key in entries:
+            # Two attachments with the same name in one folder get a numbered suffix
+            base, ext = posixpath.splitext(arcname)
+            candidate, n = arcname, 1
+            while candidate in used_names:
+                n += 1
+                candidate = f"{base} ({n}){ext}"
+            used_names.add(candidate)
+
+            try:
+                source = backend.open(key)
+            except (FileNotFoundError, OSError):
+                missing.append(candidate)
+                continue
+
+            info = zipfile.ZipInfo(candidate, date_time=datetime.now().timetuple()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with source, archive.open(info, 'w', force_zip64=True) as target:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+                    yield buffer.take()
+
+        if missing:
+            archive.writestr('MISSING_FILES.txt', 'These files could not be found in storage:\n' + '\n'.join(missing))
+    yield buffer.take()
+
+def invoice_entries(invoice, folder=''):
+    if invoice.attachments:
+        for attachment in invoice.attachments:
+            yield posixpath.join(folder, _safe_name(attachment.filename)), attachment.file_path
+    elif invoice.file_path:
+        # Invoices from before multiple attachments
+        yield posixpath.join(folder, _safe_name(invoice.filename)), invoice.file_path
+
+def _invoice_folder(invoice):
+    return _safe_name(f"{invoice.invoice_date.strftime('%Y-%m-%d')} {invoice.company.name} #{invoice.id}")
+
+def brand_entries(brand):
+    """Planning, meeting and invoice attachments of a brand, one folder per record"""
+    plannings = PlanningInfo.query.filter_by(brand_id=brand.id)\
+        .options(selectinload(PlanningInfo.attachments))\
+        .order_by(PlanningInfo.created_at.desc())
+    for planning in plannings:
+        folder = f"Planning/{planning.created_at.strftime('%Y-%m-%d')} #{planning.id}"
+        for attachment in planning.attachments:
+            yield f"{folder}/{_safe_name(attachment.filename)}", attachment.file_path
+
+    meetings = KeyMeeting.query.filter_by(brand_id=brand.id)\
+        .options(selectinload(KeyMeeting.attachments))\
+        .order_by(KeyMeeting.date.desc())
+    for meeting in meetings:
+        folder = f"Meetings/{meeting.date.strftime('%Y-%m-%d')} #{meeting.id}"
+        for attachment in meeting.attachments:
+            yield f"{folder}/{_safe_name(attachment.filename)}", attachment.file_path
+
+    invoices = invoice_query({'brand_id': brand.id})
+    for invoice in invoices:
+        yield from invoice_entries(invoice, f"Invoices/{_invoice_folder(invoice)}")
+
+def invoices_entries(params):
+    """Attachments of every invoice matching the invoices page filters"""
+    for invoice in invoice_query(params).yield_per(500):
+        yield from invoice_entries(invoice, _invoice_folder(invoice))
+
+def zip_response(entries, download_name):
+    return Response(
+        stream_with_context(stream_zip(entries)),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename={download_name}',
+            # Let nginx pass chunks on as they are produced
+            'X-Accel-Buffering': 'no'
+        }
+    )
@@ -0,0 +1,73 @@
+"""Sections of the brand page, each loaded on its own.
+
+The brand page itself only renders the brand and its company. Every
+section below is fetched by the browser from
+/clients/brand/<id>/section/<name> when it scrolls into view, one page at
+a time, so the page costs the same however long a brand's history gets.
+Each query loads what its template shows with a preset from
+app.clients.loaders, so a page of a section is a fixed number of queries.
+"""
+from app.models import (Subbrand, BrandTeam, ClientContact, brand_contacts, PlanningInfo, KeyMeeting, KeyLink,
+                        Commitment, StatusUpdate, Invoice)
+from app.clients import loaders
+
+PAGE_SIZE = 20
+
+def _subbrands(brand):
+    return Subbrand.query.filter_by(brand_id=brand.id).order_by(Subbrand.name, Subbrand.id)
+
+def _team(brand):
+    return BrandTeam.query.filter_by(brand_id=brand.id)\
+        .options(*loaders.BRAND_TEAM)\
+        .order_by(BrandTeam.is_key_responsible.desc(), BrandTeam.id)
+
+def _contacts(brand):
+    return ClientContact.query.join(brand_contacts).filter(brand_contacts.c.brand_id == brand.id)\
+        .order_by(ClientContact.last_name, ClientContact.first_name, ClientContact.id)
+
+def _planning(brand):
+    return PlanningInfo.query.filter_by(brand_id=brand.id)\
+        .options(*loaders.PLANNING_HISTORY)\
+        .order_by(PlanningInfo.created_at.desc(), PlanningInfo.id.desc())
+
+def _meetings(brand):
+    return KeyMeeting.query.filter_by(brand_id=brand.id)\
+        .options(*loaders.MEETING_HISTORY)\
+        .order_by(KeyMeeting.date.desc(), KeyMeeting.id.desc())
+
+def _links(brand):
+    return KeyLink.query.filter_by(brand_id=brand.id)\
+        .options(*loaders.KEY_LINKS)\
+        .order_by(KeyLink.created_at.desc(), KeyLink.id.desc())
+
+def _commitments(brand):
+    return Commitment.query.filter_by(company_id=brand.company_id)\
+        .options(*loaders.COMMITMENTS)\
+        .order_by(Commitment.year.desc(), Commitment.id.desc())
+
+def _status_updates(brand):
+    return StatusUpdate.query.filter_by(brand_id=brand.id)\
+        .options(*loaders.STATUS_HISTORY)\
+        .order_by(StatusUpdate.date.desc(), StatusUpdate.id.desc())
+
+def _invoices(brand):
+    return Invoice.query.filter_by(brand_id=brand.id)\
+        .options(*loaders.INVOICE_HISTORY)\
+        .order_by(Invoice.invoice_date.desc(), Invoice.id.desc())
+
+# Section name -> query of its rows; the template is clients/brand_sections/<name>.html
+SECTIONS = {
+    'subbrands': _subbrands,
+    'team': _team,
+    'contacts': _contacts,
+    'planning': _planning,
+    'meetings': _meetings,
+    'links': _links,
+    'commitments': _commitments,
+    'status_updates': _status_updates,
+    'invoices': _invoices,
+}
+
+def section_page(brand, name, page=1):
+    """One page of a brand section, as a Flask-SQLAlchemy Pagination"""
+    return SECTIONS[name](brand).paginate(page=page, per_page=PAGE_SIZE, error_out=False)
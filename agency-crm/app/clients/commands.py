@@ -0,0 +1,114 @@
+import click
+from app.clients import bp
+from app.clients.imports import IMPORTERS, ImportFileError, run_import
+from app.clients.export_jobs import run_worker
+from app.storage import collect_garbage, recount_references
+from app.clients.uploads import expire_uploads, run_worker as run_upload_worker
+from app.previews import run_worker as run_preview_worker, reset_previews
+from app.search import run_worker as run_index_worker, reset_text
+from app.reconcile import reconcile
+from app.models import User
+
+@bp.cli.command('import')
+@click.argument('kind', type=click.Choice(sorted(IMPORTERS)))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--user', 'user_email', required=True, help='Email of the team member recorded as creator')
+@click.option('--commit', is_flag=True, help='Save the rows; without it the import is a dry run')
+def import_command(kind, path, user_email, commit):
+    """Import contacts, brands or invoices from a CSV or .xlsx file"""
+    user = User.query.filter_by(email=user_email).first()
+    if not user:
+        raise click.ClickException(f'No user with email {user_email}')
+
+    with open(path, 'rb') as stream:
+        try:
+            report = run_import(kind, stream, path, user.id, dry_run=not commit)
+        except ImportFileError as e:
+            raise click.ClickException(str(e))
+
+    click.echo(f"{'Dry run: ' if report.dry_run else ''}{report.rows} rows, {report.created} created, "
+               f"{report.updated} updated, {report.unchanged} unchanged, {report.error_count} errors")
+    for line, messages in report.errors:
+        click.echo(f"  line {line}: {'; '.join(messages)}")
+    if report.errors_truncated:
+        click.echo(f"  ... {report.error_count - len(report.errors)} more errors")
+
+@bp.cli.command('export-worker')
+@click.option('--once', is_flag=True, help='Exit when the queue is empty instead of polling')
+def export_worker_command(once):
+    """Generate queued background exports"""
+    run_worker(once=once)
+
+@bp.cli.command('upload-worker')
+@click.option('--once', is_flag=True, help='Exit when no upload is waiting instead of polling')
+def upload_worker_command(once):
+    """Check, store and attach finalized chunked uploads"""
+    run_upload_worker(once=once)
+
+@bp.cli.command('storage-gc')
+@click.option('--grace-hours', type=int, help='Keep blobs unreferenced for less than this (default BLOB_GC_GRACE_HOURS)')
+@click.option('--recount', is_flag=True, help='Rebuild reference counts from the attachment tables first')
+@click.option('--dry-run', is_flag=True, help='Only report what would be deleted')
+def storage_gc_command(grace_hours, recount, dry_run):
+    """Delete stored attachment files that nothing references any more, and stale chunked uploads"""
+    if recount:
+        click.echo(f"Corrected {recount_references()} reference counts")
+    if not dry_run:
+        click.echo(f"Aborted {expire_uploads()} unfinished chunked uploads")
+    removed, freed = collect_garbage(grace_hours=grace_hours, dry_run=dry_run)
+    click.echo(f"{'Would remove' if dry_run else 'Removed'} {removed} blobs ({freed / (1024 * 1024):.1f} MB)")
+
+@bp.cli.command('preview-worker')
+@click.option('--once', is_flag=True, help='Exit when every attachment has a preview instead of polling')
+@click.option('--retry', is_flag=True, help='Queue attachments whose preview failed or was interrupted again')
+def preview_worker_command(once, retry):
+    """Generate preview images of image and PDF attachments"""
+    if retry:
+        click.echo(f"Queued {reset_previews()} previews again")
+    run_preview_worker(once=once)
+
+@bp.cli.command('index-worker')
+@click.option('--once', is_flag=True, help='Exit when every document is indexed instead of polling')
+@click.option('--retry', is_flag=True, help='Queue documents whose extraction failed or was interrupted again')
+def index_worker_command(once, retry):
+    """Extract the text of PDF and Office attachments for document search"""
+    if retry:
+        click.echo(f"Queued {reset_text()} documents again")
+    run_index_worker(once=once)
+
+def _size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            break
+        size /= 1024
+    return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+
+@bp.cli.command('storage-report')
+@click.option('--delete-orphans', is_flag=True, help='Delete files no row refers to (older than --min-age-hours)')
+@click.option('--min-age-hours', type=int, help='Only delete orphans older than this (default BLOB_GC_GRACE_HOURS)')
+@click.option('--batch-size', type=int, default=500, show_default=True, help='Orphans deleted per request')
+@click.option('--limit', type=int, help='Delete at most this many orphans')
+@click.option('--show', type=int, default=20, show_default=True, help='How many orphans and missing files to list')
+def storage_report_command(delete_orphans, min_age_hours, batch_size, limit, show):
+    """Compare stored files with the database: usage per company, orphaned and missing files"""
+    report = reconcile(delete_orphans=delete_orphans, min_age_hours=min_age_hours,
+                       batch_size=batch_size, limit=limit, sample_size=show)
+
+    click.echo(f"Stored: {report.files} files, {_size(report.bytes)}")
+    for kind in sorted(report.kind_files):
+        click.echo(f"  {kind}: {report.kind_files[kind]} files, {_size(report.kind_bytes[kind])}")
+
+    click.echo(f"Orphaned: {report.orphan_count} files, {_size(report.orphan_bytes)} "
+               f"({report.reclaimable_count} files, {_size(report.reclaimable_bytes)} past the grace period)")
+    for key, size, modified in report.orphans:
+        click.echo(f"  {key}  {_size(size)}  {modified:%Y-%m-%d %H:%M}")
+    if delete_orphans:
+        click.echo(f"Deleted {report.deleted_count} orphaned files ({_size(report.deleted_bytes)})")
+
+    click.echo(f"Missing: {report.missing_count} files")
+    for reference in report.missing:
+        click.echo(f"  {reference.key}  ({reference.kind})")
+
+    click.echo("Per company:")
+    for company, size in report.companies():
+        click.echo(f"  {company.name if company else '(deleted company)'}: {_size(size)}")
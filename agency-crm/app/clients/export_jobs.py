@@ -0,0 +1,174 @@
+"""Background export jobs.
+
+A web request only records an ExportJob; a separate worker process
+(`flask clients export-worker`) generates the file, stores it under
+`exports/` in the storage backend and records progress as it goes. Finished files
+expire after EXPORT_JOB_TTL_HOURS. A user requesting the same export with
+the same filters again within EXPORT_JOB_REUSE_SECONDS gets their existing
+job instead of a new file. A running job records a heartbeat with every
+batch of rows; one without a heartbeat for EXPORT_JOB_TIMEOUT_MINUTES
+belongs to a worker that stopped, and is marked failed.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.metrics import EXPORT_SECONDS
+from app.models import ExportJob
+from app.clients.exports import EXPORTS, write_export, export_filename
+from app.storage_backends import get_backend
+
+JOB_BATCH_SIZE = 500
+
+def artifact_key(job):
+    """Storage key of a finished job's file"""
+    return f"exports/{job.file_path}"
+
+def params_hash(kind, export_format, params):
+    payload = json.dumps({'kind': kind, 'format': export_format, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def request_export(kind, params, user_id, export_format='xlsx'):
+    """Return a reusable recent job for this export or queue a new one"""
+    params = {k: v for k, v in params.items() if v not in (None, '')}
+    digest = params_hash(kind, export_format, params)
+    fresh_after = datetime.utcnow() - timedelta(seconds=current_app.config['EXPORT_JOB_REUSE_SECONDS'])
+
+    # Only the user's own jobs: the exports page lists nobody else's
+    existing = ExportJob.query.filter(
+        ExportJob.created_by_id == user_id,
+        ExportJob.params_hash == digest,
+        ExportJob.status.in_(['pending', 'running', 'done']),
+        ExportJob.created_at >= fresh_after
+    ).order_by(ExportJob.created_at.desc()).first()
+    if existing and (existing.status != 'done' or _artifact_exists(existing)):
+        return existing, False
+
+    job = ExportJob(
+        kind=kind,
+        format=export_format,
+        params=params,
+        params_hash=digest,
+        status='pending',
+        created_by_id=user_id
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job, True
+
+def _artifact_exists(job):
+    return bool(job.file_path) and get_backend().exists(artifact_key(job))
+
+def claim_next_job():
+    """Atomically move the oldest pending job to running and return it"""
+    while True:
+        job = ExportJob.query.filter_by(status='pending').order_by(ExportJob.id).first()
+        if job is None:
+            return None
+        now = datetime.utcnow()
+        claimed = ExportJob.query.filter_by(id=job.id, status='pending').update(
+            {'status': 'running', 'started_at': now, 'heartbeat_at': now}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            db.session.refresh(job)
+            return job
+
+def fail_stale_jobs(now=None):
+    """Mark running jobs without a heartbeat for EXPORT_JOB_TIMEOUT_MINUTES as failed; returns the count
+
+    Such a job was claimed by a worker that crashed or was killed, and no worker would pick it up again.
+    It is failed rather than requeued, as the export may be what brought the worker down.
+    """
+    now = now or datetime.utcnow()
+    silent_since = now - timedelta(minutes=current_app.config['EXPORT_JOB_TIMEOUT_MINUTES'])
+    # Jobs claimed before heartbeats were recorded only have started_at
+    last_seen = db.func.coalesce(ExportJob.heartbeat_at, ExportJob.started_at)
+    failed = ExportJob.query.filter(ExportJob.status == 'running', last_seen < silent_since).update(
+        {'status': 'failed', 'error': 'The export worker stopped before the file was finished.',
+         'finished_at': now}, synchronize_session=False)
+    db.session.commit()
+    if failed:
+        current_app.logger.warning(f"Marked {failed} stalled export job(s) as failed")
+    return failed
+
+def _job_rows(job, export):
+    """Yield rows in batches of ids, committing progress and a heartbeat between batches.
+
+    Ids are read up front so that each batch is a short query of its own
+    and progress can be committed without holding a read cursor open.
+    """
+    params = job.params or {}
+    ids = [row[0] for row in export.query(params).enable_eagerloads(False).with_entities(export.pk)]
+    job.total_rows = len(ids)
+    job.heartbeat_at = datetime.utcnow()
+    db.session.commit()
+
+    for start in range(0, len(ids), JOB_BATCH_SIZE):
+        batch = ids[start:start + JOB_BATCH_SIZE]
+        for result in export.query(params).filter(export.pk.in_(batch)).all():
+            yield export.to_row(result)
+        job.processed_rows = start + len(batch)
+        job.heartbeat_at = datetime.utcnow()
+        db.session.commit()
+
+def run_job(job):
+    export = EXPORTS[job.kind]
+    backend = get_backend()
+    filename = f"{job.id}_{export_filename(job.kind, job.format)}"
+    fd, tmp_path = tempfile.mkstemp(dir=backend.staging_dir(), prefix='export-')
+
+    try:
+        with EXPORT_SECONDS.labels(job.kind, job.format, 'background').time(), os.fdopen(fd, 'wb') as output:
+            write_export(export, output, job.format, rows=_job_rows(job, export))
+        file_size = os.path.getsize(tmp_path)
+        backend.put_file(f"exports/{filename}", tmp_path)
+    except Exception as e:
+        db.session.rollback()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        job.status = 'failed'
+        job.error = str(e)[:1000]
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        current_app.logger.error(f"Export job {job.id} failed: {e}")
+        return job
+
+    job.status = 'done'
+    job.filename = export_filename(job.kind, job.format)
+    job.file_path = filename
+    job.file_size = file_size
+    job.finished_at = datetime.utcnow()
+    job.expires_at = job.finished_at + timedelta(hours=current_app.config['EXPORT_JOB_TTL_HOURS'])
+    db.session.commit()
+    return job
+
+def expire_jobs(now=None):
+    """Delete files of expired jobs and mark them expired; returns the count"""
+    now = now or datetime.utcnow()
+    expired = ExportJob.query.filter(ExportJob.status == 'done', ExportJob.expires_at < now).all()
+    for job in expired:
+        if job.file_path:
+            get_backend().delete(artifact_key(job))
+        job.status = 'expired'
+    db.session.commit()
+    return len(expired)
+
+def run_worker(once=False, poll_seconds=None):
+    """Process queued export jobs until interrupted (or the queue is empty with once=True)"""
+    poll_seconds = poll_seconds or current_app.config['EXPORT_WORKER_POLL_SECONDS']
+    while True:
+        expire_jobs()
+        fail_stale_jobs()
+        job = claim_next_job()
+        if job is not None:
+            current_app.logger.info(f"Running export job {job.id} ({job.kind})")
+            run_job(job)
+            continue
+        if once:
+            return
+        db.session.remove()
+        time.sleep(poll_seconds)
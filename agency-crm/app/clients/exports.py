@@ -0,0 +1,291 @@
+"""Exports of brands, contacts, companies, invoices and commitments.
+
+Each export is an ordered query plus a function turning one result into a
+row. Rows are read with `yield_per`, with related data loaded per batch,
+and written as Excel (openpyxl write-only workbook), CSV or Parquet (when
+pyarrow is installed). CSV is streamed straight to the client; the other
+formats are built in a temporary file and streamed from disk. Memory use
+stays flat as the tables grow.
+"""
+import csv
+import importlib.util
+import io
+import tempfile
+from collections import namedtuple
+from datetime import datetime
+from flask import Response, send_file, stream_with_context
+from sqlalchemy import func, and_
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from app.metrics import EXPORT_SECONDS
+from app.models import Company, Brand, BrandTeam, ClientContact, StatusUpdate, Invoice, Commitment, MediaGroup
+
+BATCH_SIZE = 1000
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# column_types maps a header to 'int' or 'float'; other columns are text.
+# Only formats with a schema (Parquet) use it.
+Export = namedtuple('Export', ['name', 'title', 'headers', 'query', 'to_row', 'pk', 'column_types'],
+                    defaults=[{}])
+
+def brand_query(params):
+    # Latest status update per brand, picked in the database instead of loading every update
+    latest = db.session.query(
+        StatusUpdate.brand_id,
+        StatusUpdate.date,
+        StatusUpdate.evaluation,
+        func.row_number().over(
+            partition_by=StatusUpdate.brand_id,
+            order_by=(StatusUpdate.date.desc(), StatusUpdate.id)
+        ).label('position')
+    ).subquery()
+
+    return db.session.query(Brand, latest.c.date, latest.c.evaluation)\
+        .join(Company, Brand.company_id == Company.id)\
+        .outerjoin(latest, and_(latest.c.brand_id == Brand.id, latest.c.position == 1))\
+        .options(joinedload(Brand.company),
+                 selectinload(Brand.subbrands),
+                 selectinload(Brand.team_members).joinedload(BrandTeam.team_member))\
+        .order_by(Company.name, Brand.name)
+
+def brand_row(result):
+    brand, last_update_date, risk_level = result
+    key_responsible = None
+    for tm in brand.team_members:
+        if tm.is_key_responsible:
+            key_responsible = f"{tm.team_member.first_name} {tm.team_member.last_name}"
+            break
+
+    return [
+        brand.company.name,
+        brand.name,
+        ', '.join([sb.name for sb in brand.subbrands]),
+        brand.status,
+        key_responsible or 'Not assigned',
+        last_update_date.strftime('%Y-%m-%d') if last_update_date else 'Never updated',
+        risk_level or 'No evaluation'
+    ]
+
+def contact_query(params):
+    return ClientContact.query\
+        .options(selectinload(ClientContact.brands).joinedload(Brand.company))\
+        .order_by(ClientContact.last_name, ClientContact.first_name)
+
+def contact_row(contact):
+    birthday = ''
+    if contact.birthday_month and contact.birthday_day:
+        birthday = f"{contact.birthday_month:02d}-{contact.birthday_day:02d}"
+
+    return [
+        contact.first_name,
+        contact.last_name,
+        contact.email,
+        contact.phone or '',
+        contact.linkedin_url or '',
+        birthday,
+        ', '.join([f"{b.name} ({b.company.name})" for b in contact.brands]),
+        'Yes' if contact.should_get_gift else 'No',
+        'Yes' if contact.receive_newsletter else 'No',
+        contact.status
+    ]
+
+def company_query(params):
+    return Company.query\
+        .options(selectinload(Company.brands),
+                 selectinload(Company.agreements),
+                 selectinload(Company.parent_company))\
+        .order_by(Company.name)
+
+def company_row(company):
+    today = datetime.now().date()
+    has_service = 'No'
+    has_data = 'No'
+    for agreement in company.agreements:
+        if agreement.type == 'service' and (not agreement.valid_until or agreement.valid_until >= today):
+            has_service = 'Yes'
+        elif agreement.type == 'data' and (not agreement.valid_until or agreement.valid_until >= today):
+            has_data = 'Yes'
+
+    return [
+        company.name,
+        company.vat_code or '',
+        company.registration_number or '',
+        company.address or '',
+        company.bank_account or '',
+        company.agency_fees or '',
+        company.parent_company.name if company.parent_company else '',
+        ', '.join([b.name for b in company.brands]),
+        has_service,
+        has_data,
+        company.status
+    ]
+
+def invoice_query(params):
+    # Same filters as the invoices list page
+    query = Invoice.query.join(Brand, Invoice.brand_id == Brand.id)\
+        .options(joinedload(Invoice.brand).joinedload(Brand.company),
+                 joinedload(Invoice.company),
+                 selectinload(Invoice.attachments))
+    if params.get('brand_id'):
+        query = query.filter(Invoice.brand_id == params['brand_id'])
+    if params.get('company_id'):
+        query = query.filter(Brand.company_id == params['company_id'])
+    return query.order_by(Invoice.invoice_date.desc(), Invoice.id.desc())
+
+def invoice_row(invoice):
+    return [
+        invoice.invoice_date.strftime('%Y-%m-%d'),
+        invoice.brand.company.name,
+        invoice.brand.name,
+        invoice.company.name,
+        invoice.short_info or '',
+        float(invoice.total_amount),
+        ', '.join([a.filename for a in invoice.attachments])
+    ]
+
+def commitment_query(params):
+    return Commitment.query.join(Company, Commitment.company_id == Company.id)\
+        .join(MediaGroup, Commitment.media_group_id == MediaGroup.id)\
+        .options(joinedload(Commitment.company), joinedload(Commitment.media_group))\
+        .order_by(Company.name, Commitment.year.desc(), MediaGroup.name)
+
+def commitment_row(commitment):
+    return [
+        commitment.company.name,
+        commitment.media_group.name,
+        commitment.year,
+        float(commitment.amount),
+        commitment.currency
+    ]
+
+EXPORTS = {
+    'brands': Export('brands', 'Brands',
+                     ['Company', 'Brand', 'Subbrands', 'Status', 'Key Responsible', 'Last Update', 'Risk Level'],
+                     brand_query, brand_row, Brand.id),
+    'contacts': Export('contacts', 'Contacts',
+                       ['First Name', 'Last Name', 'Email', 'Phone', 'LinkedIn', 'Birthday', 'Brands',
+                        'Should Get Gift', 'Newsletter', 'Status'],
+                       contact_query, contact_row, ClientContact.id),
+    'companies': Export('companies', 'Companies',
+                        ['Company Name', 'VAT Code', 'Registration Number', 'Address', 'Bank Account',
+                         'Agency Fees', 'Parent Company', 'Brands', 'Active Service Agreement',
+                         'Active Data Agreement', 'Status'],
+                        company_query, company_row, Company.id),
+    'invoices': Export('invoices', 'Invoices',
+                       ['Invoice Date', 'Company', 'Brand', 'Invoice To', 'Description', 'Total Amount', 'Files'],
+                       invoice_query, invoice_row, Invoice.id, {'Total Amount': 'float'}),
+    'commitments': Export('commitments', 'Commitments',
+                          ['Company', 'Media Group', 'Year', 'Amount', 'Currency'],
+                          commitment_query, commitment_row, Commitment.id, {'Year': 'int', 'Amount': 'float'})
+}
+
+def iter_rows(export, params=None):
+    """Yield export rows from a single streamed query"""
+    for result in export.query(params or {}).yield_per(BATCH_SIZE):
+        yield export.to_row(result)
+
+def write_xlsx(export, fileobj, rows):
+    """Write rows to fileobj using a write-only workbook"""
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(export.title)
+    ws.append(export.headers)
+    for row in rows:
+        ws.append(row)
+    wb.save(fileobj)
+
+def write_csv(export, fileobj, rows):
+    """Write rows as UTF-8 CSV to a binary fileobj"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow(export.headers)
+    writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+def write_parquet(export, fileobj, rows):
+    """Write rows as a Parquet file, one row group per batch"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {'int': pa.int64(), 'float': pa.float64()}
+    schema = pa.schema([(h, arrow_types.get(export.column_types.get(h), pa.string())) for h in export.headers])
+    text_columns = [i for i, h in enumerate(export.headers) if h not in export.column_types]
+
+    with pq.ParquetWriter(fileobj, schema) as writer:
+        batch = []
+        for row in rows:
+            for i in text_columns:
+                if row[i] is not None and not isinstance(row[i], str):
+                    row[i] = str(row[i])
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                writer.write_table(pa.Table.from_arrays(list(map(list, zip(*batch))), schema=schema))
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_arrays(list(map(list, zip(*batch))), schema=schema))
+
+FORMATS = {
+    'xlsx': (XLSX_MIMETYPE, write_xlsx),
+    'csv': ('text/csv', write_csv),
+    'parquet': ('application/vnd.apache.parquet', write_parquet)
+}
+
+_available_formats = None
+
+def available_formats():
+    """Export formats usable in this installation; Parquet needs pyarrow"""
+    global _available_formats
+    if _available_formats is None:
+        _available_formats = ['xlsx', 'csv']
+        if importlib.util.find_spec('pyarrow') is not None:
+            _available_formats.append('parquet')
+    return _available_formats
+
+def write_export(export, fileobj, export_format='xlsx', rows=None, params=None):
+    writer = FORMATS[export_format][1]
+    writer(export, fileobj, rows if rows is not None else iter_rows(export, params))
+
+def export_filename(name, extension='xlsx'):
+    return f'{name}_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+def _stream_csv(export, params):
+    # Timed until the last row is sent, or the client goes away
+    with EXPORT_SECONDS.labels(export.name, 'csv', 'download').time():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(export.headers)
+        for count, row in enumerate(iter_rows(export, params), start=1):
+            writer.writerow(row)
+            if count % BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+def export_response(name, export_format='xlsx', params=None):
+    """Stream an export to the client as a download"""
+    export = EXPORTS[name]
+    mimetype = FORMATS[export_format][0]
+    download_name = export_filename(name, export_format)
+
+    if export_format == 'csv':
+        return Response(
+            stream_with_context(_stream_csv(export, params)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={download_name}'}
+        )
+
+    output = tempfile.TemporaryFile()
+    try:
+        with EXPORT_SECONDS.labels(name, export_format, 'download').time():
+            write_export(export, output, export_format, params=params)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+
+    # send_file streams the file in blocks and closes (and so deletes) it afterwards
+    return send_file(output, mimetype=mimetype, as_attachment=True, download_name=download_name)
@@ -1,9 +1,10 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed, MultipleFileField
+from flask_wtf.file import FileField, FileAllowed, FileRequired, MultipleFileField
 from wtforms import StringField, TextAreaField, SelectField, SubmitField, BooleanField, DateField, DecimalField, IntegerField, SelectMultipleField
 from wtforms.validators import DataRequired, Email, Optional, Length, ValidationError
 from wtforms.widgets import ListWidget, CheckboxInput
-from app.models import Company, ClientContact, MediaGroup
+from app.models import Company, ClientContact
+from app import reference_data
 
 class MultiCheckboxField(SelectMultipleField):
     widget = ListWidget(prefix_label=False)
@@ -33,12 +34,14 @@ class CompanyForm(FlaskForm):
             if query.first():
                 raise ValidationError('This VAT code is already registered.')
 
+AGREEMENT_TYPES = [
+    ('service', 'Service Agreement'),
+    ('data', 'Data Agreement'),
+    ('other', 'Other')
+]
+
 class AgreementForm(FlaskForm):
-    type = SelectField('Agreement Type', choices=[
-        ('service', 'Service Agreement'),
-        ('data', 'Data Agreement'),
-        ('other', 'Other')
-    ], validators=[DataRequired()])
+    type = SelectField('Agreement Type', choices=AGREEMENT_TYPES, validators=[DataRequired()])
     valid_until = DateField('Valid Until', format='%Y-%m-%d', validators=[Optional()])
     file = FileField('Agreement File (PDF)', validators=[
         FileAllowed(['pdf'], 'Only PDF files are allowed!')
@@ -54,7 +57,7 @@ class BrandForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(BrandForm, self).__init__(*args, **kwargs)
-        self.company_id.choices = [(c.id, c.name) for c in Company.query.filter_by(status='active').order_by(Company.name).all()]
+        self.company_id.choices = [(c.id, c.name) for c in reference_data.get_companies() if c.status == 'active']
 
 class SubbrandForm(FlaskForm):
     name = StringField('Subbrand Name', validators=[DataRequired(), Length(max=200)])
@@ -84,8 +87,7 @@ class ClientContactForm(FlaskForm):
     def __init__(self, contact=None, *args, **kwargs):
         super(ClientContactForm, self).__init__(*args, **kwargs)
         self.contact = contact
-        from app.models import Brand
-        self.brands.choices = [(b.id, f"{b.name} ({b.company.name})") for b in Brand.query.join(Company).order_by(Company.name, Brand.name).all()]
+        self.brands.choices = [(b.id, f"{b.name} ({b.company_name})") for b in reference_data.get_brands()]
         
         # Initialize brands.data to empty list if None to prevent TypeError
         if self.brands.data is None:
@@ -112,8 +114,7 @@ class BrandTeamForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(BrandTeamForm, self).__init__(*args, **kwargs)
-        from app.models import User
-        active_users = User.query.filter_by(is_active=True).order_by(User.last_name, User.first_name).all()
+        active_users = reference_data.get_users(active_only=True)
         self.team_members.choices = [(u.id, f"{u.first_name} {u.last_name} ({u.role.replace('_', ' ').title()})") for u in active_users]
         self.key_responsible_id.choices = [(0, '-- Select Key Responsible --')] + [(u.id, f"{u.first_name} {u.last_name}") for u in active_users]
 
@@ -127,7 +128,7 @@ class CommitmentForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(CommitmentForm, self).__init__(*args, **kwargs)
-        self.media_group_id.choices = [(mg.id, mg.name) for mg in MediaGroup.query.order_by(MediaGroup.name).all()]
+        self.media_group_id.choices = [(mg.id, mg.name) for mg in reference_data.get_media_groups()]
 
 class StatusUpdateForm(FlaskForm):
     date = DateField('Date', format='%Y-%m-%d', validators=[DataRequired()])
@@ -210,4 +211,40 @@ class InvoiceForm(FlaskForm):
     files = MultipleFileField('Invoice Files (PDF/Excel)', validators=[
         FileAllowed(['pdf', 'xlsx', 'xls'], 'Only PDF and Excel files are allowed!')
     ])
-    submit = SubmitField('Save Invoice')
\ No newline at end of file
+    submit = SubmitField('Save Invoice')
+
+
+class ImportForm(FlaskForm):
+    kind = SelectField('Import', choices=[
+        ('contacts', 'Contacts'),
+        ('brands', 'Brands'),
+        ('invoices', 'Invoices')
+    ], validators=[DataRequired()])
+    file = FileField('File (CSV or Excel)', validators=[
+        FileRequired(),
+        FileAllowed(['csv', 'xlsx'], 'Only CSV and Excel (.xlsx) files are allowed!')
+    ])
+    dry_run = BooleanField('Dry run (validate only, do not save)', default=True)
+    submit = SubmitField('Import')
+
+# Import forms reuse the field rules of the forms above, one instance per row.
+# Lookups that the interactive forms do per instance are done once by the importer.
+
+class ContactImportForm(ClientContactForm):
+    brands = None
+
+    def __init__(self, *args, **kwargs):
+        FlaskForm.__init__(self, *args, **kwargs)
+        self.contact = None
+
+    def validate_email(self, email):
+        # Existing emails are updated rather than rejected
+        pass
+
+class BrandImportForm(BrandForm):
+    def __init__(self, company_choices, *args, **kwargs):
+        FlaskForm.__init__(self, *args, **kwargs)
+        self.company_id.choices = company_choices
+
+class InvoiceImportForm(InvoiceForm):
+    files = None
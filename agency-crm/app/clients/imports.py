@@ -0,0 +1,396 @@
+"""Bulk import of contacts, brands and invoices from CSV or Excel files.
+
+Rows are read one at a time (csv module or openpyxl read-only mode),
+validated with the same field rules as the interactive forms, and written
+in chunks. Each chunk is its own transaction and nothing from it is kept
+once it is committed, so memory stays flat regardless of file size. A dry
+run goes through the same steps and rolls every chunk back.
+
+Imports do not trigger webhooks; a bulk load would otherwise send one
+HTTP request per row.
+"""
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+from werkzeug.datastructures import MultiDict
+from app import db
+from app import reference_data
+from app.clients.forms import ContactImportForm, BrandImportForm, InvoiceImportForm
+from app.models import Brand, ClientContact, Invoice
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 200
+
+TRUE_VALUES = {'yes', 'y', 'true', '1', 'x'}
+
+class ImportFileError(Exception):
+    """Raised when a file cannot be read as an import source"""
+
+class ImportReport:
+    def __init__(self, kind, dry_run):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, messages):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, messages))
+
+    @property
+    def errors_truncated(self):
+        return self.error_count > len(self.errors)
+
+def iter_csv_rows(stream):
+    """Yield (line number, row dict) from a binary CSV stream"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise ImportFileError('The file is empty.')
+        header = [h.strip() for h in header]
+        for line, values in enumerate(reader, start=2):
+            if not any(v.strip() for v in values):
+                continue
+            yield line, dict(zip(header, values))
+    finally:
+        text.detach()
+
+def iter_xlsx_rows(stream):
+    """Yield (line number, row dict) from the first sheet of an .xlsx stream"""
+    from openpyxl import load_workbook
+
+    try:
+        wb = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFileError(f'Could not read Excel file: {e}')
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            raise ImportFileError('The file is empty.')
+        header = [str(h).strip() if h is not None else '' for h in header]
+        for line, values in enumerate(rows, start=2):
+            if all(v is None or str(v).strip() == '' for v in values):
+                continue
+            yield line, dict(zip(header, (_cell_to_text(v) for v in values)))
+    finally:
+        wb.close()
+
+def _cell_to_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def iter_rows(stream, filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'csv':
+        return iter_csv_rows(stream)
+    if extension == 'xlsx':
+        return iter_xlsx_rows(stream)
+    raise ImportFileError('Only CSV and .xlsx files can be imported.')
+
+def _flag(value):
+    return 'y' if (value or '').strip().lower() in TRUE_VALUES else ''
+
+def _form_errors(form):
+    return [f"{getattr(form, name).label.text}: {errors[0]}" for name, errors in form.errors.items()]
+
+class BaseImporter:
+    """Validates rows with an import form and writes them in chunks.
+
+    Subclasses turn a row into a validated form (`validate`) and write a chunk of
+    validated forms (`write_chunk`). A chunk's outcomes are counted with `count`
+    and only added to the report once the chunk is saved (`chunk_saved`).
+    """
+    kind = None
+
+    def __init__(self, created_by_id, dry_run=True, chunk_size=CHUNK_SIZE):
+        self.created_by_id = created_by_id
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+        self.report = ImportReport(self.kind, dry_run)
+        self.pending = {}
+        brands = reference_data.get_brands()
+        companies = reference_data.get_companies()
+        self.companies_by_name = {c.name.strip().lower(): c for c in companies}
+        self.companies_by_id = {c.id: c for c in companies}
+        self.brands_by_id = {b.id: b for b in brands}
+        self.brand_ids = {(b.company_name.strip().lower(), b.name.strip().lower()): b.id for b in brands}
+        self.brands_by_label = {}
+        for b in brands:
+            self.brands_by_label.setdefault(b.name.strip().lower(), []).append(b)
+
+    def run(self, rows):
+        chunk = []
+        for line, row in rows:
+            self.report.rows += 1
+            row = {k.strip(): (v or '').strip() for k, v in row.items() if k}
+            try:
+                form = self.validate(row)
+            except ValueError as e:
+                self.report.add_error(line, [str(e)])
+                continue
+            if form.errors:
+                self.report.add_error(line, _form_errors(form))
+                continue
+            chunk.append((line, row, form))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        if chunk:
+            self._flush(chunk)
+        return self.report
+
+    def validate(self, row):
+        raise NotImplementedError
+
+    def write_chunk(self, chunk):
+        raise NotImplementedError
+
+    def count(self, outcome):
+        """Count a row of the current chunk as 'created', 'updated' or 'unchanged'"""
+        self.pending[outcome] = self.pending.get(outcome, 0) + 1
+
+    def chunk_saved(self):
+        """Called once the current chunk is committed (or, in a dry run, rolled back as planned)"""
+        for outcome, rows in self.pending.items():
+            setattr(self.report, outcome, getattr(self.report, outcome) + rows)
+
+    def _flush(self, chunk):
+        self.pending = {}
+        try:
+            self.write_chunk(chunk)
+            if self.dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            first_line = chunk[0][0]
+            last_line = chunk[-1][0]
+            self.report.add_error(first_line, [f'Rows {first_line}-{last_line} were not saved: {e}'])
+        else:
+            self.chunk_saved()
+
+    def resolve_company(self, name):
+        company = self.companies_by_name.get(name.lower())
+        if not company:
+            raise ValueError(f'Unknown company "{name}".')
+        return company
+
+    def resolve_brand(self, label, company_name=''):
+        """Find a brand by name and company, or by the "Brand (Company)" export label"""
+        if not company_name and label.endswith(')') and ' (' in label:
+            label, company_name = label[:-1].rsplit(' (', 1)
+        if company_name:
+            brand_id = self.brand_ids.get((company_name.lower(), label.lower()))
+            if brand_id is None:
+                raise ValueError(f'Unknown brand "{label}" for company "{company_name}".')
+            return brand_id
+        matches = self.brands_by_label.get(label.lower(), [])
+        if len(matches) != 1:
+            if matches:
+                raise ValueError(f'Brand "{label}" exists for several companies; add the company name.')
+            raise ValueError(f'Unknown brand "{label}".')
+        return matches[0].id
+
+class ContactImporter(BaseImporter):
+    """Upserts contacts by email. Columns match the contacts export."""
+    kind = 'contacts'
+
+    def validate(self, row):
+        birthday_month, birthday_day = '0', ''
+        birthday = row.get('Birthday', '')
+        if birthday:
+            try:
+                month, day = birthday.split('-')[-2:]
+                birthday_month, birthday_day = str(int(month)), str(int(day))
+            except ValueError:
+                raise ValueError(f'Birthday "{birthday}" must be in MM-DD format.')
+
+        brand_ids = []
+        for label in filter(None, (b.strip() for b in row.get('Brands', '').split(','))):
+            brand_ids.append(self.resolve_brand(label))
+
+        form = ContactImportForm(formdata=MultiDict({
+            'first_name': row.get('First Name', ''),
+            'last_name': row.get('Last Name', ''),
+            'email': row.get('Email', ''),
+            'phone': row.get('Phone', ''),
+            'linkedin_url': row.get('LinkedIn', ''),
+            'birthday_month': birthday_month,
+            'birthday_day': birthday_day,
+            'responsibility_description': row.get('Responsibility', ''),
+            'should_get_gift': _flag(row.get('Should Get Gift')),
+            'receive_newsletter': _flag(row.get('Newsletter')),
+            'status': (row.get('Status') or 'active').lower()
+        }), meta={'csrf': False})
+        form.validate()
+        form.brand_ids = brand_ids
+        return form
+
+    def write_chunk(self, chunk):
+        emails = {form.email.data.lower() for _, _, form in chunk}
+        existing = {c.email.lower(): c for c in
+                    ClientContact.query.filter(db.func.lower(ClientContact.email).in_(emails)).all()}
+        brands = {b.id: b for b in Brand.query.filter(
+            Brand.id.in_({bid for _, _, form in chunk for bid in form.brand_ids})).all()}
+
+        for _, _, form in chunk:
+            contact = existing.get(form.email.data.lower())
+            if contact is None:
+                contact = ClientContact(email=form.email.data)
+                db.session.add(contact)
+                existing[form.email.data.lower()] = contact
+                self.count('created')
+            else:
+                self.count('updated')
+
+            contact.first_name = form.first_name.data
+            contact.last_name = form.last_name.data
+            contact.phone = form.phone.data
+            contact.linkedin_url = form.linkedin_url.data
+            contact.birthday_month = form.birthday_month.data if form.birthday_month.data != 0 else None
+            contact.birthday_day = form.birthday_day.data
+            if form.responsibility_description.data:
+                contact.responsibility_description = form.responsibility_description.data
+            contact.should_get_gift = form.should_get_gift.data
+            contact.receive_newsletter = form.receive_newsletter.data
+            contact.status = form.status.data
+            for brand_id in form.brand_ids:
+                brand = brands.get(brand_id)
+                if brand and brand not in contact.brands:
+                    contact.brands.append(brand)
+        db.session.flush()
+
+class BrandImporter(BaseImporter):
+    """Creates brands or updates their status. Columns match the brands export."""
+    kind = 'brands'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.company_choices = [(c.id, c.name) for c in reference_data.get_companies() if c.status == 'active']
+        # Brands created by the current chunk; they join brand_ids once the chunk is saved
+        self.new_brand_ids = {}
+
+    def chunk_saved(self):
+        super().chunk_saved()
+        self.brand_ids.update(self.new_brand_ids)
+
+    def validate(self, row):
+        company_name = row.get('Company', '')
+        company = self.resolve_company(company_name) if company_name else None
+        form = BrandImportForm(self.company_choices, formdata=MultiDict({
+            'name': row.get('Brand', ''),
+            'company_id': str(company.id) if company else '',
+            'status': (row.get('Status') or 'active').lower()
+        }), meta={'csrf': False})
+        form.validate()
+        return form
+
+    def write_chunk(self, chunk):
+        self.new_brand_ids = {}
+        keys = []
+        for _, _, form in chunk:
+            company = self.companies_by_id[form.company_id.data]
+            keys.append((company.name.strip().lower(), form.name.data.strip().lower()))
+        existing = {b.id: b for b in Brand.query.filter(
+            Brand.id.in_({self.brand_ids[k] for k in keys if self.brand_ids.get(k)})).all()}
+
+        for key, (_, _, form) in zip(keys, chunk):
+            if key not in self.brand_ids and key not in self.new_brand_ids:
+                brand = Brand(name=form.name.data, company_id=form.company_id.data, status=form.status.data)
+                db.session.add(brand)
+                db.session.flush()
+                # A dry run rolls the row back, so later duplicates only need to know it exists
+                self.new_brand_ids[key] = None if self.dry_run else brand.id
+                self.count('created')
+                continue
+            if key in self.new_brand_ids:
+                # Listed again in this chunk; the first row created it
+                self.count('unchanged')
+                continue
+
+            brand = existing.get(self.brand_ids[key])
+            if brand is not None and brand.status != form.status.data:
+                brand.status = form.status.data
+                self.count('updated')
+            else:
+                self.count('unchanged')
+
+class InvoiceImporter(BaseImporter):
+    """Adds invoices, skipping rows identical to an existing invoice.
+
+    Columns: Company, Brand, Invoice To (defaults to the brand company),
+    Invoice Date, Total Amount, Description.
+    """
+    kind = 'invoices'
+
+    def validate(self, row):
+        brand_id = self.resolve_brand(row.get('Brand', ''), row.get('Company', ''))
+        brand_company_id = self.brands_by_id[brand_id].company_id
+        invoice_to = row.get('Invoice To', '')
+        company_id = self.resolve_company(invoice_to).id if invoice_to else brand_company_id
+
+        form = InvoiceImportForm(formdata=MultiDict({
+            'company_id': str(company_id),
+            'invoice_date': row.get('Invoice Date', ''),
+            'short_info': row.get('Description', ''),
+            'total_amount': row.get('Total Amount', '').replace(',', '.')
+        }), meta={'csrf': False})
+        # Same choices as new_invoice: the brand company and its subcompanies
+        form.company_id.choices = [(c.id, c.name) for c in self.companies_by_id.values()
+                                   if c.id == brand_company_id or c.parent_company_id == brand_company_id]
+        form.validate()
+        form.brand_id = brand_id
+        return form
+
+    def write_chunk(self, chunk):
+        brand_ids = {form.brand_id for _, _, form in chunk}
+        dates = {form.invoice_date.data for _, _, form in chunk}
+        existing = {(i.brand_id, i.company_id, i.invoice_date, Decimal(i.total_amount))
+                    for i in db.session.query(Invoice.brand_id, Invoice.company_id,
+                                              Invoice.invoice_date, Invoice.total_amount)
+                    .filter(Invoice.brand_id.in_(brand_ids), Invoice.invoice_date.in_(dates))}
+
+        for _, _, form in chunk:
+            key = (form.brand_id, form.company_id.data, form.invoice_date.data, Decimal(form.total_amount.data))
+            if key in existing:
+                self.count('unchanged')
+                continue
+            existing.add(key)
+            db.session.add(Invoice(
+                brand_id=form.brand_id,
+                company_id=form.company_id.data,
+                invoice_date=form.invoice_date.data,
+                short_info=form.short_info.data,
+                total_amount=form.total_amount.data,
+                created_by_id=self.created_by_id
+            ))
+            self.count('created')
+        db.session.flush()
+
+IMPORTERS = {
+    'contacts': ContactImporter,
+    'brands': BrandImporter,
+    'invoices': InvoiceImporter
+}
+
+def run_import(kind, stream, filename, created_by_id, dry_run=True):
+    """Import a file of the given kind and return an ImportReport"""
+    importer = IMPORTERS[kind](created_by_id, dry_run=dry_run)
+    return importer.run(iter_rows(stream, filename))
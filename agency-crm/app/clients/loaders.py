@@ -0,0 +1,55 @@
+"""Loader options for the client pages, named after what they render.
+
+Each preset loads everything its template walks, so rendering it does not
+trigger a lazy load per row: collections with selectinload (one extra
+query per collection, whatever its length) and single related rows with
+joinedload. Pass them to a query with `.options(*PRESET)`.
+check_query_counts.py renders the pages against seeded data and fails
+when one runs more queries than its budget.
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from app.models import (Company, Brand, BrandTeam, Commitment, PlanningInfo, KeyMeeting, KeyLink,
+                        StatusUpdate, Invoice)
+
+COMPANY_PAGE = (
+    selectinload(Company.brands).selectinload(Brand.team_members),
+    selectinload(Company.agreements),
+    selectinload(Company.commitments).joinedload(Commitment.media_group),
+    selectinload(Company.subcompanies),
+)
+
+# The rest of the brand page is loaded by section, with the presets below
+BRAND_PAGE = (
+    joinedload(Brand.company),
+)
+
+BRAND_TEAM = (
+    joinedload(BrandTeam.team_member),
+)
+
+PLANNING_HISTORY = (
+    joinedload(PlanningInfo.created_by),
+    selectinload(PlanningInfo.attachments),
+)
+
+MEETING_HISTORY = (
+    joinedload(KeyMeeting.created_by),
+    selectinload(KeyMeeting.attachments),
+)
+
+KEY_LINKS = (
+    joinedload(KeyLink.created_by),
+)
+
+COMMITMENTS = (
+    joinedload(Commitment.media_group),
+)
+
+STATUS_HISTORY = (
+    joinedload(StatusUpdate.created_by),
+)
+
+INVOICE_HISTORY = (
+    joinedload(Invoice.company),
+    selectinload(Invoice.attachments),
+)
@@ -1,23 +1,36 @@
-import os
 from datetime import datetime, timedelta
-from flask import render_template, redirect, url_for, flash, request, current_app, send_from_directory, abort, Response
+from flask import render_template, redirect, url_for, flash, request, current_app, abort, jsonify
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from wtforms import SelectField
 from wtforms.validators import DataRequired
 from app.clients import bp
-from openpyxl import Workbook
-from io import BytesIO
 from app.clients.forms import (CompanyForm, AgreementForm, BrandForm, ClientContactForm, 
                               BrandTeamForm, PlanningInfoForm, CommitmentForm, 
                               StatusUpdateForm, MediaGroupForm, KeyMeetingForm, KeyLinkForm, GiftForm,
                               TaskTemplateForm, BrandTaskForm, TaskCompletionForm, SubcompanyForm, InvoiceForm,
-                              SubbrandForm)
+                              SubbrandForm, ImportForm)
 from app.models import (Company, Agreement, Brand, ClientContact, BrandTeam, 
                        PlanningInfo, Commitment, StatusUpdate, MediaGroup, User,
                        KeyMeeting, KeyLink, PlanningAttachment, MeetingAttachment, Gift,
-                       TaskTemplate, BrandTask, TaskCompletion, Invoice, InvoiceAttachment, Subbrand)
+                       TaskTemplate, BrandTask, TaskCompletion, Invoice, InvoiceAttachment, Subbrand,
+                       ExportJob, ChunkedUpload)
 from app import db
+from app import reference_data
+from app.storage import save_upload, send_stored_file
+from app.upload_pipeline import UploadRejected
+from app.storage_backends import get_backend
+from app.previews import send_preview
+from app.search import search_documents, snippet_html
+from app.clients.imports import ImportFileError, run_import
+from app.clients.exports import EXPORTS, export_response, available_formats, brand_query
+from app.clients.export_jobs import request_export, artifact_key
+from app.clients import loaders
+from app.clients.brand_sections import SECTIONS, section_page
+from app.clients.archives import zip_response, invoice_entries, brand_entries, invoices_entries
+from app.db_routing import read_only
+from app.clients.uploads import (UploadError, TARGETS, start_upload, write_chunk, finalize_upload,
+                                 abort_upload, owner_url)
 from app.webhook_helper import (notify_company_created, notify_brand_created, 
                                 notify_contact_created, notify_contact_updated, notify_status_update_created)
 
@@ -37,7 +50,7 @@ def companies():
 def new_company():
     form = CompanyForm()
     # Get list of companies for parent company selection
-    form.parent_company_id.choices = [(0, 'None')] + [(c.id, c.name) for c in Company.query.order_by(Company.name).all()]
+    form.parent_company_id.choices = [(0, 'None')] + [(c.id, c.name) for c in reference_data.get_companies()]
     
     if form.validate_on_submit():
         company = Company(
@@ -63,7 +76,7 @@ def new_company():
 @bp.route('/company/<int:company_id>')
 @login_required
 def company_detail(company_id):
-    company = Company.query.get_or_404(company_id)
+    company = Company.query.options(*loaders.COMPANY_PAGE).filter_by(id=company_id).first_or_404()
     return render_template('clients/company_detail.html', company=company, datetime=datetime)
 
 @bp.route('/company/<int:company_id>/edit', methods=['GET', 'POST'])
@@ -75,7 +88,7 @@ def edit_company(company_id):
     # Get list of companies for parent company selection, excluding current company and its subcompanies
     exclude_ids = [company.id] + [s.id for s in company.subcompanies]
     parent_choices = [(0, 'None')]
-    parent_choices += [(c.id, c.name) for c in Company.query.filter(~Company.id.in_(exclude_ids)).order_by(Company.name).all()]
+    parent_choices += [(c.id, c.name) for c in reference_data.get_companies() if c.id not in exclude_ids]
     form.parent_company_id.choices = parent_choices
     
     if form.validate_on_submit():
@@ -138,17 +151,18 @@ def upload_agreement(company_id):
     
     if form.validate_on_submit():
         if form.file.data:
-            filename = secure_filename(form.file.data.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{company_id}_{timestamp}_{filename}"
-            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            form.file.data.save(file_path)
+            try:
+                blob = save_upload(form.file.data)
+            except UploadRejected as e:
+                flash(f'{form.file.data.filename} was not uploaded: {e}', 'error')
+                return render_template('clients/upload_agreement.html', form=form, company=company)
             
             agreement = Agreement(
                 company_id=company_id,
                 type=form.type.data,
                 filename=form.file.data.filename,
-                file_path=filename,
+                file_path=blob.path,
+                blob_sha256=blob.sha256,
                 valid_until=form.valid_until.data,
                 uploaded_by_id=current_user.id
             )
@@ -162,7 +176,8 @@ def upload_agreement(company_id):
 @bp.route('/brands')
 @login_required
 def brands():
-    brands = Brand.query.join(Company).order_by(Company.name, Brand.name).all()
+    # (brand, last update date, last evaluation) rows, the latest update picked in the database
+    brands = brand_query({}).all()
     return render_template('clients/brands.html', brands=brands)
 
 @bp.route('/brand/new', methods=['GET', 'POST'])
@@ -194,9 +209,21 @@ def new_brand():
 @bp.route('/brand/<int:brand_id>')
 @login_required
 def brand_detail(brand_id):
-    brand = Brand.query.get_or_404(brand_id)
+    # Only the brand and its company; the sections load separately from brand_section
+    brand = Brand.query.options(*loaders.BRAND_PAGE).filter_by(id=brand_id).first_or_404()
     return render_template('clients/brand_detail.html', brand=brand)
 
+@bp.route('/brand/<int:brand_id>/section/<section>')
+@login_required
+def brand_section(brand_id, section):
+    if section not in SECTIONS:
+        abort(404)
+    brand = Brand.query.get_or_404(brand_id)
+    page = request.args.get('page', 1, type=int)
+    pagination = section_page(brand, section, page)
+    return render_template(f'clients/brand_sections/{section}.html', brand=brand, section=section,
+                           pagination=pagination)
+
 @bp.route('/brand/<int:brand_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_brand(brand_id):
@@ -332,16 +359,17 @@ def planning_info(brand_id):
         if form.attachments.data:
             for file in form.attachments.data:
                 if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    filename = f"planning_{planning.id}_{timestamp}_{filename}"
-                    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                    file.save(file_path)
+                    try:
+                        blob = save_upload(file)
+                    except UploadRejected as e:
+                        flash(f'{file.filename} was not uploaded: {e}', 'error')
+                        continue
                     
                     attachment = PlanningAttachment(
                         planning_info_id=planning.id,
                         filename=file.filename,
-                        file_path=filename
+                        file_path=blob.path,
+                        blob_sha256=blob.sha256
                     )
                     db.session.add(attachment)
         
@@ -410,8 +438,8 @@ def contacts():
     contacts = pagination.items
     
     # Get all brands and companies for filter dropdowns
-    brands = Brand.query.join(Company).order_by(Company.name, Brand.name).all()
-    companies = Company.query.order_by(Company.name).all()
+    brands = reference_data.get_brands()
+    companies = reference_data.get_companies()
     
     return render_template('clients/contacts.html', 
                          contacts=contacts,
@@ -601,16 +629,17 @@ def add_meeting(brand_id):
         if form.attachments.data:
             for file in form.attachments.data:
                 if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    filename = f"meeting_{meeting.id}_{timestamp}_{filename}"
-                    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                    file.save(file_path)
+                    try:
+                        blob = save_upload(file)
+                    except UploadRejected as e:
+                        flash(f'{file.filename} was not uploaded: {e}', 'error')
+                        continue
                     
                     attachment = MeetingAttachment(
                         meeting_id=meeting.id,
                         filename=file.filename,
-                        file_path=filename
+                        file_path=blob.path,
+                        blob_sha256=blob.sha256
                     )
                     db.session.add(attachment)
         
@@ -640,10 +669,91 @@ def add_link(brand_id):
     
     return render_template('clients/link_form.html', form=form, brand=brand)
 
-@bp.route('/uploads/<filename>')
+@bp.route('/uploads/<path:filename>')
 @login_required
 def uploaded_file(filename):
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
+    # Stored files are named by hash; the link carries the original name for "Save as"
+    return send_stored_file(filename, download_name=request.args.get('name'))
+
+@bp.route('/previews/<sha256>.jpg')
+@login_required
+def attachment_preview(sha256):
+    return send_preview(sha256)
+
+@bp.route('/large-upload')
+@login_required
+def large_upload():
+    target = request.args.get('target')
+    if target not in TARGETS:
+        abort(404)
+    model = TARGETS[target][0]
+    record = model.query.get_or_404(request.args.get('target_id', type=int))
+    if target == 'agreement':
+        back_url = url_for('clients.company_detail', company_id=record.id)
+    else:
+        back_url = url_for('clients.brand_detail', brand_id=record.brand_id)
+    return render_template('clients/large_upload.html', target=target, record=record, back_url=back_url,
+                           agreement_types=AgreementForm().type.choices,
+                           chunk_size=current_app.config['CHUNKED_UPLOAD_CHUNK_SIZE'],
+                           max_size=current_app.config['CHUNKED_UPLOAD_MAX_SIZE'])
+
+def _upload_json(upload):
+    return {
+        'id': upload.id,
+        'filename': upload.filename,
+        'size': upload.size,
+        'received_size': upload.received_size,
+        'status': upload.status,
+        'error': upload.error,
+        'chunk_size': current_app.config['CHUNKED_UPLOAD_CHUNK_SIZE'],
+        'redirect_url': owner_url(upload) if upload.status == 'done' else None
+    }
+
+def _own_upload(upload_id):
+    upload = ChunkedUpload.query.get_or_404(upload_id)
+    if upload.created_by_id != current_user.id:
+        abort(404)
+    return upload
+
+@bp.errorhandler(UploadError)
+def handle_upload_error(error):
+    return jsonify({'error': str(error)}), error.status
+
+@bp.route('/chunked-uploads', methods=['POST'])
+@login_required
+def start_chunked_upload():
+    upload = start_upload(request.get_json(silent=True) or {}, current_user.id)
+    return jsonify(_upload_json(upload)), 201
+
+@bp.route('/chunked-uploads/<upload_id>')
+@login_required
+def chunked_upload_status(upload_id):
+    upload = _own_upload(upload_id)
+    if upload.status == 'done':
+        # Shown on the page the client goes to once it sees the upload is done
+        flash(f'{upload.filename} uploaded successfully!', 'success')
+    return jsonify(_upload_json(upload))
+
+@bp.route('/chunked-uploads/<upload_id>', methods=['PUT'])
+@login_required
+def upload_chunk(upload_id):
+    upload = _own_upload(upload_id)
+    write_chunk(upload, request.stream, request.headers.get('Content-Range'),
+                request.headers.get('X-Chunk-SHA256'))
+    return jsonify(_upload_json(upload))
+
+@bp.route('/chunked-uploads/<upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_chunked_upload(upload_id):
+    upload = finalize_upload(_own_upload(upload_id), (request.get_json(silent=True) or {}).get('sha256'))
+    # Checked and stored by the upload worker; the client polls the upload until it is done or failed
+    return jsonify(_upload_json(upload)), 202
+
+@bp.route('/chunked-uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def abort_chunked_upload(upload_id):
+    abort_upload(_own_upload(upload_id))
+    return '', 204
 
 @bp.route('/birthdays')
 @login_required
@@ -746,7 +856,7 @@ def status_updates():
     updates = pagination.items
     
     # Get all brands for filter dropdown
-    brands = Brand.query.join(Company).order_by(Company.name, Brand.name).all()
+    brands = reference_data.get_brands()
     
     # Get all users who have created status updates for filter dropdown
     creators = db.session.query(User).join(StatusUpdate, User.id == StatusUpdate.created_by_id).distinct().order_by(User.first_name, User.last_name).all()
@@ -770,8 +880,7 @@ def new_status_update():
     form = StatusUpdateFormWithBrand()
     
     # Add brand choices to form
-    brands = Brand.query.join(Company).order_by(Company.name, Brand.name).all()
-    form.brand_id.choices = [(b.id, f"{b.name} ({b.company.name})") for b in brands]
+    form.brand_id.choices = [(b.id, f"{b.name} ({b.company_name})") for b in reference_data.get_brands()]
     
     if form.validate_on_submit():
         update = StatusUpdate(
@@ -840,7 +949,7 @@ def brand_tasks(brand_id):
     brand = Brand.query.get_or_404(brand_id)
     
     # Get all task templates
-    templates = TaskTemplate.query.order_by(TaskTemplate.name).all()
+    templates = reference_data.get_task_templates()
     
     # Get brand's current tasks
     brand_tasks = BrandTask.query.filter_by(brand_id=brand_id).all()
@@ -883,9 +992,7 @@ def new_brand_task(brand_id):
     existing_tasks = BrandTask.query.filter_by(brand_id=brand_id).all()
     assigned_template_ids = [bt.task_template_id for bt in existing_tasks]
     
-    available_templates = TaskTemplate.query.filter(
-        ~TaskTemplate.id.in_(assigned_template_ids)
-    ).order_by(TaskTemplate.name).all()
+    available_templates = [t for t in reference_data.get_task_templates() if t.id not in assigned_template_ids]
     
     form.task_template_id.choices = [(t.id, t.name) for t in available_templates]
     
@@ -1082,8 +1189,8 @@ def invoices():
     invoices = pagination.items
     
     # Get all brands and companies for filter dropdowns
-    brands = Brand.query.join(Company).order_by(Company.name, Brand.name).all()
-    companies = Company.query.order_by(Company.name).all()
+    brands = reference_data.get_brands()
+    companies = reference_data.get_companies()
     
     # Calculate total amount for current page
     page_total = sum(invoice.total_amount for invoice in invoices)
@@ -1098,6 +1205,23 @@ def invoices():
                          sort_by=sort_by,
                          page_total=page_total)
 
+@bp.route('/documents/search')
+@login_required
+def document_search():
+    query = request.args.get('q', '').strip()
+    brand_id = request.args.get('brand_id', type=int)
+    company_id = request.args.get('company_id', type=int)
+    hits = search_documents(query, brand_id=brand_id, company_id=company_id) if query else []
+    
+    return render_template('clients/document_search.html',
+                         query=query,
+                         hits=hits,
+                         snippet_html=snippet_html,
+                         brands=reference_data.get_brands(),
+                         companies=reference_data.get_companies(),
+                         selected_brand_id=brand_id,
+                         selected_company_id=company_id)
+
 @bp.route('/brand/<int:brand_id>/invoice/new', methods=['GET', 'POST'])
 @login_required
 def new_invoice(brand_id):
@@ -1128,16 +1252,17 @@ def new_invoice(brand_id):
             file_count = 0
             for file in form.files.data:
                 if file and allowed_file(file.filename):
-                    filename = secure_filename(file.filename)
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    filename = f"invoice_{invoice.id}_{timestamp}_{filename}"
-                    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                    file.save(file_path)
+                    try:
+                        blob = save_upload(file)
+                    except UploadRejected as e:
+                        flash(f'{file.filename} was not uploaded: {e}', 'error')
+                        continue
                     
                     attachment = InvoiceAttachment(
                         invoice_id=invoice.id,
                         filename=file.filename,
-                        file_path=filename
+                        file_path=blob.path,
+                        blob_sha256=blob.sha256
                     )
                     db.session.add(attachment)
                     file_count += 1
@@ -1145,7 +1270,7 @@ def new_invoice(brand_id):
                     # For backward compatibility, store first file in invoice table
                     if file_count == 1:
                         invoice.filename = file.filename
-                        invoice.file_path = filename
+                        invoice.file_path = blob.path
         
         db.session.commit()
         flash('Invoice registered successfully!', 'success')
@@ -1158,172 +1283,143 @@ def new_invoice(brand_id):
 def download_invoice(invoice_id):
     invoice = Invoice.query.get_or_404(invoice_id)
     if invoice.file_path:
-        return send_from_directory(current_app.config['UPLOAD_FOLDER'], invoice.file_path, 
-                                 as_attachment=True, download_name=invoice.filename)
+        return send_stored_file(invoice.file_path, download_name=invoice.filename, as_attachment=True)
+
+@bp.route('/invoice/<int:invoice_id>/attachments.zip')
+@login_required
+def download_invoice_zip(invoice_id):
+    invoice = Invoice.query.get_or_404(invoice_id)
+    return zip_response(invoice_entries(invoice), f"invoice_{invoice.id}_attachments.zip")
+
+@bp.route('/brand/<int:brand_id>/attachments.zip')
+@login_required
+def download_brand_zip(brand_id):
+    brand = Brand.query.get_or_404(brand_id)
+    return zip_response(brand_entries(brand), f"{secure_filename(brand.name) or 'brand'}_attachments.zip")
+
+@bp.route('/invoices/attachments.zip')
+@login_required
+def download_invoices_zip():
+    # Same filters as the invoices list page
+    params = {
+        'brand_id': request.args.get('brand_id', type=int),
+        'company_id': request.args.get('company_id', type=int)
+    }
+    return zip_response(invoices_entries(params), f"invoices_attachments_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_data():
+    form = ImportForm()
+    report = None
+    
+    if request.method == 'GET' and request.args.get('kind'):
+        form.kind.data = request.args.get('kind')
+    
+    if form.validate_on_submit():
+        try:
+            report = run_import(form.kind.data, form.file.data.stream, form.file.data.filename,
+                                current_user.id, dry_run=form.dry_run.data)
+        except ImportFileError as e:
+            flash(str(e), 'error')
+        else:
+            if report.dry_run:
+                flash('Dry run finished - nothing was saved. Review the report below.', 'info')
+            elif report.error_count:
+                flash(f'Import finished with {report.error_count} errors.', 'error')
+            else:
+                flash('Import finished successfully!', 'success')
+    
+    return render_template('clients/import.html', form=form, report=report)
+
+def _export_format(value):
+    export_format = (value or 'xlsx').lower()
+    if export_format not in available_formats():
+        abort(404)
+    return export_format
+
+@bp.context_processor
+def inject_export_formats():
+    return {'export_formats': available_formats()}
 
 @bp.route('/brands/export')
+@read_only
 @login_required
 def export_brands():
-    # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Brands"
-    
-    # Add headers
-    headers = ['Company', 'Brand', 'Subbrands', 'Status', 'Key Responsible', 'Last Update', 'Risk Level']
-    ws.append(headers)
-    
-    # Get all brands
-    brands = Brand.query.join(Company).order_by(Company.name, Brand.name).all()
-    
-    # Add data rows
-    for brand in brands:
-        # Get key responsible
-        key_responsible = None
-        for tm in brand.team_members:
-            if tm.is_key_responsible:
-                key_responsible = f"{tm.team_member.first_name} {tm.team_member.last_name}"
-                break
-        
-        # Get latest status update
-        latest_update = None
-        risk_level = None
-        if brand.status_updates:
-            latest_update = max(brand.status_updates, key=lambda x: x.date)
-            risk_level = latest_update.evaluation
-            latest_update = latest_update.date.strftime('%Y-%m-%d')
-        
-        # Get subbrands
-        subbrands = ', '.join([sb.name for sb in brand.subbrands])
-        
-        row = [
-            brand.company.name,
-            brand.name,
-            subbrands,
-            brand.status,
-            key_responsible or 'Not assigned',
-            latest_update or 'Never updated',
-            risk_level or 'No evaluation'
-        ]
-        ws.append(row)
-    
-    # Save to BytesIO object
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Return as download
-    return Response(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment; filename=brands_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'}
-    )
+    return export_response('brands', _export_format(request.args.get('format')))
 
 @bp.route('/contacts/export')
+@read_only
 @login_required
 def export_contacts():
-    # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Contacts"
-    
-    # Add headers
-    headers = ['First Name', 'Last Name', 'Email', 'Phone', 'LinkedIn', 'Birthday', 'Brands', 'Should Get Gift', 'Newsletter', 'Status']
-    ws.append(headers)
-    
-    # Get all contacts
-    contacts = ClientContact.query.order_by(ClientContact.last_name, ClientContact.first_name).all()
-    
-    # Add data rows
-    for contact in contacts:
-        # Get associated brands
-        brands = ', '.join([f"{b.name} ({b.company.name})" for b in contact.brands])
-        
-        # Format birthday
-        birthday = ''
-        if contact.birthday_month and contact.birthday_day:
-            birthday = f"{contact.birthday_month:02d}-{contact.birthday_day:02d}"
-        
-        row = [
-            contact.first_name,
-            contact.last_name,
-            contact.email,
-            contact.phone or '',
-            contact.linkedin_url or '',
-            birthday,
-            brands,
-            'Yes' if contact.should_get_gift else 'No',
-            'Yes' if contact.receive_newsletter else 'No',
-            contact.status
-        ]
-        ws.append(row)
-    
-    # Save to BytesIO object
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Return as download
-    return Response(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment; filename=contacts_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'}
-    )
+    return export_response('contacts', _export_format(request.args.get('format')))
 
 @bp.route('/companies/export')
+@read_only
 @login_required
 def export_companies():
-    # Create workbook and worksheet
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Companies"
-    
-    # Add headers
-    headers = ['Company Name', 'VAT Code', 'Registration Number', 'Address', 'Bank Account', 
-               'Agency Fees', 'Parent Company', 'Brands', 'Active Service Agreement', 
-               'Active Data Agreement', 'Status']
-    ws.append(headers)
-    
-    # Get all companies
-    companies = Company.query.order_by(Company.name).all()
-    
-    # Add data rows
-    for company in companies:
-        # Get brands
-        brands = ', '.join([b.name for b in company.brands])
-        
-        # Check agreements
-        has_service = 'No'
-        has_data = 'No'
-        for agreement in company.agreements:
-            if agreement.type == 'service' and (not agreement.valid_until or agreement.valid_until >= datetime.now().date()):
-                has_service = 'Yes'
-            elif agreement.type == 'data' and (not agreement.valid_until or agreement.valid_until >= datetime.now().date()):
-                has_data = 'Yes'
-        
-        row = [
-            company.name,
-            company.vat_code or '',
-            company.registration_number or '',
-            company.address or '',
-            company.bank_account or '',
-            company.agency_fees or '',
-            company.parent_company.name if company.parent_company else '',
-            brands,
-            has_service,
-            has_data,
-            company.status
-        ]
-        ws.append(row)
-    
-    # Save to BytesIO object
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # Return as download
-    return Response(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        headers={'Content-Disposition': f'attachment; filename=companies_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'}
-    )
\ No newline at end of file
+    return export_response('companies', _export_format(request.args.get('format')))
+
+@bp.route('/invoices/export')
+@read_only
+@login_required
+def export_invoices():
+    params = {
+        'brand_id': request.args.get('brand_id', type=int),
+        'company_id': request.args.get('company_id', type=int)
+    }
+    return export_response('invoices', _export_format(request.args.get('format')), params)
+
+@bp.route('/commitments/export')
+@read_only
+@login_required
+def export_commitments():
+    return export_response('commitments', _export_format(request.args.get('format')))
+
+@bp.route('/exports/<kind>/request', methods=['POST'])
+@login_required
+def request_export_job(kind):
+    if kind not in EXPORTS:
+        abort(404)
+    
+    params = {}
+    if kind == 'invoices':
+        params['brand_id'] = request.form.get('brand_id', type=int)
+        params['company_id'] = request.form.get('company_id', type=int)
+    
+    export_format = _export_format(request.form.get('format'))
+    job, created = request_export(kind, params, current_user.id, export_format)
+    if created:
+        flash(f'{EXPORTS[kind].title} export queued. It will be ready for download shortly.', 'success')
+    else:
+        flash(f'An identical {kind} export was requested recently - reusing it.', 'info')
+    return redirect(url_for('clients.export_jobs'))
+
+@bp.route('/exports')
+@login_required
+def export_jobs():
+    jobs = ExportJob.query.filter_by(created_by_id=current_user.id)\
+        .order_by(ExportJob.created_at.desc()).limit(20).all()
+    return render_template('clients/export_jobs.html', jobs=jobs, exports=EXPORTS)
+
+@bp.route('/export-job/<int:job_id>/status')
+@login_required
+def export_job_status(job_id):
+    job = ExportJob.query.filter_by(id=job_id, created_by_id=current_user.id).first_or_404()
+    return jsonify({
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'processed_rows': job.processed_rows,
+        'total_rows': job.total_rows,
+        'error': job.error,
+        'download_url': url_for('clients.download_export_job', job_id=job.id) if job.status == 'done' else None
+    })
+
+@bp.route('/export-job/<int:job_id>/download')
+@login_required
+def download_export_job(job_id):
+    job = ExportJob.query.filter_by(id=job_id, created_by_id=current_user.id).first_or_404()
+    if job.status != 'done':
+        abort(404)
+    return get_backend().send(artifact_key(job), as_attachment=True, download_name=job.filename)
@@ -0,0 +1,306 @@
+"""Chunked, resumable uploads for files too large for a single request.
+
+    POST   /clients/chunked-uploads                 start; JSON filename, size, target, target_id
+    GET    /clients/chunked-uploads/<id>            how much has arrived, to resume after a failure,
+                                                    and the status once finalized
+    PUT    /clients/chunked-uploads/<id>            one part; Content-Range: bytes <first>-<last>/<size>
+                                                    and optionally X-Chunk-SHA256
+    POST   /clients/chunked-uploads/<id>/finalize   JSON sha256 (optional); queues the file for checking
+    DELETE /clients/chunked-uploads/<id>            abandon
+
+Each part is copied from the request stream straight into a staging file,
+so neither a part nor the whole file is held in memory, and every request
+stays below MAX_CONTENT_LENGTH. Parts must arrive in order; a part that is
+cut off or fails its checksum is discarded and can simply be sent again.
+Finalize only queues the upload ('queued'), as reading a file of up to
+CHUNKED_UPLOAD_MAX_SIZE again would outlast the request timeout. A worker
+(`flask clients upload-worker`) runs the whole file through the upload
+checks, compares its hash with the client's checksum, moves it into the
+blob store and attaches it to its agreement, invoice or planning record;
+the client polls the status until it is 'done' or 'failed'.
+"""
+import hashlib
+import os
+import re
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app, url_for
+from app import db
+from app.clients.forms import AGREEMENT_TYPES
+from app.metrics import UPLOAD_BYTES
+from app.models import (ChunkedUpload, Company, Invoice, PlanningInfo,
+                        Agreement, InvoiceAttachment, PlanningAttachment)
+from app.storage import check_file, store_file, guess_content_type
+from app.upload_pipeline import UploadRejected
+
+COPY_SIZE = 64 * 1024
+
+CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+def _attach_agreement(upload, blob):
+    options = upload.options or {}
+    valid_until = options.get('valid_until')
+    agreement = Agreement(
+        company_id=upload.target_id,
+        type=options.get('type') or 'other',
+        filename=upload.filename,
+        file_path=blob.path,
+        blob_sha256=blob.sha256,
+        valid_until=datetime.strptime(valid_until, '%Y-%m-%d').date() if valid_until else None,
+        uploaded_by_id=upload.created_by_id
+    )
+    db.session.add(agreement)
+
+def _attach_invoice(upload, blob):
+    invoice = Invoice.query.get(upload.target_id)
+    db.session.add(InvoiceAttachment(
+        invoice_id=invoice.id,
+        filename=upload.filename,
+        file_path=blob.path,
+        blob_sha256=blob.sha256
+    ))
+    # For backward compatibility, the first file is also stored on the invoice
+    if not invoice.file_path:
+        invoice.filename = upload.filename
+        invoice.file_path = blob.path
+
+def _attach_planning(upload, blob):
+    planning = PlanningInfo.query.get(upload.target_id)
+    db.session.add(PlanningAttachment(
+        planning_info_id=planning.id,
+        filename=upload.filename,
+        file_path=blob.path,
+        blob_sha256=blob.sha256
+    ))
+
+# target -> (owning model, allowed extensions or None for ALLOWED_EXTENSIONS, attach function)
+TARGETS = {
+    'agreement': (Company, {'pdf'}, _attach_agreement),
+    'invoice': (Invoice, {'pdf', 'xlsx', 'xls'}, _attach_invoice),
+    'planning': (PlanningInfo, None, _attach_planning),
+}
+
+def owner_url(upload):
+    """The page of the record the upload is attached to"""
+    if upload.target == 'agreement':
+        return url_for('clients.company_detail', company_id=upload.target_id)
+    record = TARGETS[upload.target][0].query.get(upload.target_id)
+    return url_for('clients.brand_detail', brand_id=record.brand_id) if record else None
+
+def staging_folder():
+    folder = current_app.config['CHUNKED_UPLOAD_FOLDER'] or \
+        os.path.join(current_app.config['UPLOAD_FOLDER'], '.chunks')
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+def staging_path(upload):
+    return os.path.join(staging_folder(), upload.id)
+
+def _agreement_options(data):
+    """The agreement fields, checked now so that finalize cannot fail once the file is in the blob store"""
+    agreement_type = data.get('type') or 'other'
+    types = [value for value, _ in AGREEMENT_TYPES]
+    if agreement_type not in types:
+        raise UploadError(f"type must be one of {', '.join(types)}")
+    valid_until = data.get('valid_until') or None
+    if valid_until:
+        try:
+            datetime.strptime(valid_until, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            raise UploadError('valid_until must be a date in YYYY-MM-DD format')
+    return {'type': agreement_type, 'valid_until': valid_until}
+
+def start_upload(data, user_id):
+    """Validate an upload request and record it; returns the ChunkedUpload"""
+    filename = (data.get('filename') or '').strip()
+    target = data.get('target')
+    try:
+        size = int(data.get('size'))
+        target_id = int(data.get('target_id'))
+    except (TypeError, ValueError):
+        raise UploadError('size and target_id must be integers')
+
+    if target not in TARGETS:
+        raise UploadError(f"target must be one of {', '.join(sorted(TARGETS))}")
+    model, extensions, _ = TARGETS[target]
+    if model.query.get(target_id) is None:
+        raise UploadError(f'No {target} with id {target_id}', 404)
+
+    extensions = extensions or current_app.config['ALLOWED_EXTENSIONS']
+    if '.' not in filename or filename.rsplit('.', 1)[1].lower() not in extensions:
+        raise UploadError(f"Allowed file types: {', '.join(sorted(extensions))}")
+    if size <= 0 or size > current_app.config['CHUNKED_UPLOAD_MAX_SIZE']:
+        raise UploadError(f"size must be between 1 and {current_app.config['CHUNKED_UPLOAD_MAX_SIZE']} bytes", 413)
+
+    options = {}
+    if target == 'agreement':
+        options = _agreement_options(data)
+
+    upload = ChunkedUpload(
+        id=uuid.uuid4().hex,
+        filename=filename,
+        content_type=guess_content_type(filename, data.get('content_type')),
+        size=size,
+        received_size=0,
+        target=target,
+        target_id=target_id,
+        options=options,
+        status='open',
+        created_by_id=user_id
+    )
+    db.session.add(upload)
+    db.session.commit()
+    open(staging_path(upload), 'wb').close()
+    return upload
+
+def write_chunk(upload, stream, content_range, chunk_sha256=None):
+    """Append one part from the request stream to the staging file"""
+    if upload.status != 'open':
+        raise UploadError(f'Upload is {upload.status}', 409)
+
+    match = CONTENT_RANGE.match(content_range or '')
+    if not match:
+        raise UploadError('Content-Range header must look like "bytes <first>-<last>/<size>"')
+    first, last, total = (int(g) for g in match.groups())
+    if total != upload.size or last < first or last >= total:
+        raise UploadError('Content-Range does not fit this upload')
+    if first != upload.received_size:
+        raise UploadError(f'Expected the part starting at byte {upload.received_size}', 409)
+
+    expected = last - first + 1
+    digest = hashlib.sha256()
+    written = 0
+    with open(staging_path(upload), 'r+b') as f:
+        # Drop whatever a previous, interrupted attempt left behind
+        f.seek(first)
+        f.truncate()
+        while written < expected:
+            chunk = stream.read(min(COPY_SIZE, expected - written))
+            if not chunk:
+                break
+            f.write(chunk)
+            digest.update(chunk)
+            written += len(chunk)
+
+        problem = None
+        if written != expected or stream.read(1):
+            problem = f'Part has {written} bytes, Content-Range says {expected}'
+        elif chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+            problem = 'Part checksum does not match X-Chunk-SHA256'
+        if problem:
+            f.truncate(first)
+            raise UploadError(problem)
+
+    upload.received_size = last + 1
+    db.session.commit()
+    UPLOAD_BYTES.labels('chunked').inc(written)
+    return upload
+
+def finalize_upload(upload, sha256=None):
+    """Queue a completely received upload for the upload worker"""
+    if upload.status != 'open':
+        raise UploadError(f'Upload is {upload.status}', 409)
+    if upload.received_size != upload.size:
+        raise UploadError(f'Only {upload.received_size} of {upload.size} bytes received', 409)
+    model, _, _ = TARGETS[upload.target]
+    if model.query.get(upload.target_id) is None:
+        raise UploadError(f'The {upload.target} was deleted during the upload', 404)
+
+    if sha256:
+        upload.options = dict(upload.options or {}, sha256=sha256.lower())
+    upload.status = 'queued'
+    db.session.commit()
+    return upload
+
+def claim_next_upload():
+    """Atomically move the oldest queued upload to checking and return it"""
+    while True:
+        upload = ChunkedUpload.query.filter_by(status='queued').order_by(ChunkedUpload.updated_at).first()
+        if upload is None:
+            return None
+        claimed = ChunkedUpload.query.filter_by(id=upload.id, status='queued').update(
+            {'status': 'checking', 'updated_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            db.session.refresh(upload)
+            return upload
+
+def _fail(upload, error):
+    path = staging_path(upload)
+    if os.path.exists(path):
+        os.remove(path)
+    upload.status = 'failed'
+    upload.error = error
+    db.session.commit()
+    return upload
+
+def check_upload(upload):
+    """Verify the complete file, store it and attach it; the upload ends up 'done' or 'failed'"""
+    path = staging_path(upload)
+    expected = (upload.options or {}).get('sha256')
+    try:
+        results = check_file(path, upload.filename, current_app.config['CHUNKED_UPLOAD_MAX_SIZE'])
+        actual = results['sha256']
+        if expected and expected != actual:
+            raise UploadRejected(f'Checksum mismatch: expected {expected}, got {actual}')
+    except UploadRejected as e:
+        return _fail(upload, str(e))
+
+    model, _, attach = TARGETS[upload.target]
+    if model.query.get(upload.target_id) is None:
+        return _fail(upload, f'The {upload.target} was deleted during the upload')
+
+    blob = store_file(path, upload.content_type, actual, results)
+    attach(upload, blob)
+    upload.status = 'done'
+    upload.blob_sha256 = actual
+    db.session.commit()
+    return upload
+
+def run_worker(once=False, poll_seconds=None):
+    """Check and store finalized uploads until interrupted (or none is left with once=True)"""
+    poll_seconds = poll_seconds or current_app.config['EXPORT_WORKER_POLL_SECONDS']
+    while True:
+        upload = claim_next_upload()
+        if upload is not None:
+            current_app.logger.info(f"Checking upload {upload.id} ({upload.filename})")
+            try:
+                check_upload(upload)
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"Upload {upload.id} failed: {e}")
+                _fail(upload, 'The file could not be stored.')
+            continue
+        if once:
+            return
+        db.session.remove()
+        time.sleep(poll_seconds)
+
+# Uploads that are not finished yet
+UNFINISHED = ('open', 'queued', 'checking')
+
+def abort_upload(upload):
+    if os.path.exists(staging_path(upload)):
+        os.remove(staging_path(upload))
+    if upload.status in UNFINISHED:
+        upload.status = 'aborted'
+    db.session.commit()
+
+def expire_uploads(now=None):
+    """Abort uploads left unfinished for CHUNKED_UPLOAD_EXPIRE_HOURS; returns the count
+
+    Besides uploads whose parts stopped arriving, that covers uploads never checked because no upload
+    worker ran, and those whose worker stopped while checking them.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=current_app.config['CHUNKED_UPLOAD_EXPIRE_HOURS'])
+    stale = ChunkedUpload.query.filter(ChunkedUpload.status.in_(UNFINISHED), ChunkedUpload.updated_at < cutoff).all()
+    for upload in stale:
+        abort_upload(upload)
+    return len(stale)
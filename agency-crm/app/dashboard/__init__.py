@@ -1,5 +1,6 @@
 from flask import Blueprint
+from app.db_routing import read_only_blueprint
 
-bp = Blueprint('dashboard', __name__)
+bp = read_only_blueprint(Blueprint('dashboard', __name__))
 
 from app.dashboard import routes
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""Send the queries of read-only requests to a read replica.
+
+With DATABASE_REPLICA_URL set, GET requests to views marked with
+@read_only, or to blueprints passed to read_only_blueprint(), run their
+SELECTs on the replica. That covers the dashboard, the exports and the
+API, so long reports do not compete with data entry on the primary.
+Everything else stays on the primary:
+- flushes, UPDATE/DELETE/INSERT statements and text() SQL, even within a
+  read-only request,
+- queries outside a request (workers and commands),
+- reads by a logged-in user for READ_REPLICA_STICKY_SECONDS after one of
+  their requests wrote something, so they see their own changes even while
+  the replica lags behind.
+"""
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session
+from flask_login import current_user
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+READ_ONLY_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+LAST_WRITE_KEY = '_db_last_write'
+
+_read_only_blueprints = set()
+
+def read_only(view):
+    """Mark a view whose GET requests may read from the replica"""
+    view.read_replica = True
+    return view
+
+def read_only_blueprint(blueprint):
+    """Mark every view of a blueprint as read_only; its POST views still use the primary"""
+    _read_only_blueprints.add(blueprint.name)
+    return blueprint
+
+def _use_replica():
+    return has_request_context() and g.get('db_replica', False)
+
+@contextmanager
+def primary():
+    """Run the queries inside the block on the primary, also in a read-only request"""
+    use_replica = g.get('db_replica', False)
+    g.db_replica = False
+    try:
+        yield
+    finally:
+        g.db_replica = use_replica
+
+class RoutingSession(Session):
+    """Session that picks the replica engine for SELECTs of read-only requests"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g.db_wrote = True
+            elif isinstance(clause, Select) and _use_replica():
+                replica = self._db.engines.get(REPLICA_BIND)
+                if replica is not None:
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def _choose_engine():
+    g.db_replica = False
+    if request.method not in READ_ONLY_METHODS or request.endpoint is None:
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, 'read_replica', False) and request.blueprint not in _read_only_blueprints:
+        return
+    if time.time() - session.get(LAST_WRITE_KEY, 0) < current_app.config['READ_REPLICA_STICKY_SECONDS']:
+        return
+    g.db_replica = True
+
+def _remember_write(response):
+    # Kept in the user's session cookie; API clients have no session to keep it in
+    if g.get('db_wrote') and current_user.is_authenticated:
+        session[LAST_WRITE_KEY] = time.time()
+    return response
+
+def init_app(app):
+    if REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+        app.before_request(_choose_engine)
+        app.after_request(_remember_write)
@@ -0,0 +1,92 @@
+"""Prometheus metrics, served at /metrics.
+
+Counters and histograms are kept in each process with prometheus_client.
+Under gunicorn, every worker writes its values to memory-mapped files in
+PROMETHEUS_MULTIPROC_DIR (set up by gunicorn.conf.py) and /metrics adds up
+the files of all workers, so whichever worker answers the scrape reports
+the whole server. Background workers (export, preview, index) started with
+the same PROMETHEUS_MULTIPROC_DIR are included too. Without it, /metrics
+reports the one process it runs in, which suits the development server.
+
+Request latency covers the view and after_request hooks; for streamed
+responses (CSV exports, downloads) it ends when streaming starts. The
+query counts come from app/sql_stats.py, so they need SQL_STATS.
+
+The metrics name API key ids, endpoints and request volumes, so /metrics
+requires METRICS_TOKEN as a bearer token, and is closed while no token is
+set. METRICS_PUBLIC=true serves it without authentication, for a scraper
+on a private network.
+"""
+import os
+import secrets
+import time
+from flask import Response, abort, current_app, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+LONG_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    'agency_crm_http_request_duration_seconds', 'Time to handle a request',
+    ['method', 'blueprint', 'endpoint'])
+HTTP_REQUESTS = Counter(
+    'agency_crm_http_requests_total', 'Requests handled, by response status',
+    ['method', 'blueprint', 'endpoint', 'status'])
+DB_QUERIES = Counter(
+    'agency_crm_db_queries_total', 'SQL statements run by requests',
+    ['blueprint', 'endpoint'])
+DB_SECONDS = Counter(
+    'agency_crm_db_query_seconds_total', 'Time requests spent waiting for SQL statements',
+    ['blueprint', 'endpoint'])
+API_REQUESTS = Counter(
+    'agency_crm_api_requests_total', "API calls by API key id ('missing' or 'invalid' when refused)",
+    ['api_key', 'endpoint'])
+WEBHOOK_SECONDS = Histogram(
+    'agency_crm_webhook_delivery_duration_seconds', 'Time to deliver a webhook, failures included',
+    ['event'])
+WEBHOOK_DELIVERIES = Counter(
+    'agency_crm_webhook_deliveries_total', "Webhook deliveries by result: 'ok' (2xx), 'http_error' or 'error'",
+    ['event', 'result'])
+EXPORT_SECONDS = Histogram(
+    'agency_crm_export_duration_seconds', "Time to write an export, as a 'download' or a 'background' job",
+    ['kind', 'format', 'mode'], buckets=LONG_BUCKETS)
+UPLOAD_BYTES = Counter(
+    'agency_crm_upload_bytes_total', "Bytes received in accepted 'form' uploads and 'chunked' upload parts",
+    ['kind'])
+
+def _labels():
+    return request.blueprint or '', request.endpoint or 'unmatched'
+
+def _start():
+    g.metrics_started = time.perf_counter()
+
+def _record(response):
+    started = g.get('metrics_started')
+    if started is None:
+        return response
+    blueprint, endpoint = _labels()
+    HTTP_REQUEST_SECONDS.labels(request.method, blueprint, endpoint).observe(time.perf_counter() - started)
+    HTTP_REQUESTS.labels(request.method, blueprint, endpoint, str(response.status_code)).inc()
+    queries = g.get('sql_queries')
+    if queries is not None:
+        DB_QUERIES.labels(blueprint, endpoint).inc(queries.count)
+        DB_SECONDS.labels(blueprint, endpoint).inc(queries.duration)
+    return response
+
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    if token:
+        if not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+    elif not current_app.config['METRICS_PUBLIC']:
+        abort(403)
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+def init_app(app):
+    app.before_request(_start)
+    app.after_request(_record)
+    app.add_url_rule('/metrics', 'metrics', metrics)
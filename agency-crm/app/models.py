@@ -1,8 +1,17 @@
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy.dialects.postgresql import JSONB
 from app import db, login_manager
 
+# JSON columns are JSONB on PostgreSQL, where GIN indexes can serve containment queries
+JSONDocument = db.JSON().with_variant(JSONB(), 'postgresql')
+
+def gin_index(name, column):
+    """GIN index on a JSONDocument column, created on PostgreSQL only"""
+    return db.Index(name, column, postgresql_using='gin', postgresql_ops={column: 'jsonb_path_ops'})\
+        .ddl_if(dialect='postgresql')
+
 @login_manager.user_loader
 def load_user(id):
     return User.query.get(int(id))
@@ -45,13 +54,14 @@ class Company(db.Model):
     bank_account = db.Column(db.String(100))
     agency_fees = db.Column(db.Text)
     status = db.Column(db.String(20), default='active')
-    parent_company_id = db.Column(db.Integer, db.ForeignKey('companies.id'))
+    parent_company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     brands = db.relationship('Brand', back_populates='company', cascade='all, delete-orphan')
     agreements = db.relationship('Agreement', back_populates='company', cascade='all, delete-orphan')
-    commitments = db.relationship('Commitment', back_populates='company', cascade='all, delete-orphan')
+    commitments = db.relationship('Commitment', back_populates='company', cascade='all, delete-orphan',
+                                  order_by='Commitment.year.desc()')
     parent_company = db.relationship('Company', remote_side=[id], backref='subcompanies')
     invoices = db.relationship('Invoice', back_populates='company', cascade='all, delete-orphan')
     
@@ -63,7 +73,7 @@ class Brand(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
-    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False, index=True)
     status = db.Column(db.String(20), default='active')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -73,12 +83,14 @@ class Brand(db.Model):
     planning_info = db.relationship('PlanningInfo', back_populates='brand', 
                                   cascade='all, delete-orphan', order_by='PlanningInfo.created_at.desc()')
     status_updates = db.relationship('StatusUpdate', back_populates='brand', 
-                                   cascade='all, delete-orphan')
+                                   cascade='all, delete-orphan',
+                                   order_by='(StatusUpdate.date.desc(), StatusUpdate.id.desc())')
     key_meetings = db.relationship('KeyMeeting', back_populates='brand', 
                                  cascade='all, delete-orphan', order_by='KeyMeeting.date.desc()')
     key_links = db.relationship('KeyLink', back_populates='brand', 
                               cascade='all, delete-orphan', order_by='KeyLink.created_at.desc()')
-    invoices = db.relationship('Invoice', back_populates='brand', cascade='all, delete-orphan')
+    invoices = db.relationship('Invoice', back_populates='brand', cascade='all, delete-orphan',
+                               order_by='(Invoice.invoice_date.desc(), Invoice.id.desc())')
     brand_tasks = db.relationship('BrandTask', back_populates='brand', cascade='all, delete-orphan')
     subbrands = db.relationship('Subbrand', back_populates='brand', cascade='all, delete-orphan')
     
@@ -95,6 +107,8 @@ class Subbrand(db.Model):
     
     brand = db.relationship('Brand', back_populates='subbrands')
     
+    __table_args__ = (db.Index('ix_subbrands_brand_name', 'brand_id', 'name'),)
+    
     def __repr__(self):
         return f'<Subbrand {self.name}>'
 
@@ -117,14 +131,20 @@ class ClientContact(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     brands = db.relationship('Brand', secondary='brand_contacts', back_populates='contacts')
-    gifts = db.relationship('Gift', back_populates='contact', cascade='all, delete-orphan')
+    gifts = db.relationship('Gift', back_populates='contact', cascade='all, delete-orphan',
+                            order_by='Gift.year.desc()')
+    
+    # Birthdays page: contacts of a month by day
+    __table_args__ = (db.Index('ix_client_contacts_birthday', 'birthday_month', 'birthday_day'),)
     
     def __repr__(self):
         return f'<ClientContact {self.first_name} {self.last_name}>'
 
 brand_contacts = db.Table('brand_contacts',
     db.Column('brand_id', db.Integer, db.ForeignKey('brands.id'), primary_key=True),
-    db.Column('contact_id', db.Integer, db.ForeignKey('client_contacts.id'), primary_key=True)
+    db.Column('contact_id', db.Integer, db.ForeignKey('client_contacts.id'), primary_key=True),
+    # The primary key covers lookups by brand; this one serves a contact's brands
+    db.Index('ix_brand_contacts_contact_id', 'contact_id')
 )
 
 class BrandTeam(db.Model):
@@ -149,12 +169,15 @@ class Agreement(db.Model):
     type = db.Column(db.String(50), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), index=True)  # Set for files in the blob store
     valid_until = db.Column(db.Date)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     uploaded_by_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     
     company = db.relationship('Company', back_populates='agreements')
     uploaded_by = db.relationship('User')
+    
+    __table_args__ = (db.Index('ix_agreements_company_type', 'company_id', 'type'),)
 
 class MediaGroup(db.Model):
     __tablename__ = 'media_groups'
@@ -179,7 +202,8 @@ class Commitment(db.Model):
     company = db.relationship('Company', back_populates='commitments')
     media_group = db.relationship('MediaGroup', back_populates='commitments')
     
-    __table_args__ = (db.UniqueConstraint('company_id', 'media_group_id', 'year'),)
+    __table_args__ = (db.UniqueConstraint('company_id', 'media_group_id', 'year'),
+                      db.Index('ix_commitments_company_year', 'company_id', 'year'))
 
 class PlanningInfo(db.Model):
     __tablename__ = 'planning_info'
@@ -194,17 +218,22 @@ class PlanningInfo(db.Model):
     brand = db.relationship('Brand', back_populates='planning_info')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
     attachments = db.relationship('PlanningAttachment', back_populates='planning_info', cascade='all, delete-orphan')
+    
+    # A brand's history, newest first, straight from the index
+    __table_args__ = (db.Index('ix_planning_info_brand_created', 'brand_id', 'created_at'),)
 
 class PlanningAttachment(db.Model):
     __tablename__ = 'planning_attachments'
     
     id = db.Column(db.Integer, primary_key=True)
-    planning_info_id = db.Column(db.Integer, db.ForeignKey('planning_info.id'), nullable=False)
+    planning_info_id = db.Column(db.Integer, db.ForeignKey('planning_info.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), index=True)  # Set for files in the blob store
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     planning_info = db.relationship('PlanningInfo', back_populates='attachments')
+    blob = db.relationship('Blob', lazy='joined', viewonly=True)
 
 class KeyMeeting(db.Model):
     __tablename__ = 'key_meetings'
@@ -219,17 +248,21 @@ class KeyMeeting(db.Model):
     brand = db.relationship('Brand', back_populates='key_meetings')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
     attachments = db.relationship('MeetingAttachment', back_populates='meeting', cascade='all, delete-orphan')
+    
+    __table_args__ = (db.Index('ix_key_meetings_brand_date', 'brand_id', 'date'),)
 
 class MeetingAttachment(db.Model):
     __tablename__ = 'meeting_attachments'
     
     id = db.Column(db.Integer, primary_key=True)
-    meeting_id = db.Column(db.Integer, db.ForeignKey('key_meetings.id'), nullable=False)
+    meeting_id = db.Column(db.Integer, db.ForeignKey('key_meetings.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), index=True)  # Set for files in the blob store
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     meeting = db.relationship('KeyMeeting', back_populates='attachments')
+    blob = db.relationship('Blob', lazy='joined', viewonly=True)
 
 class KeyLink(db.Model):
     __tablename__ = 'key_links'
@@ -243,6 +276,8 @@ class KeyLink(db.Model):
     
     brand = db.relationship('Brand', back_populates='key_links')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
+    
+    __table_args__ = (db.Index('ix_key_links_brand_created', 'brand_id', 'created_at'),)
 
 class StatusUpdate(db.Model):
     __tablename__ = 'status_updates'
@@ -257,6 +292,8 @@ class StatusUpdate(db.Model):
     
     brand = db.relationship('Brand', back_populates='status_updates')
     created_by = db.relationship('User', back_populates='status_updates')
+    
+    __table_args__ = (db.Index('ix_status_updates_brand_date', 'brand_id', 'date'),)
 
 class Gift(db.Model):
     __tablename__ = 'gifts'
@@ -305,7 +342,8 @@ class BrandTask(db.Model):
     brand = db.relationship('Brand', back_populates='brand_tasks')
     task_template = db.relationship('TaskTemplate', back_populates='brand_tasks')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
-    completions = db.relationship('TaskCompletion', back_populates='brand_task', cascade='all, delete-orphan')
+    completions = db.relationship('TaskCompletion', back_populates='brand_task', cascade='all, delete-orphan',
+                                  order_by='TaskCompletion.completion_date.desc()')
     
     __table_args__ = (db.UniqueConstraint('brand_id', 'task_template_id'),)
     
@@ -365,6 +403,8 @@ class TaskCompletion(db.Model):
     
     brand_task = db.relationship('BrandTask', back_populates='completions')
     completed_by = db.relationship('User', foreign_keys=[completed_by_id])
+    
+    __table_args__ = (db.Index('ix_task_completions_task_date', 'brand_task_id', 'completion_date'),)
 
 class Invoice(db.Model):
     __tablename__ = 'invoices'
@@ -384,17 +424,22 @@ class Invoice(db.Model):
     company = db.relationship('Company', back_populates='invoices')
     created_by = db.relationship('User', foreign_keys=[created_by_id])
     attachments = db.relationship('InvoiceAttachment', back_populates='invoice', cascade='all, delete-orphan')
+    
+    __table_args__ = (db.Index('ix_invoices_brand_invoice_date', 'brand_id', 'invoice_date'),
+                      db.Index('ix_invoices_company_invoice_date', 'company_id', 'invoice_date'))
 
 class InvoiceAttachment(db.Model):
     __tablename__ = 'invoice_attachments'
     
     id = db.Column(db.Integer, primary_key=True)
-    invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'), nullable=False)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoices.id'), nullable=False, index=True)
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('blobs.sha256'), index=True)  # Set for files in the blob store
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     invoice = db.relationship('Invoice', back_populates='attachments')
+    blob = db.relationship('Blob', lazy='joined', viewonly=True)
 
 class APIKey(db.Model):
     __tablename__ = 'api_keys'
@@ -404,7 +449,7 @@ class APIKey(db.Model):
     key_hash = db.Column(db.String(64), unique=True, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
-    permissions = db.Column(db.JSON, default=lambda: {
+    permissions = db.Column(JSONDocument, default=lambda: {
         'read': True,
         'write': False,
         'delete': False
@@ -415,6 +460,8 @@ class APIKey(db.Model):
     
     user = db.relationship('User', backref='api_keys')
 
+    __table_args__ = (gin_index('ix_api_keys_permissions', 'permissions'),)
+
 class Webhook(db.Model):
     __tablename__ = 'webhooks'
     
@@ -422,7 +469,7 @@ class Webhook(db.Model):
     name = db.Column(db.String(100), nullable=False)
     url = db.Column(db.String(500), nullable=False)
     secret = db.Column(db.String(64), nullable=False)
-    events = db.Column(db.JSON, default=lambda: [])
+    events = db.Column(JSONDocument, default=lambda: [])
     is_active = db.Column(db.Boolean, default=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -430,15 +477,99 @@ class Webhook(db.Model):
     
     user = db.relationship('User', backref='webhooks')
 
+    __table_args__ = (gin_index('ix_webhooks_events', 'events'),)
+
 class WebhookLog(db.Model):
     __tablename__ = 'webhook_logs'
     
     id = db.Column(db.Integer, primary_key=True)
     webhook_id = db.Column(db.Integer, db.ForeignKey('webhooks.id'), nullable=False)
     event = db.Column(db.String(100), nullable=False)
-    payload = db.Column(db.JSON)
+    payload = db.Column(JSONDocument)
     response_status = db.Column(db.Integer)
     response_body = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
-    webhook = db.relationship('Webhook', backref='logs')
\ No newline at end of file
+    webhook = db.relationship('Webhook', backref='logs')
+
+    __table_args__ = (gin_index('ix_webhook_logs_payload', 'payload'),)
+
+class ExportJob(db.Model):
+    __tablename__ = 'export_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # brands, contacts, companies, invoices
+    format = db.Column(db.String(10), nullable=False, default='xlsx')
+    params = db.Column(db.JSON, default=lambda: {})
+    params_hash = db.Column(db.String(64), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # pending, running, done, failed, expired
+    total_rows = db.Column(db.Integer)
+    processed_rows = db.Column(db.Integer, default=0)
+    filename = db.Column(db.String(255))
+    file_path = db.Column(db.String(500))
+    file_size = db.Column(db.Integer)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Last progress of a running job
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    created_by = db.relationship('User', foreign_keys=[created_by_id])
+    
+    @property
+    def progress(self):
+        """Percentage of rows written, 0-100"""
+        if self.status == 'done':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, int(100 * (self.processed_rows or 0) / self.total_rows))
+    
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed', 'expired')
+
+class Blob(db.Model):
+    """A file stored once in the blob store, keyed by its SHA-256"""
+    __tablename__ = 'blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.BigInteger, nullable=False)
+    content_type = db.Column(db.String(100))
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    unreferenced_at = db.Column(db.DateTime, index=True)  # When ref_count last dropped to zero
+    preview_status = db.Column(db.String(20), index=True)  # None until processed, then running, done or failed
+    text_status = db.Column(db.String(20), index=True)  # Text extraction for search, same states
+    detected_type = db.Column(db.String(100))  # Type sniffed from the content when uploaded
+    scan_status = db.Column(db.String(20))  # clean or not_scanned; infected uploads are never stored
+    scanner = db.Column(db.String(50))
+    scanned_at = db.Column(db.DateTime)
+    
+    @property
+    def path(self):
+        """Storage key, relative to UPLOAD_FOLDER for the local backend"""
+        return f"blobs/{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}"
+
+class ChunkedUpload(db.Model):
+    """A large upload sent in parts, staged on disk until it is finalized"""
+    __tablename__ = 'chunked_uploads'
+    
+    id = db.Column(db.String(32), primary_key=True)  # Random token used in the upload URLs
+    filename = db.Column(db.String(255), nullable=False)
+    content_type = db.Column(db.String(100))
+    size = db.Column(db.BigInteger, nullable=False)
+    received_size = db.Column(db.BigInteger, nullable=False, default=0)
+    target = db.Column(db.String(20), nullable=False)  # agreement, invoice, planning
+    target_id = db.Column(db.Integer, nullable=False)
+    options = db.Column(db.JSON, default=lambda: {})  # e.g. agreement type and valid_until
+    status = db.Column(db.String(20), nullable=False, default='open', index=True)  # open, queued, checking, done, failed, aborted
+    blob_sha256 = db.Column(db.String(64))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_by_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    
+    created_by = db.relationship('User', foreign_keys=[created_by_id])
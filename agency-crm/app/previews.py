@@ -0,0 +1,118 @@
+"""Small JPEG previews of image and PDF attachments.
+
+A worker process (`flask clients preview-worker`) picks up blobs that have
+no preview yet and renders one into the storage backend under
+previews/ab/cd/<sha256>.jpg: images are downscaled with Pillow, PDFs get
+their first page rasterized by poppler's pdftoppm. Content types whose tool
+is not installed are left alone and picked up once it is. Previews are
+keyed by the blob hash, so they never change and are served with an
+immutable cache lifetime, and identical files share one preview.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from flask import current_app
+from werkzeug.exceptions import NotFound
+from app import db
+from app.models import Blob
+from app.storage import CHUNK_SIZE, blob_key, preview_key, claim_blob
+from app.storage_backends import get_backend
+
+IMAGE_TYPES = ('image/png', 'image/jpeg', 'image/gif')
+PDF_TYPES = ('application/pdf',)
+
+def _has_pillow():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def previewable_types():
+    """Content types a preview can be rendered for with the tools installed here"""
+    types = []
+    if _has_pillow():
+        types.extend(IMAGE_TYPES)
+    if shutil.which(current_app.config['PDFTOPPM_PATH']):
+        types.extend(PDF_TYPES)
+    return types
+
+def render_image(source_path, output_path, size):
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as image:
+        # Let the JPEG decoder scale down while reading instead of decoding full size
+        image.draft('RGB', (size, size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.convert('RGB').save(output_path, 'JPEG', quality=80, optimize=True, progressive=True)
+
+def render_pdf(source_path, output_path, size):
+    output_prefix = output_path[:-len('.jpg')]
+    subprocess.run(
+        [current_app.config['PDFTOPPM_PATH'], '-jpeg', '-jpegopt', 'quality=80',
+         '-f', '1', '-l', '1', '-scale-to', str(size), '-singlefile', source_path, output_prefix],
+        check=True, capture_output=True, timeout=current_app.config['PREVIEW_TIMEOUT_SECONDS']
+    )
+
+def render_preview(blob):
+    """Render and store the preview of one blob"""
+    backend = get_backend()
+    render = render_pdf if blob.content_type in PDF_TYPES else render_image
+    work_dir = tempfile.mkdtemp(dir=backend.staging_dir(), prefix='preview-')
+    try:
+        source_path = os.path.join(work_dir, 'source')
+        with backend.open(blob_key(blob.sha256)) as source, open(source_path, 'wb') as target:
+            shutil.copyfileobj(source, target, CHUNK_SIZE)
+        output_path = os.path.join(work_dir, 'preview.jpg')
+        render(source_path, output_path, current_app.config['PREVIEW_SIZE'])
+        backend.put_file(preview_key(blob.sha256), output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def send_preview(sha256):
+    """Download response for a blob's preview; they never change, so they are cached for good"""
+    blob = db.session.get(Blob, sha256)
+    if blob is None or blob.preview_status != 'done':
+        raise NotFound()
+    return get_backend().send(preview_key(sha256), mimetype='image/jpeg', etag=sha256, immutable=True)
+
+def process_blob(blob):
+    try:
+        render_preview(blob)
+        blob.preview_status = 'done'
+    except Exception as e:
+        current_app.logger.warning(f"Preview of blob {blob.sha256} failed: {e}")
+        blob.preview_status = 'failed'
+    db.session.commit()
+    return blob
+
+def reset_previews(statuses=('failed', 'running')):
+    """Queue blobs in the given preview states again; returns the count"""
+    count = Blob.query.filter(Blob.preview_status.in_(statuses))\
+        .update({'preview_status': None}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+def run_worker(once=False, poll_seconds=None):
+    """Render previews until interrupted (or nothing is left with once=True)"""
+    poll_seconds = poll_seconds or current_app.config['EXPORT_WORKER_POLL_SECONDS']
+    types = previewable_types()
+    if not types:
+        current_app.logger.warning("No preview tools found; install Pillow and/or poppler-utils")
+    while True:
+        blob = claim_blob(Blob.preview_status, types) if types else None
+        if blob is not None:
+            process_blob(blob)
+            continue
+        if once:
+            return
+        db.session.remove()
+        time.sleep(poll_seconds)
@@ -0,0 +1,51 @@
+"""Record the SQL statements run while a block of code executes.
+
+    with count_queries() as log:
+        client.get('/clients/company/1')
+    print(log.count, log.statements)
+"""
+import re
+from contextlib import contextmanager
+from functools import lru_cache
+from sqlalchemy import event
+from app import db
+
+_PARAMETER = r'(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)'  # placeholders of the DBAPI paramstyles
+_PARAMETER_LIST = re.compile(rf'\(\s*{_PARAMETER}(?:\s*,\s*{_PARAMETER})+\s*\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_WHITESPACE = re.compile(r'\s+')
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement):
+    """The statement with literals and IN lists replaced, so runs with other values look alike"""
+    statement = _STRING.sub('?', statement)
+    statement = _NUMBER.sub('?', statement)
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    return _PARAMETER_LIST.sub('(?, ...)', statement)
+
+class QueryLog:
+    def __init__(self):
+        self.queries = []  # (statement, parameters)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def statements(self):
+        return [statement for statement, _ in self.queries]
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.queries.append((statement, parameters))
+
+@contextmanager
+def count_queries(engine=None):
+    """QueryLog of every statement sent to engine (default the app's) inside the block"""
+    engine = engine or db.engine
+    log = QueryLog()
+    event.listen(engine, 'before_cursor_execute', log._record)
+    try:
+        yield log
+    finally:
+        event.remove(engine, 'before_cursor_execute', log._record)
@@ -0,0 +1,193 @@
+"""Reconcile stored files with the rows that refer to them.
+
+`reconcile` lists the storage backend and the keys the database refers to,
+both sorted by key, and walks the two lists side by side like a merge
+join. Each side is streamed, so a store with any number of files is
+checked with a few queries rather than one per file.
+
+- A file no row refers to is an orphan. Examples are an upload interrupted
+  between storing and committing, a file of a row deleted before the blob
+  store existed, or a leftover preview or export.
+- A referenced key whose file is gone is missing.
+- Stored bytes are added up per company through the agreements and
+  attachments that use each file.
+
+Orphans older than a grace period can be deleted in batches as they are
+found.
+"""
+import heapq
+from collections import namedtuple, defaultdict
+from datetime import datetime, timedelta
+from itertools import groupby
+from flask import current_app
+from sqlalchemy import select, union_all
+from app import db
+from app.models import (Blob, Agreement, PlanningAttachment, PlanningInfo, MeetingAttachment, KeyMeeting,
+                        InvoiceAttachment, Invoice, Brand, Company, ExportJob)
+from app.storage import blob_key, preview_key
+from app.storage_backends import get_backend
+
+# kind is blob, preview, file (an upload from before the blob store) or export
+Reference = namedtuple('Reference', 'key kind company_ids')
+
+class StorageReport:
+    def __init__(self, sample_size=20):
+        self.sample_size = sample_size
+        self.files = 0
+        self.bytes = 0
+        self.kind_files = defaultdict(int)
+        self.kind_bytes = defaultdict(int)
+        self.company_bytes = defaultdict(int)
+        self.orphans = []
+        self.orphan_count = 0
+        self.orphan_bytes = 0
+        self.reclaimable_count = 0
+        self.reclaimable_bytes = 0
+        self.deleted_count = 0
+        self.deleted_bytes = 0
+        self.missing = []
+        self.missing_count = 0
+
+    def add_file(self, reference, size):
+        self.files += 1
+        self.bytes += size
+        self.kind_files[reference.kind] += 1
+        self.kind_bytes[reference.kind] += size
+        # A file shared by several companies counts for each of them
+        for company_id in reference.company_ids:
+            self.company_bytes[company_id] += size
+
+    def add_orphan(self, key, size, modified, reclaimable):
+        self.files += 1
+        self.bytes += size
+        self.orphan_count += 1
+        self.orphan_bytes += size
+        if reclaimable:
+            self.reclaimable_count += 1
+            self.reclaimable_bytes += size
+        if len(self.orphans) < self.sample_size:
+            self.orphans.append((key, size, modified))
+
+    def add_missing(self, reference):
+        self.missing_count += 1
+        if len(self.missing) < self.sample_size:
+            self.missing.append(reference)
+
+    def companies(self):
+        """(company, bytes) pairs, largest first"""
+        names = {c.id: c for c in Company.query.filter(Company.id.in_(list(self.company_bytes)))}
+        return sorted(((names.get(company_id), size) for company_id, size in self.company_bytes.items()),
+                      key=lambda pair: -pair[1])
+
+def _owners(column, condition):
+    """(column, company_id) of every agreement and attachment, charged to the brand's company"""
+    return union_all(
+        select(column(Agreement).label('key'), Agreement.company_id.label('company_id'))
+            .where(condition(Agreement)),
+        select(column(PlanningAttachment).label('key'), Brand.company_id)
+            .join(PlanningInfo, PlanningAttachment.planning_info_id == PlanningInfo.id)
+            .join(Brand, PlanningInfo.brand_id == Brand.id).where(condition(PlanningAttachment)),
+        select(column(MeetingAttachment).label('key'), Brand.company_id)
+            .join(KeyMeeting, MeetingAttachment.meeting_id == KeyMeeting.id)
+            .join(Brand, KeyMeeting.brand_id == Brand.id).where(condition(MeetingAttachment)),
+        select(column(InvoiceAttachment).label('key'), Brand.company_id)
+            .join(Invoice, InvoiceAttachment.invoice_id == Invoice.id)
+            .join(Brand, Invoice.brand_id == Brand.id).where(condition(InvoiceAttachment)),
+    ).subquery()
+
+def _blob_references():
+    owners = _owners(lambda model: model.blob_sha256, lambda model: model.blob_sha256.isnot(None))
+    rows = db.session.execute(
+        select(Blob.sha256, owners.c.company_id)
+        .outerjoin(owners, owners.c.key == Blob.sha256)
+        .order_by(Blob.sha256)
+        .execution_options(yield_per=1000)
+    )
+    # Blob keys sort the same way as the hashes they are made of
+    for sha256, group in groupby(rows, key=lambda row: row[0]):
+        yield Reference(blob_key(sha256), 'blob', {company_id for _, company_id in group if company_id})
+
+def _preview_references():
+    rows = db.session.execute(
+        select(Blob.sha256).where(Blob.preview_status == 'done').order_by(Blob.sha256)
+        .execution_options(yield_per=1000)
+    )
+    for sha256, in rows:
+        yield Reference(preview_key(sha256), 'preview', set())
+
+def _file_references():
+    """Uploads not moved into the blob store yet; few, so they are sorted here"""
+    owners = _owners(lambda model: model.file_path, lambda model: model.blob_sha256.is_(None))
+    rows = list(db.session.execute(select(owners.c.key, owners.c.company_id)))
+    # Invoices keep their first file in file_path for backward compatibility
+    rows += db.session.execute(
+        select(Invoice.file_path, Brand.company_id).join(Brand, Invoice.brand_id == Brand.id)
+        .where(Invoice.file_path.isnot(None), Invoice.file_path.notlike('blobs/%'))
+    ).all()
+    rows.sort(key=lambda row: row[0])
+    for key, group in groupby(rows, key=lambda row: row[0]):
+        yield Reference(key, 'file', {company_id for _, company_id in group})
+
+def _export_references():
+    paths = sorted(path for path, in db.session.execute(
+        select(ExportJob.file_path).where(ExportJob.status == 'done', ExportJob.file_path.isnot(None))))
+    for path in paths:
+        yield Reference(f"exports/{path}", 'export', set())
+
+def references():
+    """Every storage key the database refers to, sorted by key"""
+    merged = heapq.merge(_blob_references(), _preview_references(), _file_references(),
+                         _export_references(), key=lambda reference: reference.key)
+    for key, group in groupby(merged, key=lambda reference: reference.key):
+        group = list(group)
+        yield Reference(key, group[0].kind, set().union(*(r.company_ids for r in group)))
+
+def stored_files():
+    """Every file in storage, sorted by key, except working directories such as .staging"""
+    for key, size, modified in get_backend().list_keys():
+        if not key.startswith('.'):
+            yield key, size, modified
+
+def reconcile(delete_orphans=False, min_age_hours=None, batch_size=500, limit=None, sample_size=20):
+    """Compare storage with the database and return a StorageReport.
+
+    With delete_orphans, orphans older than min_age_hours (default
+    BLOB_GC_GRACE_HOURS) are deleted batch_size at a time, at most limit.
+    """
+    if min_age_hours is None:
+        min_age_hours = current_app.config['BLOB_GC_GRACE_HOURS']
+    cutoff = datetime.utcnow() - timedelta(hours=min_age_hours)
+    backend = get_backend()
+    report = StorageReport(sample_size)
+    batch = []
+
+    def flush():
+        backend.delete_many(key for key, _ in batch)
+        report.deleted_count += len(batch)
+        report.deleted_bytes += sum(size for _, size in batch)
+        batch.clear()
+
+    refs = references()
+    files = stored_files()
+    ref = next(refs, None)
+    stored = next(files, None)
+    while ref is not None or stored is not None:
+        if stored is None or (ref is not None and ref.key < stored[0]):
+            report.add_missing(ref)
+            ref = next(refs, None)
+        elif ref is None or stored[0] < ref.key:
+            key, size, modified = stored
+            reclaimable = modified < cutoff
+            report.add_orphan(key, size, modified, reclaimable)
+            if delete_orphans and reclaimable and (limit is None or report.deleted_count + len(batch) < limit):
+                batch.append((key, size))
+                if len(batch) >= batch_size:
+                    flush()
+            stored = next(files, None)
+        else:
+            report.add_file(ref, stored[1])
+            ref = next(refs, None)
+            stored = next(files, None)
+    if batch:
+        flush()
+    return report
@@ -0,0 +1,159 @@
+"""Cached reference data for select boxes and filter dropdowns.
+
+Lists of brands, companies, media groups, task templates and users change
+rarely but are read on almost every page. They are cached per process as
+plain tuples and invalidated whenever a session commits a change to one of
+the underlying models. A version stamp file in the instance folder carries
+the invalidation across gunicorn workers.
+"""
+import os
+import threading
+import uuid
+from collections import namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+BrandRef = namedtuple('BrandRef', ['id', 'name', 'company_id', 'company_name', 'status'])
+CompanyRef = namedtuple('CompanyRef', ['id', 'name', 'parent_company_id', 'status'])
+MediaGroupRef = namedtuple('MediaGroupRef', ['id', 'name'])
+TaskTemplateRef = namedtuple('TaskTemplateRef', ['id', 'name', 'description', 'is_default'])
+UserRef = namedtuple('UserRef', ['id', 'first_name', 'last_name', 'role', 'is_active'])
+
+# Tables whose writes invalidate the cache
+TRACKED_TABLES = {'brands', 'companies', 'media_groups', 'task_templates', 'users'}
+
+_lock = threading.Lock()
+_cache = {}
+_local_generation = 0
+
+def _stamp_path():
+    return current_app.config['REFERENCE_DATA_STAMP']
+
+def _current_version():
+    """Version token combining local writes and writes from other workers"""
+    try:
+        st = os.stat(_stamp_path())
+        shared = (st.st_ino, st.st_mtime_ns)
+    except OSError:
+        shared = None
+    return (_local_generation, shared)
+
+def invalidate():
+    """Drop cached reference data in this process and signal other workers"""
+    global _local_generation
+    with _lock:
+        _local_generation += 1
+        _cache.clear()
+
+    if not has_app_context():
+        return
+
+    path = _stamp_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}"
+        with open(tmp_path, 'w') as f:
+            f.write(uuid.uuid4().hex)
+        # Atomic replace gives the stamp a new inode, which other workers notice on stat
+        os.replace(tmp_path, path)
+    except OSError as e:
+        current_app.logger.warning(f"Could not update reference data stamp: {e}")
+
+def _cached(key, loader):
+    version = _current_version()
+    entry = _cache.get(key)
+    if entry and entry[0] == version:
+        return entry[1]
+
+    value = loader()
+    with _lock:
+        _cache[key] = (version, value)
+    return value
+
+def _load_brands():
+    from app import db
+    from app.models import Brand, Company
+    rows = db.session.query(Brand.id, Brand.name, Brand.company_id, Company.name, Brand.status)\
+        .join(Company, Brand.company_id == Company.id)\
+        .order_by(Company.name, Brand.name).all()
+    return tuple(BrandRef(*row) for row in rows)
+
+def _load_companies():
+    from app import db
+    from app.models import Company
+    rows = db.session.query(Company.id, Company.name, Company.parent_company_id, Company.status)\
+        .order_by(Company.name).all()
+    return tuple(CompanyRef(*row) for row in rows)
+
+def _load_media_groups():
+    from app import db
+    from app.models import MediaGroup
+    rows = db.session.query(MediaGroup.id, MediaGroup.name).order_by(MediaGroup.name).all()
+    return tuple(MediaGroupRef(*row) for row in rows)
+
+def _load_task_templates():
+    from app import db
+    from app.models import TaskTemplate
+    rows = db.session.query(TaskTemplate.id, TaskTemplate.name, TaskTemplate.description,
+                            TaskTemplate.is_default).order_by(TaskTemplate.name).all()
+    return tuple(TaskTemplateRef(*row) for row in rows)
+
+def _load_users():
+    from app import db
+    from app.models import User
+    rows = db.session.query(User.id, User.first_name, User.last_name, User.role, User.is_active)\
+        .order_by(User.last_name, User.first_name).all()
+    return tuple(UserRef(*row) for row in rows)
+
+def get_brands():
+    """All brands with their company name, ordered by company and brand name"""
+    return _cached('brands', _load_brands)
+
+def get_companies():
+    """All companies ordered by name"""
+    return _cached('companies', _load_companies)
+
+def get_media_groups():
+    """All media groups ordered by name"""
+    return _cached('media_groups', _load_media_groups)
+
+def get_task_templates():
+    """All task templates ordered by name"""
+    return _cached('task_templates', _load_task_templates)
+
+def get_users(active_only=False):
+    """Team members ordered by last and first name"""
+    users = _cached('users', _load_users)
+    if active_only:
+        return tuple(u for u in users if u.is_active)
+    return users
+
+def _touches_tracked_table(objects):
+    for obj in objects:
+        table = getattr(obj, '__tablename__', None)
+        if table in TRACKED_TABLES:
+            return True
+    return False
+
+@event.listens_for(Session, 'after_flush')
+def _mark_reference_writes(session, flush_context):
+    if _touches_tracked_table(session.new) or _touches_tracked_table(session.deleted) or \
+            _touches_tracked_table(o for o in session.dirty if session.is_modified(o)):
+        session.info['reference_data_dirty'] = True
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_bulk_reference_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.local_table.name in TRACKED_TABLES:
+            orm_execute_state.session.info['reference_data_dirty'] = True
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('reference_data_dirty', False):
+        invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _reset_after_rollback(session):
+    session.info.pop('reference_data_dirty', None)
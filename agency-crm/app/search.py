@@ -0,0 +1,292 @@
+"""Full-text search over the contents of attachments.
+
+A worker process (`flask clients index-worker`) extracts the text of PDF,
+Word, Excel and PowerPoint blobs and stores it in the table
+document_index, one row per blob, so identical files are indexed once. On
+SQLite that is an FTS5 table; on PostgreSQL a plain table with a
+generated tsvector column and a GIN index.
+PDFs need poppler's pdftotext; the Office formats are read with the
+standard library and openpyxl. `search_documents` matches a query against
+the index and returns, for every matching file, the agreements and
+attachments that use it together with their company and brand.
+"""
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+import zipfile
+from collections import namedtuple
+from xml.etree.ElementTree import iterparse
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import text, bindparam, select, union
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models import (Blob, Agreement, PlanningAttachment, MeetingAttachment, InvoiceAttachment,
+                        PlanningInfo, KeyMeeting, Invoice, Brand)
+from app.storage import CHUNK_SIZE, blob_key, claim_blob
+from app.storage_backends import get_backend
+
+PDF_TYPE = 'application/pdf'
+DOCX_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+XLSX_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+PPTX_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DRAWING_NS = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+
+# Marks around matched terms in snippets; replaced when rendering
+MATCH_START, MATCH_END = '\x02', '\x03'
+
+DocumentHit = namedtuple('DocumentHit', 'sha256 snippet files')
+DocumentFile = namedtuple('DocumentFile', 'kind filename file_path company brand')
+
+# Text search configuration on PostgreSQL: words as written, without stemming
+PG_CONFIG = 'simple'
+
+def _postgresql():
+    return db.engine.dialect.name == 'postgresql'
+
+def ensure_index():
+    if _postgresql():
+        db.session.execute(text(
+            "CREATE TABLE IF NOT EXISTS document_index (sha256 VARCHAR(64) PRIMARY KEY, body TEXT NOT NULL, "
+            f"body_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('{PG_CONFIG}', body)) STORED)"
+        ))
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_document_index_body_tsv ON document_index USING gin (body_tsv)"
+        ))
+    else:
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS document_index "
+            "USING fts5(sha256 UNINDEXED, body, tokenize = 'unicode61 remove_diacritics 2')"
+        ))
+    db.session.commit()
+
+def _xml_text(stream, text_tag, paragraph_tag):
+    for event, element in iterparse(stream):
+        if element.tag == text_tag and element.text:
+            yield element.text
+        elif element.tag == paragraph_tag:
+            yield '\n'
+            element.clear()
+
+def extract_docx(path):
+    with zipfile.ZipFile(path) as archive, archive.open('word/document.xml') as stream:
+        yield from _xml_text(stream, f'{WORD_NS}t', f'{WORD_NS}p')
+
+def extract_pptx(path):
+    def number(name):
+        return int(re.search(r'(\d+)\.xml$', name).group(1))
+
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        # Slides first, then speaker notes, each in slide order
+        for pattern in (r'ppt/slides/slide\d+\.xml$', r'ppt/notesSlides/notesSlide\d+\.xml$'):
+            for name in sorted((n for n in names if re.match(pattern, n)), key=number):
+                with archive.open(name) as stream:
+                    yield from _xml_text(stream, f'{DRAWING_NS}t', f'{DRAWING_NS}p')
+
+def extract_xlsx(path):
+    from openpyxl import load_workbook
+
+    # Opened as a file since openpyxl rejects paths without an Excel extension
+    with open(path, 'rb') as stream:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                yield sheet.title + '\n'
+                for row in sheet.iter_rows(values_only=True):
+                    values = [str(value) for value in row if value is not None]
+                    if values:
+                        yield '\t'.join(values) + '\n'
+        finally:
+            workbook.close()
+
+def extract_pdf(path):
+    result = subprocess.run(
+        [current_app.config['PDFTOTEXT_PATH'], '-enc', 'UTF-8', path, '-'],
+        check=True, capture_output=True, timeout=current_app.config['TEXT_EXTRACT_TIMEOUT_SECONDS']
+    )
+    yield result.stdout.decode('utf-8', errors='replace')
+
+EXTRACTORS = {
+    DOCX_TYPE: extract_docx,
+    PPTX_TYPE: extract_pptx,
+    XLSX_TYPE: extract_xlsx,
+    PDF_TYPE: extract_pdf,
+}
+
+def extractable_types():
+    """Content types text can be extracted from with the tools installed here"""
+    types = [DOCX_TYPE, PPTX_TYPE, XLSX_TYPE]
+    if shutil.which(current_app.config['PDFTOTEXT_PATH']):
+        types.append(PDF_TYPE)
+    return types
+
+def extract_text(path, content_type):
+    """Text of a file, cut off at TEXT_INDEX_MAX_CHARS"""
+    limit = current_app.config['TEXT_INDEX_MAX_CHARS']
+    parts = []
+    length = 0
+    for part in EXTRACTORS[content_type](path):
+        parts.append(part)
+        length += len(part)
+        if length >= limit:
+            break
+    return ''.join(parts)[:limit]
+
+def index_blob(blob):
+    """Extract the text of one blob and (re)place it in the index"""
+    with tempfile.NamedTemporaryFile(dir=get_backend().staging_dir(), prefix='extract-') as local:
+        with get_backend().open(blob_key(blob.sha256)) as source:
+            shutil.copyfileobj(source, local, CHUNK_SIZE)
+        local.flush()
+        body = extract_text(local.name, blob.content_type)
+
+    remove_document(blob.sha256)
+    db.session.execute(text("INSERT INTO document_index (sha256, body) VALUES (:sha256, :body)"),
+                       {'sha256': blob.sha256, 'body': body})
+
+def remove_document(sha256):
+    db.session.execute(text("DELETE FROM document_index WHERE sha256 = :sha256"), {'sha256': sha256})
+
+def process_blob(blob):
+    try:
+        index_blob(blob)
+        blob.text_status = 'done'
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.warning(f"Text extraction of blob {blob.sha256} failed: {e}")
+        blob.text_status = 'failed'
+    db.session.commit()
+    return blob
+
+def reset_text(statuses=('failed', 'running')):
+    """Queue blobs in the given extraction states again; returns the count"""
+    count = Blob.query.filter(Blob.text_status.in_(statuses))\
+        .update({'text_status': None}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+def run_worker(once=False, poll_seconds=None):
+    """Index attachments until interrupted (or nothing is left with once=True)"""
+    poll_seconds = poll_seconds or current_app.config['EXPORT_WORKER_POLL_SECONDS']
+    ensure_index()
+    types = extractable_types()
+    if PDF_TYPE not in types:
+        current_app.logger.warning("pdftotext not found; PDFs are not indexed until poppler-utils is installed")
+    while True:
+        blob = claim_blob(Blob.text_status, types)
+        if blob is not None:
+            process_blob(blob)
+            continue
+        if once:
+            return
+        db.session.remove()
+        time.sleep(poll_seconds)
+
+def match_query(query):
+    """FTS5 query for free text: every word must occur, as a word or word prefix"""
+    words = re.findall(r'\w+', query or '')
+    return ' '.join(f'"{word}"*' for word in words)
+
+def tsquery(query):
+    """PostgreSQL to_tsquery input with the same meaning as match_query"""
+    words = re.findall(r'\w+', query or '')
+    return ' & '.join(f"'{word.lower()}':*" for word in words)
+
+def _scope(brand_id=None, company_id=None):
+    """Hashes of the files of a brand, or else of a company, as a select"""
+    selects = []
+    if company_id and not brand_id:
+        selects.append(select(Agreement.blob_sha256).where(Agreement.company_id == company_id))
+        selects.append(select(InvoiceAttachment.blob_sha256).join(Invoice)
+                       .where(Invoice.company_id == company_id))
+    brands = select(Brand.id).where(Brand.id == brand_id) if brand_id else \
+        select(Brand.id).where(Brand.company_id == company_id)
+    selects.append(select(PlanningAttachment.blob_sha256).join(PlanningInfo)
+                   .where(PlanningInfo.brand_id.in_(brands)))
+    selects.append(select(MeetingAttachment.blob_sha256).join(KeyMeeting)
+                   .where(KeyMeeting.brand_id.in_(brands)))
+    selects.append(select(InvoiceAttachment.blob_sha256).join(Invoice)
+                   .where(Invoice.brand_id.in_(brands)))
+    return union(*selects)
+
+def _files(hashes, brand_id=None, company_id=None):
+    """Agreements and attachments using each of the hashes, with their company and brand"""
+    files = {sha256: [] for sha256 in hashes}
+    if not brand_id:
+        query = Agreement.query.filter(Agreement.blob_sha256.in_(hashes)).options(joinedload(Agreement.company))
+        if company_id:
+            query = query.filter(Agreement.company_id == company_id)
+        for agreement in query:
+            files[agreement.blob_sha256].append(DocumentFile(
+                'Agreement', agreement.filename, agreement.file_path, agreement.company, None))
+
+    sources = (
+        ('Planning', PlanningAttachment, PlanningInfo, PlanningAttachment.planning_info),
+        ('Meeting', MeetingAttachment, KeyMeeting, MeetingAttachment.meeting),
+        ('Invoice', InvoiceAttachment, Invoice, InvoiceAttachment.invoice),
+    )
+    for kind, model, parent, relationship in sources:
+        query = model.query.join(relationship).filter(model.blob_sha256.in_(hashes))\
+            .options(joinedload(relationship).joinedload(parent.brand).joinedload(Brand.company))
+        if brand_id:
+            query = query.filter(parent.brand_id == brand_id)
+        elif company_id:
+            brand_ids = select(Brand.id).where(Brand.company_id == company_id)
+            condition = parent.brand_id.in_(brand_ids)
+            if parent is Invoice:
+                condition = condition | (Invoice.company_id == company_id)
+            query = query.filter(condition)
+        for attachment in query:
+            owner = getattr(attachment, relationship.key)
+            company = owner.company if parent is Invoice else owner.brand.company
+            files[attachment.blob_sha256].append(DocumentFile(
+                kind, attachment.filename, attachment.file_path, company, owner.brand))
+    return files
+
+def search_documents(query, brand_id=None, company_id=None, limit=50):
+    """Best matching files for a free-text query, as DocumentHits"""
+    if _postgresql():
+        match = tsquery(query)
+        sql = ("SELECT sha256, ts_headline(:config, body, query, :options) "
+               "FROM document_index, to_tsquery(:config, :match) AS query WHERE body_tsv @@ query")
+        order = " ORDER BY ts_rank(body_tsv, query) DESC LIMIT :limit"
+        params = {'config': PG_CONFIG, 'options': f'StartSel={MATCH_START}, StopSel={MATCH_END}, '
+                                                  'MaxWords=16, MinWords=8, MaxFragments=1'}
+    else:
+        match = match_query(query)
+        sql = ("SELECT sha256, snippet(document_index, 1, :start, :end, '…', 16) FROM document_index "
+               "WHERE document_index MATCH :match")
+        order = " ORDER BY rank LIMIT :limit"
+        params = {'start': MATCH_START, 'end': MATCH_END}
+    if not match:
+        return []
+
+    params.update(match=match, limit=limit)
+    statement = text(sql + order)
+    if brand_id or company_id:
+        scope = [sha256 for sha256, in db.session.execute(_scope(brand_id, company_id)) if sha256]
+        statement = text(sql + " AND sha256 IN :scope" + order).bindparams(bindparam('scope', expanding=True))
+        params['scope'] = scope or ['']
+
+    try:
+        rows = db.session.execute(statement, params).all()
+    except (OperationalError, ProgrammingError):
+        # No index yet: ensure_index() has not run, which `flask clients index-worker` does when it starts
+        db.session.rollback()
+        return []
+    files = _files([sha256 for sha256, _ in rows], brand_id, company_id)
+    # Files whose attachments were deleted stay indexed until the blob is collected
+    return [DocumentHit(sha256, snippet, files[sha256]) for sha256, snippet in rows if files[sha256]]
+
+def snippet_html(snippet):
+    """Snippet with matched terms in <mark>, everything else escaped"""
+    return Markup(str(escape(snippet)).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+def snippet_text(snippet):
+    return snippet.replace(MATCH_START, '').replace(MATCH_END, '')
@@ -0,0 +1,105 @@
+"""Per-request SQL statistics: query count, database time and repeated statements.
+
+Every statement the app's engines run during a request is timed with the
+before/after_cursor_execute events and grouped by its fingerprint (see
+app.query_log.fingerprint), so the same query with other values counts as
+one statement run several times. After the request:
+- the Server-Timing header carries the database time, the query count and
+  the request's total time, which browser developer tools show with the
+  request (SQL_SERVER_TIMING),
+- a statement run more than SQL_REPEAT_WARNING times is logged as a warning:
+  that is a query issued once per row of a list (N+1), to be replaced with a
+  join, selectinload or a single grouped query,
+- HTML pages get a panel listing the statements when SQL_DEBUG_PANEL is
+  'true', or 'debug' and the app runs in debug mode.
+Statements outside requests (workers, commands) are not recorded.
+"""
+import re
+import time
+from flask import current_app, g, has_request_context, render_template, request
+from sqlalchemy import event
+from app import db
+from app.query_log import fingerprint
+
+_SELECT_LIST = re.compile(r'^SELECT .*? FROM ', re.DOTALL)
+
+class RequestQueries:
+    """The statements of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}  # fingerprint: [runs, seconds]
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        runs = self.statements.setdefault(fingerprint(statement), [0, 0.0])
+        runs[0] += 1
+        runs[1] += duration
+
+    def by_runs(self):
+        """[(fingerprint, runs, seconds)], most frequent first"""
+        return sorted(((statement, runs, seconds) for statement, (runs, seconds) in self.statements.items()),
+                      key=lambda row: (-row[1], -row[2]))
+
+    def repeated(self, threshold):
+        return [row for row in self.by_runs() if row[1] > threshold]
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._sql_stats_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_sql_stats_started', None)
+    if started is None or not has_request_context():
+        return
+    queries = g.get('sql_queries')
+    if queries is not None:
+        queries.record(statement, time.perf_counter() - started)
+
+def _start():
+    g.sql_queries = RequestQueries()
+
+def _debug_panel_enabled():
+    setting = str(current_app.config['SQL_DEBUG_PANEL']).lower()
+    return setting == 'true' or (setting == 'debug' and current_app.debug)
+
+def _report(response):
+    queries = g.get('sql_queries')
+    if queries is None:
+        return response
+    config = current_app.config
+    if config['SQL_SERVER_TIMING']:
+        total = time.perf_counter() - queries.started
+        response.headers.add('Server-Timing', f'db;dur={queries.duration * 1000:.1f};desc="{queries.count} queries"')
+        response.headers.add('Server-Timing', f'total;dur={total * 1000:.1f}')
+
+    threshold = config['SQL_REPEAT_WARNING']
+    for statement, runs, seconds in queries.repeated(threshold):
+        # Without the column list, which is long and says little about where the query comes from
+        current_app.logger.warning('%s %s ran one statement %d times (%.1f ms), once per row? %s',
+                                   request.method, request.path, runs, seconds * 1000,
+                                   _SELECT_LIST.sub('SELECT ... FROM ', statement)[:500])
+
+    # Streamed responses (exports, downloads) are still being produced, so they cannot be edited
+    if response.mimetype == 'text/html' and not response.is_streamed and not response.direct_passthrough \
+            and _debug_panel_enabled():
+        html = response.get_data(as_text=True)
+        end = html.rfind('</body>')
+        if end != -1:
+            panel = render_template('sql_debug_panel.html', queries=queries, threshold=threshold)
+            response.set_data(html[:end] + panel + html[end:])
+    return response
+
+def init_app(app):
+    """Time the statements of every engine of the app and report them per request"""
+    if not app.config['SQL_STATS']:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start)
+    app.after_request(_report)
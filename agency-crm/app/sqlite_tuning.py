@@ -0,0 +1,54 @@
+"""Settings applied to every new SQLite connection.
+
+SQLite's defaults suit a single process: the rollback journal makes a
+writer wait for every reader to finish and blocks readers while it
+commits, and a connection that finds the database locked fails at once.
+With several gunicorn workers sharing the file that means "database is
+locked" errors on form submissions while a dashboard or export is
+reading. The 'tuned' profile switches to write-ahead logging, where
+readers and the writer no longer block each other, and waits
+SQLITE_BUSY_TIMEOUT_MS for the write lock instead of failing.
+benchmark_sqlite.py compares it with 'default' under concurrent readers
+and writers.
+"""
+from functools import partial
+from sqlalchemy import event
+from app import db
+
+PROFILES = ('tuned', 'default')
+
+def profile_pragmas(config):
+    """PRAGMA statements of the configured SQLITE_PROFILE, in the order they run"""
+    profile = config.get('SQLITE_PROFILE') or 'tuned'
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown SQLITE_PROFILE {profile!r}, expected one of {', '.join(PROFILES)}")
+    if profile == 'default':
+        return []
+    return [
+        # Kept in the database file, so other tools opening it see WAL too
+        'PRAGMA journal_mode=WAL',
+        # Syncs at checkpoints rather than every commit; a power loss can lose the last commits,
+        # but in WAL mode it cannot corrupt the database
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA cache_size=-{config['SQLITE_CACHE_SIZE_MB'] * 1024}",  # negative means KiB
+        f"PRAGMA mmap_size={config['SQLITE_MMAP_SIZE_MB'] * 1024 * 1024}",
+        'PRAGMA temp_store=MEMORY',
+        f"PRAGMA busy_timeout={config['SQLITE_BUSY_TIMEOUT_MS']}",
+        'PRAGMA foreign_keys=ON',
+    ]
+
+def _apply(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in pragmas:
+        cursor.execute(pragma)
+    cursor.close()
+
+def init_app(app):
+    """Run the profile's pragmas on every connection the app's SQLite engines open"""
+    pragmas = profile_pragmas(app.config)
+    if not pragmas:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', partial(_apply, pragmas))
@@ -0,0 +1,280 @@
+"""Content-addressed store for uploaded attachments.
+
+Uploads are hashed while they are copied to a staging file and kept once
+under the key blobs/ab/cd/<sha256> of the storage backend, however many
+agreements or attachments point at them. Each Blob row counts its references from Agreement,
+PlanningAttachment, MeetingAttachment and InvoiceAttachment; mapper events
+keep the count up to date as those rows are inserted, repointed or deleted
+(including cascaded deletes of companies, brands and invoices).
+`collect_garbage` removes blobs that have had no references for
+BLOB_GC_GRACE_HOURS.
+"""
+import hashlib
+import mimetypes
+import os
+import tempfile
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, case, func, select, union_all
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.metrics import UPLOAD_BYTES
+from app.models import Blob, Agreement, PlanningAttachment, MeetingAttachment, InvoiceAttachment
+from app.storage_backends import get_backend
+from app.upload_pipeline import build_processors, finish_processors
+
+CHUNK_SIZE = 64 * 1024
+
+# Models whose rows hold a reference to a blob through blob_sha256
+REFERENCING_MODELS = (Agreement, PlanningAttachment, MeetingAttachment, InvoiceAttachment)
+
+def blob_key(sha256):
+    """Storage key of a blob; the same as Blob.path"""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+def preview_key(sha256):
+    """Storage key of a blob's preview image, see app.previews"""
+    return f"previews/{sha256[:2]}/{sha256[2:4]}/{sha256}.jpg"
+
+def guess_content_type(filename, fallback=None):
+    return mimetypes.guess_type(filename or '')[0] or fallback or 'application/octet-stream'
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _run_pipeline(stream, filename, output=None, max_size=None):
+    """Read stream once through the upload processors, copying it to output; returns their results"""
+    processors = build_processors(filename, max_size)
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        for processor in processors:
+            processor.update(chunk)
+        if output is not None:
+            output.write(chunk)
+    return finish_processors(processors)
+
+def check_file(path, filename, max_size=None):
+    """Run a local file through the upload processors; returns their results or raises UploadRejected"""
+    with open(path, 'rb') as stream:
+        return _run_pipeline(stream, filename, max_size=max_size)
+
+def store_file(path, content_type=None, sha256=None, results=None):
+    """Move a finished local file into the store and return its Blob.
+
+    Pass sha256 when it is already known to skip reading the file again,
+    and results of check_file to record them on the blob. The file is
+    handed to the storage backend, or deleted if the same content is
+    already stored.
+    """
+    sha256 = sha256 or file_sha256(path)
+    size = os.path.getsize(path)
+    backend = get_backend()
+    key = blob_key(sha256)
+    # The row first: once it is found or created, collect_garbage leaves the blob alone
+    blob, created = _get_or_create_blob(sha256, size, content_type)
+    if created or not backend.exists(key):
+        backend.put_file(key, path)
+    else:
+        os.remove(path)
+    if results:
+        blob.detected_type = results['detected_type']
+        blob.scan_status = results['scan_status']
+        blob.scanner = results.get('scanner')
+        blob.scanned_at = results.get('scanned_at')
+    return blob
+
+def store_stream(stream, content_type=None, filename=None):
+    """Copy a binary stream into the store and return its Blob.
+
+    The stream goes through the upload processors (hash, size, type
+    sniffing, virus scan) while it is written to a staging file, so it is
+    read exactly once and never held in memory. Raises UploadRejected,
+    leaving nothing behind, if a processor refuses it.
+    """
+    backend = get_backend()
+    fd, tmp_path = tempfile.mkstemp(dir=backend.staging_dir(), prefix='upload-')
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            results = _run_pipeline(stream, filename, output)
+        return store_file(tmp_path, content_type, results['sha256'], results)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def save_upload(file):
+    """Store an uploaded werkzeug FileStorage and return its Blob"""
+    if file.stream.seekable():
+        file.stream.seek(0)
+    blob = store_stream(file.stream, guess_content_type(file.filename, file.mimetype), file.filename)
+    UPLOAD_BYTES.labels('form').inc(blob.size)
+    return blob
+
+def send_stored_file(key, download_name=None, as_attachment=False):
+    """Download response for an attachment's file_path.
+
+    Blobs never change under their key, so they go out with their hash as
+    ETag and an immutable cache lifetime; other (older) files fall back to
+    revalidation.
+    """
+    if key.startswith('blobs/'):
+        blob = db.session.get(Blob, os.path.basename(key))
+        if blob is not None:
+            return get_backend().send(key, mimetype=blob.content_type, download_name=download_name,
+                                      as_attachment=as_attachment, etag=blob.sha256, immutable=True)
+    return get_backend().send(key, download_name=download_name, as_attachment=as_attachment)
+
+def claim_blob(status_column, content_types):
+    """Atomically move the oldest blob of the given types whose status_column is unset to running.
+
+    Used by the background workers that derive something from blobs
+    (previews, extracted text); returns None when nothing is left.
+    """
+    while True:
+        blob = Blob.query.filter(status_column.is_(None), Blob.content_type.in_(content_types))\
+            .order_by(Blob.created_at).first()
+        if blob is None:
+            return None
+        claimed = Blob.query.filter(Blob.sha256 == blob.sha256, status_column.is_(None))\
+            .update({status_column: 'running'}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            db.session.refresh(blob)
+            return blob
+
+def _get_or_create_blob(sha256, size, content_type):
+    """(Blob, whether the row was created)
+
+    An unreferenced blob that is reused starts a new grace period in the same statement that finds it.
+    The statement locks the row until the caller commits its attachment, and collect_garbage only deletes
+    blobs whose grace period has run out, so the blob cannot be collected in between.
+    """
+    now = datetime.utcnow()
+    found = Blob.query.filter(Blob.sha256 == sha256).update(
+        {'unreferenced_at': case((Blob.ref_count <= 0, now), else_=None)}, synchronize_session=False)
+    if found:
+        return db.session.get(Blob, sha256, populate_existing=True), False
+
+    # Starts unreferenced; the count goes up when an attachment row pointing at it is flushed
+    blob = Blob(sha256=sha256, size=size, content_type=content_type, ref_count=0, unreferenced_at=now)
+    try:
+        with db.session.begin_nested():
+            db.session.add(blob)
+    except IntegrityError:
+        # Stored concurrently by another request
+        return _get_or_create_blob(sha256, size, content_type)
+    return blob, True
+
+def _adjust_references(connection, sha256, delta):
+    blobs = Blob.__table__
+    new_count = blobs.c.ref_count + delta
+    connection.execute(
+        blobs.update()
+        .where(blobs.c.sha256 == sha256)
+        .values(ref_count=new_count,
+                unreferenced_at=case((new_count <= 0, datetime.utcnow()), else_=None))
+    )
+
+def _reference_added(mapper, connection, target):
+    if target.blob_sha256:
+        _adjust_references(connection, target.blob_sha256, 1)
+
+def _reference_removed(mapper, connection, target):
+    if target.blob_sha256:
+        _adjust_references(connection, target.blob_sha256, -1)
+
+def _reference_changed(mapper, connection, target):
+    history = db.inspect(target).attrs.blob_sha256.history
+    for sha256 in history.deleted:
+        if sha256:
+            _adjust_references(connection, sha256, -1)
+    for sha256 in history.added:
+        if sha256:
+            _adjust_references(connection, sha256, 1)
+
+for _model in REFERENCING_MODELS:
+    event.listen(_model, 'after_insert', _reference_added)
+    event.listen(_model, 'after_delete', _reference_removed)
+    event.listen(_model, 'after_update', _reference_changed)
+
+def _references():
+    return union_all(*[
+        select(model.blob_sha256.label('sha256')).where(model.blob_sha256.isnot(None))
+        for model in REFERENCING_MODELS
+    ]).subquery()
+
+def is_referenced(blob):
+    """Check the attachment tables directly, independent of ref_count
+
+    The same references recount_references counts. Invoice.file_path is not one: it repeats the
+    path of the invoice's first InvoiceAttachment, which is deleted together with the invoice.
+    """
+    for model in REFERENCING_MODELS:
+        if db.session.query(model.id).filter(model.blob_sha256 == blob.sha256).first():
+            return True
+    return False
+
+def recount_references():
+    """Recompute every blob's ref_count from the attachment tables; returns how many were wrong"""
+    references = _references()
+    counts = dict(db.session.execute(
+        select(references.c.sha256, func.count()).group_by(references.c.sha256)
+    ).all())
+
+    now = datetime.utcnow()
+    fixed = 0
+    for sha256, ref_count, unreferenced_at in db.session.query(Blob.sha256, Blob.ref_count, Blob.unreferenced_at).all():
+        actual = counts.get(sha256, 0)
+        if actual == ref_count:
+            continue
+        Blob.query.filter_by(sha256=sha256).update({
+            'ref_count': actual,
+            'unreferenced_at': (unreferenced_at or now) if actual == 0 else None
+        }, synchronize_session=False)
+        fixed += 1
+    db.session.commit()
+    return fixed
+
+def collect_garbage(grace_hours=None, dry_run=False):
+    """Delete blobs unreferenced for longer than the grace period.
+
+    Returns (blobs removed, bytes freed). Each candidate is re-checked
+    against the attachment tables before its row and file are removed.
+    """
+    # Imported here since app.search builds on this module
+    from app.search import remove_document
+
+    if grace_hours is None:
+        grace_hours = current_app.config['BLOB_GC_GRACE_HOURS']
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    candidates = Blob.query.filter(Blob.ref_count <= 0, Blob.unreferenced_at < cutoff).all()
+
+    removed = 0
+    freed = 0
+    for blob in candidates:
+        sha256, size, indexed = blob.sha256, blob.size, blob.text_status == 'done'
+        if is_referenced(blob):
+            current_app.logger.warning(f"Blob {sha256} has references but a zero count; run a recount")
+            continue
+        if not dry_run:
+            # Conditional delete so a blob reused since the query above is kept: reuse restarts the grace period
+            deleted = Blob.query.filter(Blob.sha256 == sha256, Blob.ref_count <= 0, Blob.unreferenced_at < cutoff)\
+                .delete(synchronize_session=False)
+            if not deleted:
+                db.session.commit()
+                continue
+            if indexed:
+                remove_document(sha256)
+            # Before the commit: until then an upload of the same content waits on the deleted row,
+            # then stores the file again under a new row
+            get_backend().delete(blob_key(sha256))
+            get_backend().delete(preview_key(sha256))
+            db.session.commit()
+        removed += 1
+        freed += size
+    return removed, freed
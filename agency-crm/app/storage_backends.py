@@ -0,0 +1,246 @@
+"""Where uploaded files and export artifacts are kept.
+
+Files are addressed by a key relative to the storage root, such as
+`blobs/ab/cd/<sha256>` or `exports/<file>`. STORAGE_BACKEND selects the
+implementation:
+
+- `local` keeps files under UPLOAD_FOLDER on the web node's disk. Downloads
+  answer Range and conditional (ETag / Last-Modified) requests. With
+  SENDFILE_MODE set, the file body is left to the fronting web server
+  (`X-Sendfile` for Apache/lighttpd, `X-Accel-Redirect` for nginx), so a
+  large download does not occupy a Python worker.
+- `s3` keeps them in an S3-compatible bucket (AWS, MinIO, Ceph, ...), so
+  any number of web and worker nodes share the same files. Downloads are
+  redirects to short-lived presigned URLs, so file bodies never pass
+  through the web workers. Needs boto3 (`pip install boto3`).
+
+Both backends use the same keys, so switching is a matter of copying the
+UPLOAD_FOLDER tree into the bucket under S3_PREFIX.
+"""
+import os
+import shutil
+from datetime import datetime, timezone
+from urllib.parse import quote
+from flask import current_app, redirect, request
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+
+# Cache lifetime for content that never changes under its key
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+class LocalBackend:
+    def __init__(self, root, sendfile_mode=None, accel_redirect_prefix='/protected-uploads/'):
+        self.root = root
+        self.sendfile_mode = sendfile_mode
+        self.accel_redirect_prefix = accel_redirect_prefix
+
+    def _path(self, key):
+        path = safe_join(self.root, key)
+        if path is None:
+            raise NotFound()
+        return path
+
+    def staging_dir(self):
+        """Directory for temporary files, on the same filesystem so they can be moved into place"""
+        path = os.path.join(self.root, '.staging')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def put_file(self, key, source_path):
+        """Move a finished local file to key, replacing what is there"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A rename when source and store share a filesystem, otherwise a copy
+        shutil.move(source_path, path)
+
+    def exists(self, key):
+        return os.path.isfile(self._path(key))
+
+    def size(self, key):
+        return os.path.getsize(self._path(key))
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
+    def list_keys(self, prefix=''):
+        """Yield (key, size, modified) of every file under prefix, sorted by key"""
+        def walk(directory, key_prefix):
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                return
+            # Sorting directories as "name/" keeps the keys of the whole tree in order
+            entries.sort(key=lambda e: e.name + '/' if e.is_dir(follow_symlinks=False) else e.name)
+            for entry in entries:
+                key = key_prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    yield from walk(entry.path, key + '/')
+                elif entry.is_file(follow_symlinks=False):
+                    stat = entry.stat()
+                    yield key, stat.st_size, datetime.utcfromtimestamp(stat.st_mtime)
+
+        directory = prefix.rpartition('/')[0]
+        for key, size, modified in walk(self._path(directory) if directory else self.root,
+                                        directory + '/' if directory else ''):
+            if key.startswith(prefix):
+                yield key, size, modified
+
+    def send(self, key, mimetype=None, download_name=None, as_attachment=False, etag=None, immutable=False):
+        """Download response for key.
+
+        etag replaces the default mtime/size based ETag; immutable marks the
+        response cacheable by the browser for a year without revalidation.
+        """
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise NotFound()
+
+        # With a sendfile mode the web server handles Range and conditional requests itself
+        offload = self.sendfile_mode in ('x-sendfile', 'x-accel-redirect')
+        response = send_file(
+            path, request.environ,
+            mimetype=mimetype,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            conditional=not offload,
+            etag=etag or True,
+            max_age=IMMUTABLE_MAX_AGE if immutable else None,
+            use_x_sendfile=offload
+        )
+
+        if immutable:
+            response.cache_control.public = False
+            response.cache_control.private = True
+            response.cache_control.immutable = True
+
+        if self.sendfile_mode == 'x-accel-redirect':
+            del response.headers['X-Sendfile']
+            response.headers['X-Accel-Redirect'] = self.accel_redirect_prefix + quote(key)
+            # nginx serves the body and sets the length from the file
+            del response.headers['Content-Length']
+        return response
+
+class S3Backend:
+    def __init__(self, bucket, prefix='', endpoint_url=None, region=None,
+                 access_key_id=None, secret_access_key=None, url_expires=300):
+        import boto3
+        from botocore.exceptions import ClientError
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expires = url_expires
+        self.client_error = ClientError
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    def staging_dir(self):
+        # Uploads are staged in the system temp directory and then sent to the bucket
+        return None
+
+    def put_file(self, key, source_path):
+        """Upload a finished local file to key (multipart for large files) and remove the local copy"""
+        self.client.upload_file(source_path, self.bucket, self._key(key))
+        os.remove(source_path)
+
+    def _head(self, key):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client_error as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def size(self, key):
+        head = self._head(key)
+        if head is None:
+            raise FileNotFoundError(key)
+        return head['ContentLength']
+
+    def open(self, key):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key))['Body']
+        except self.client_error as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                raise FileNotFoundError(key)
+            raise
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        # At most 1000 keys per request
+        for start in range(0, len(keys), 1000):
+            self.client.delete_objects(Bucket=self.bucket, Delete={
+                'Objects': [{'Key': self._key(key)} for key in keys[start:start + 1000]],
+                'Quiet': True
+            })
+
+    def list_keys(self, prefix=''):
+        """Yield (key, size, modified) of every object under prefix, sorted by key"""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for item in page.get('Contents', []):
+                modified = item['LastModified'].astimezone(timezone.utc).replace(tzinfo=None)
+                yield item['Key'][len(self.prefix):], item['Size'], modified
+
+    def send(self, key, mimetype=None, download_name=None, as_attachment=False, etag=None, immutable=False):
+        # The bucket answers Range and conditional requests with its own ETag
+        params = {'Bucket': self.bucket, 'Key': self._key(key)}
+        if mimetype:
+            params['ResponseContentType'] = mimetype
+        if immutable:
+            params['ResponseCacheControl'] = f"private, max-age={IMMUTABLE_MAX_AGE}, immutable"
+        if download_name or as_attachment:
+            disposition = 'attachment' if as_attachment else 'inline'
+            if download_name:
+                disposition += f"; filename*=UTF-8''{quote(download_name)}"
+            params['ResponseContentDisposition'] = disposition
+        url = self.client.generate_presigned_url('get_object', Params=params, ExpiresIn=self.url_expires)
+        return redirect(url)
+
+def create_backend(config):
+    name = config['STORAGE_BACKEND']
+    if name == 'local':
+        return LocalBackend(config['UPLOAD_FOLDER'], config['SENDFILE_MODE'], config['X_ACCEL_REDIRECT_PREFIX'])
+    if name == 's3':
+        return S3Backend(
+            bucket=config['S3_BUCKET'],
+            prefix=config['S3_PREFIX'],
+            endpoint_url=config['S3_ENDPOINT_URL'],
+            region=config['S3_REGION'],
+            access_key_id=config['S3_ACCESS_KEY_ID'],
+            secret_access_key=config['S3_SECRET_ACCESS_KEY'],
+            url_expires=config['S3_URL_EXPIRES_SECONDS']
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND {name!r}")
+
+def get_backend():
+    """The storage backend of the current app, created on first use"""
+    backend = current_app.extensions.get('storage_backend')
+    if backend is None:
+        backend = create_backend(current_app.config)
+        current_app.extensions['storage_backend'] = backend
+    return backend
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Measure time and peak memory of the exports.
+
+Seeds a throwaway SQLite database with the given number of brands, contacts
+and companies, then runs each export in a fresh process and reports its
+wall time, peak RSS and the size of the generated file.
+
+    python benchmark_exports.py                 # 10k, 100k and 500k rows
+    python benchmark_exports.py --rows 20000    # a single size
+    python benchmark_exports.py --format csv    # CSV instead of Excel
+
+Peak RSS includes SQLite's page cache and the pages of the memory-mapped
+database file, which fill up to SQLITE_CACHE_SIZE_MB + SQLITE_MMAP_SIZE_MB
+as more rows are read, whatever the export does. Run with
+SQLITE_PROFILE=default to measure the export alone.
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+DEFAULT_SIZES = [10_000, 100_000, 500_000]
+EXPORT_NAMES = ['brands', 'contacts', 'companies']
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def seed(database_path, rows):
+    """Create the schema and insert `rows` companies, brands and contacts"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+    from app import create_app, db
+    from app.models import User, Company, Brand, BrandTeam, ClientContact, StatusUpdate, brand_contacts
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        today = now.date()
+        db.session.execute(User.__table__.insert(), [{
+            'id': 1, 'email': 'bench@example.com', 'first_name': 'Bench', 'last_name': 'User',
+            'role': 'management', 'is_active': True, 'created_at': now
+        }])
+
+        batch = 10_000
+        for start in range(0, rows, batch):
+            ids = range(start + 1, min(start + batch, rows) + 1)
+            db.session.execute(Company.__table__.insert(), [{
+                'id': i, 'name': f'Company {i:07d}', 'vat_code': f'LT{i:09d}', 'address': f'Street {i}',
+                'status': 'active', 'created_at': now, 'updated_at': now
+            } for i in ids])
+            db.session.execute(Brand.__table__.insert(), [{
+                'id': i, 'name': f'Brand {i:07d}', 'company_id': i, 'status': 'active', 'created_at': now
+            } for i in ids])
+            db.session.execute(BrandTeam.__table__.insert(), [{
+                'brand_id': i, 'team_member_id': 1, 'is_key_responsible': True, 'assigned_at': now
+            } for i in ids])
+            db.session.execute(StatusUpdate.__table__.insert(), [{
+                'brand_id': i, 'date': today, 'comment': 'Benchmark update', 'evaluation': 'perfect',
+                'created_by_id': 1, 'created_at': now
+            } for i in ids])
+            db.session.execute(ClientContact.__table__.insert(), [{
+                'id': i, 'first_name': f'First{i}', 'last_name': f'Last{i}', 'email': f'contact{i}@example.com',
+                'phone': '+37060000000', 'birthday_month': i % 12 + 1, 'birthday_day': i % 28 + 1,
+                'should_get_gift': i % 2 == 0, 'receive_newsletter': True, 'status': 'active', 'created_at': now
+            } for i in ids])
+            db.session.execute(brand_contacts.insert(), [{'brand_id': i, 'contact_id': i} for i in ids])
+            db.session.commit()
+
+def run_export(database_path, name, export_format):
+    """Run in a child process: generate one export and print its measurements"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+    from app import create_app
+    from app.clients.exports import EXPORTS, write_export
+
+    app = create_app()
+    with app.app_context():
+        baseline = peak_rss_mb()
+        started = time.perf_counter()
+        with tempfile.TemporaryFile() as output:
+            write_export(EXPORTS[name], output, export_format)
+            size = output.tell()
+        elapsed = time.perf_counter() - started
+    print(f'{elapsed:.2f} {baseline:.1f} {peak_rss_mb():.1f} {size / (1024 * 1024):.1f}')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append', help='Rows per table (repeatable)')
+    parser.add_argument('--export', choices=EXPORT_NAMES, action='append', help='Only run these exports')
+    parser.add_argument('--format', choices=['xlsx', 'csv', 'parquet'], default='xlsx', help='Export format')
+    parser.add_argument('--seed', nargs=2, metavar=('DATABASE', 'ROWS'), help=argparse.SUPPRESS)
+    parser.add_argument('--child', nargs=3, metavar=('DATABASE', 'EXPORT', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed[0], int(args.seed[1]))
+        return
+    if args.child:
+        run_export(*args.child)
+        return
+
+    print(f"{'rows':>8} {'export':<10} {'seconds':>8} {'base MB':>8} {'peak MB':>8} {'file MB':>8}")
+    for rows in args.rows or DEFAULT_SIZES:
+        with tempfile.TemporaryDirectory() as tmp:
+            database_path = os.path.join(tmp, 'bench.db')
+            subprocess.run([sys.executable, __file__, '--seed', database_path, str(rows)], check=True)
+            for name in args.export or EXPORT_NAMES:
+                result = subprocess.run([sys.executable, __file__, '--child', database_path, name, args.format],
+                                        check=True, capture_output=True, text=True)
+                seconds, base, peak, size = result.stdout.split()[-4:]
+                print(f'{rows:>8} {name:<10} {seconds:>8} {base:>8} {peak:>8} {size:>8}')
+
+if __name__ == '__main__':
+    main()
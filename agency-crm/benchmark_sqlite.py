@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+"""Measure SQLite read and write throughput with concurrent workers.
+
+Seeds a throwaway database for each SQLite profile (see
+app/sqlite_tuning.py), then runs reader and writer processes against it at
+the same time, the way several gunicorn workers share one database file.
+Readers load a page of the brand list with each brand's latest status
+update; writers add a status update per transaction, like the brand form.
+Reports operations per second, the slowest write (how long a form
+submission waited on readers) and how many operations failed with
+"database is locked".
+
+    python benchmark_sqlite.py                               # both profiles
+    python benchmark_sqlite.py --readers 8 --writers 4 --seconds 20
+    python benchmark_sqlite.py --profile tuned
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROFILES = ['default', 'tuned']
+
+def use_database(database_path, profile):
+    os.environ['DATABASE_URL'] = f'sqlite:///{database_path}'
+    os.environ['SQLITE_PROFILE'] = profile
+
+def seed(database_path, profile, rows):
+    """Create the schema and insert `rows` companies and brands with a status update each"""
+    use_database(database_path, profile)
+    from app import create_app, db
+    from app.models import User, Company, Brand, StatusUpdate
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        now = datetime.utcnow()
+        db.session.execute(User.__table__.insert(), [{
+            'id': 1, 'email': 'bench@example.com', 'first_name': 'Bench', 'last_name': 'User',
+            'role': 'management', 'is_active': True, 'created_at': now
+        }])
+        ids = range(1, rows + 1)
+        db.session.execute(Company.__table__.insert(), [{
+            'id': i, 'name': f'Company {i:07d}', 'status': 'active', 'created_at': now, 'updated_at': now
+        } for i in ids])
+        db.session.execute(Brand.__table__.insert(), [{
+            'id': i, 'name': f'Brand {i:07d}', 'company_id': i, 'status': 'active', 'created_at': now
+        } for i in ids])
+        db.session.execute(StatusUpdate.__table__.insert(), [{
+            'brand_id': i, 'date': now.date(), 'comment': 'Benchmark update', 'evaluation': 'perfect',
+            'created_by_id': 1, 'created_at': now
+        } for i in ids])
+        db.session.commit()
+
+def run_worker(database_path, profile, role, start, stop):
+    """Run in a child process: read or write from `start` until `stop`, print ok/locked counts and slowest op"""
+    use_database(database_path, profile)
+    from sqlalchemy.exc import OperationalError
+    from app import create_app, db
+    from app.models import Brand, StatusUpdate
+    from app.clients.exports import brand_query
+
+    app = create_app()
+    ok = locked = 0
+    slowest = 0.0
+    with app.app_context():
+        brands = db.session.query(Brand.id).count()
+        time.sleep(max(0, start - time.time()))
+        n = os.getpid()
+        while time.time() < stop:
+            n += 1
+            started = time.perf_counter()
+            try:
+                if role == 'read':
+                    brand_query({}).offset(n % brands).limit(50).all()
+                else:
+                    db.session.add(StatusUpdate(brand_id=n % brands + 1, date=datetime.utcnow().date(),
+                                                comment='Benchmark write', evaluation='perfect', created_by_id=1))
+                    db.session.commit()
+                ok += 1
+                slowest = max(slowest, time.perf_counter() - started)
+            except OperationalError as e:
+                db.session.rollback()
+                if 'locked' not in str(e):
+                    raise
+                locked += 1
+            db.session.remove()
+    print(f'{ok} {locked} {slowest:.4f}')
+
+def run(profile, rows, readers, writers, seconds):
+    """{role: (operations/s, locked, slowest ms)} for one profile"""
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'bench.db')
+        subprocess.run([sys.executable, __file__, '--seed', database_path, profile, str(rows)], check=True)
+        start = time.time() + 3  # time for every worker to import the app
+        workers = [(role, subprocess.Popen(
+            [sys.executable, __file__, '--child', database_path, profile, role, str(start), str(start + seconds)],
+            stdout=subprocess.PIPE, text=True)) for role in ['read'] * readers + ['write'] * writers]
+
+        totals = {'read': [0, 0, 0.0], 'write': [0, 0, 0.0]}
+        for role, process in workers:
+            output, _ = process.communicate()
+            if process.returncode:
+                raise SystemExit(f'{role} worker failed')
+            ok, locked, slowest = output.split()[-3:]
+            totals[role][0] += int(ok)
+            totals[role][1] += int(locked)
+            totals[role][2] = max(totals[role][2], float(slowest))
+    return {role: (ok / seconds, locked, slowest * 1000) for role, (ok, locked, slowest) in totals.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', choices=PROFILES, action='append', help='Only run these profiles')
+    parser.add_argument('--rows', type=int, default=2000, help='Brands to seed')
+    parser.add_argument('--readers', type=int, default=4, help='Reader processes')
+    parser.add_argument('--writers', type=int, default=2, help='Writer processes')
+    parser.add_argument('--seconds', type=float, default=10, help='How long the workers run')
+    parser.add_argument('--seed', nargs=3, metavar=('DATABASE', 'PROFILE', 'ROWS'), help=argparse.SUPPRESS)
+    parser.add_argument('--child', nargs=5, metavar=('DATABASE', 'PROFILE', 'ROLE', 'START', 'STOP'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        seed(args.seed[0], args.seed[1], int(args.seed[2]))
+        return
+    if args.child:
+        database_path, profile, role, start, stop = args.child
+        run_worker(database_path, profile, role, float(start), float(stop))
+        return
+
+    print(f'{args.readers} readers, {args.writers} writers, {args.seconds:g}s, {args.rows} brands')
+    print(f"{'profile':<8} {'reads/s':>8} {'writes/s':>9} {'slowest write ms':>17} {'locked reads':>13} "
+          f"{'locked writes':>14}")
+    for profile in args.profile or PROFILES:
+        results = run(profile, args.rows, args.readers, args.writers, args.seconds)
+        reads, locked_reads, _ = results['read']
+        writes, locked_writes, slowest_write = results['write']
+        print(f'{profile:<8} {reads:>8.1f} {writes:>9.1f} {slowest_write:>17.0f} {locked_reads:>13} '
+              f'{locked_writes:>14}')
+
+if __name__ == '__main__':
+    main()
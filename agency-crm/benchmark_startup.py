@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Measure how long a fresh process takes to import the app and run create_app().
+
+That is the cold start of every gunicorn master (and of every worker
+without preload), of `flask` commands and of the background workers.
+Each run is a new interpreter, so nothing is cached between runs except
+the .pyc files. Reports the import and create_app() times of the runs, then
+the modules that took longest to import in one more run under
+`python -X importtime`.
+
+    python benchmark_startup.py
+    python benchmark_startup.py --runs 20 --modules 25
+    python benchmark_startup.py --max-ms 600      # exit 1 when the median is slower
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+CHILD = '''
+import time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app()
+created = time.perf_counter()
+print(f'{imported - started:.6f} {created - imported:.6f}')
+'''
+
+def parse_importtime(stderr):
+    """[(cumulative ms, module)] of the imports two levels deep or less in -X importtime output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented two spaces per level under the module that imported them
+        if not name.startswith('    '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return modules
+
+def run_once(env, importtime=False):
+    """(import seconds, create_app seconds, -X importtime output) in a new interpreter"""
+    options = ['-X', 'importtime'] if importtime else []
+    process = subprocess.run([sys.executable, *options, '-c', CHILD], env=env,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    if process.returncode:
+        raise SystemExit(process.stderr)
+    import_time, create_time = map(float, process.stdout.split()[-2:])
+    return import_time, create_time, process.stderr
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Processes to start')
+    parser.add_argument('--modules', type=int, default=15, help='Slowest imports to list')
+    parser.add_argument('--max-ms', type=float, help='Fail when the median import + create_app() is slower')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A throwaway database and upload folder, so the run never touches instance/
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'startup.db')}",
+                   UPLOAD_FOLDER=os.path.join(tmp, 'uploads'))
+        run_once(env)  # writes the .pyc files
+        runs = [run_once(env) for _ in range(args.runs)]
+        # Separately, since -X importtime slows the imports down
+        imports = parse_importtime(run_once(env, importtime=True)[2])
+
+    print(f"{'':<14} {'min ms':>8} {'median ms':>10} {'max ms':>8}")
+    for label, values in (('import', [run[0] for run in runs]), ('create_app()', [run[1] for run in runs]),
+                          ('total', [run[0] + run[1] for run in runs])):
+        print(f'{label:<14} {min(values) * 1000:>8.0f} {statistics.median(values) * 1000:>10.0f} '
+              f'{max(values) * 1000:>8.0f}')
+
+    print(f'\nSlowest imports (cumulative ms, under -X importtime):')
+    for cumulative, name in sorted(imports, reverse=True)[:args.modules]:
+        print(f'{cumulative:>8.0f}  {name}')
+
+    median = statistics.median(run[0] + run[1] for run in runs) * 1000
+    if args.max_ms is not None and median > args.max_ms:
+        print(f'\nFAIL: median start-up {median:.0f} ms is over {args.max_ms:g} ms')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""Check how many SQL queries the company and brand pages run.
+
+Seeds a throwaway SQLite database twice, once with a few rows and once with
+many rows per collection (brands, team members, agreements, planning
+records with attachments, invoices, ...), renders every page of
+PAGE_BUDGETS as a logged-in user against each, and fails if a page runs
+more queries than its budget or more queries with more data, which means
+a template is lazy-loading per row.
+
+    python check_query_counts.py
+    python check_query_counts.py --rows 3 --rows 50
+    python check_query_counts.py --verbose    # print the statements of failing pages
+    python check_query_counts.py --database-url postgresql://localhost/agency_crm_check
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, date, timedelta
+
+# Most queries a page may run, including loading the logged-in user
+PAGE_BUDGETS = {
+    '/clients/company/1': 7,
+    '/clients/brand/1': 2,
+    '/clients/brand/1/section/subbrands': 4,
+    '/clients/brand/1/section/team': 4,
+    '/clients/brand/1/section/contacts': 4,
+    '/clients/brand/1/section/planning': 5,
+    '/clients/brand/1/section/meetings': 5,
+    '/clients/brand/1/section/links': 4,
+    '/clients/brand/1/section/commitments': 4,
+    '/clients/brand/1/section/status_updates': 4,
+    '/clients/brand/1/section/invoices': 5,
+}
+
+DEFAULT_SIZES = [3, 30]
+
+def create_test_app(tmp, database_url=None):
+    from config import Config, database_url as normalize_url, engine_options
+    from app import create_app
+
+    class CheckConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = normalize_url(database_url or f"sqlite:///{os.path.join(tmp, 'queries.db')}")
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+        WTF_CSRF_ENABLED = False
+        UPLOAD_FOLDER = os.path.join(tmp, 'uploads')
+        REFERENCE_DATA_STAMP = os.path.join(tmp, 'reference_data.version')
+
+    return create_app(CheckConfig)
+
+def seed(rows):
+    """Company 1 and brand 1 with `rows` entries in every collection their pages show"""
+    from app import db
+    from app.models import (User, MediaGroup, Company, Brand, Subbrand, BrandTeam, ClientContact, Agreement,
+                            Commitment, PlanningInfo, PlanningAttachment, KeyMeeting, MeetingAttachment,
+                            KeyLink, StatusUpdate, Invoice, InvoiceAttachment)
+
+    db.drop_all()
+    db.create_all()
+    user = User(email='check@example.com', first_name='Check', last_name='User', role='management')
+    user.set_password('check')
+    db.session.add(user)
+    company = Company(name='Company', vat_code='LT000000001')
+    db.session.add(company)
+    db.session.flush()
+    brand = Brand(name='Brand 1', company=company)
+    db.session.add(brand)
+
+    for i in range(rows):
+        member = User(email=f'member{i}@example.com', first_name='Member', last_name=str(i), role='account_manager')
+        member.set_password('check')
+        db.session.add(member)
+        db.session.add(Company(name=f'Subcompany {i}', parent_company_id=company.id))
+        other = Brand(name=f'Brand {i + 2}', company=company)
+        db.session.add(BrandTeam(brand=other, team_member=member))
+        db.session.add(BrandTeam(brand=brand, team_member=member, is_key_responsible=i == 0))
+        db.session.add(Subbrand(name=f'Subbrand {i}', brand=brand))
+        contact = ClientContact(first_name='Contact', last_name=str(i), email=f'contact{i}@example.com')
+        contact.brands.append(brand)
+        db.session.add(contact)
+        db.session.add(Agreement(company=company, type='service', filename=f'{i}.pdf', file_path=f'{i}.pdf',
+                                 valid_until=date.today(), uploaded_by=user))
+        db.session.add(Commitment(company=company, media_group=MediaGroup(name=f'Media {i}'), year=2026,
+                                  amount=1000))
+        day = date.today() - timedelta(days=i)
+
+        planning = PlanningInfo(brand=brand, comments=f'Planning {i}', created_by=member)
+        meeting = KeyMeeting(brand=brand, date=day, comment=f'Meeting {i}', created_by=member)
+        invoice = Invoice(brand=brand, company=company, invoice_date=day, total_amount=100, created_by=member)
+        for n in range(2):
+            planning.attachments.append(PlanningAttachment(filename=f'{i}-{n}.pdf', file_path=f'p{i}-{n}.pdf'))
+            meeting.attachments.append(MeetingAttachment(filename=f'{i}-{n}.pdf', file_path=f'm{i}-{n}.pdf'))
+            invoice.attachments.append(InvoiceAttachment(filename=f'{i}-{n}.pdf', file_path=f'i{i}-{n}.pdf'))
+        db.session.add_all([planning, meeting, invoice])
+        db.session.add(KeyLink(brand=brand, url=f'https://example.com/{i}', created_by=member))
+        db.session.add(StatusUpdate(brand=brand, date=day, comment=f'Update {i}', evaluation='perfect',
+                                    created_by=member, created_at=datetime.utcnow()))
+    db.session.commit()
+
+def measure(rows, database_url=None):
+    """{url: (status, QueryLog)} for every page, with `rows` rows seeded"""
+    from app import db
+    from app.query_log import count_queries
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_test_app(tmp, database_url)
+        with app.app_context():
+            seed(rows)
+            engine = db.engine
+
+        # Requests run outside that app context so each gets a fresh session, as in production
+        client = app.test_client()
+        client.post('/auth/login', data={'email': 'check@example.com', 'password': 'check'})
+        results = {}
+        for url in PAGE_BUDGETS:
+            # The first request fills per-process caches such as the reference data
+            client.get(url)
+            with count_queries(engine) as log:
+                response = client.get(url)
+            results[url] = (response.status_code, log)
+        engine.dispose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, action='append', help='Rows per collection (repeatable)')
+    parser.add_argument('--verbose', action='store_true', help='Print the statements of failing pages')
+    parser.add_argument('--database-url', help='Empty database to use instead of a throwaway SQLite file '
+                                               '(its tables are dropped and recreated)')
+    args = parser.parse_args()
+
+    sizes = args.rows or DEFAULT_SIZES
+    runs = {rows: measure(rows, args.database_url) for rows in sizes}
+
+    failed = False
+    print(f"{'page':<42} {'budget':>6} " + ' '.join(f'{f"{rows} rows":>9}' for rows in sizes))
+    for url, budget in PAGE_BUDGETS.items():
+        counts = [runs[rows][url][1].count for rows in sizes]
+        statuses = [runs[rows][url][0] for rows in sizes]
+        problems = []
+        if any(status != 200 for status in statuses):
+            problems.append(f'status {statuses}')
+        if max(counts) > budget:
+            problems.append('over budget')
+        if len(set(counts)) > 1:
+            problems.append('grows with data')
+        print(f"{url:<42} {budget:>6} " + ' '.join(f'{count:>9}' for count in counts)
+              + (f"  FAIL: {', '.join(problems)}" if problems else ''))
+        if problems:
+            failed = True
+            if args.verbose:
+                for statement in runs[sizes[-1]][url][1].statements:
+                    print(f"    {' '.join(statement.split())[:160]}")
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""Check that the busiest pages find their rows through indexes.
+
+Seeds a throwaway SQLite database (see check_query_counts.py), requests
+every page of HOT_PAGES, and runs EXPLAIN QUERY PLAN on each SELECT the
+page sent. A page fails if a plan reads a whole table other than the ones
+the page lists on purpose, such as the dashboard going through all active
+brands. A new query filtering on a column without an index shows up here
+as a full scan.
+
+    python check_query_plans.py
+    python check_query_plans.py --verbose    # print every plan
+"""
+import argparse
+import re
+import sys
+import tempfile
+from datetime import date
+
+from check_query_counts import create_test_app, seed
+
+API_KEY = 'query-plan-check'
+
+# Page -> tables it may read in full because it lists all of their rows
+HOT_PAGES = {
+    '/': {'brands'},
+    '/clients/tasks': {'brand_tasks'},
+    '/clients/birthdays': set(),
+    '/clients/brand/1/tasks': set(),
+    '/clients/company/1': set(),
+    '/clients/brand/1': set(),
+    '/clients/brand/1/section/subbrands': set(),
+    '/clients/brand/1/section/team': set(),
+    '/clients/brand/1/section/contacts': set(),
+    '/clients/brand/1/section/planning': set(),
+    '/clients/brand/1/section/meetings': set(),
+    '/clients/brand/1/section/invoices': set(),
+    '/api/contacts': {'client_contacts'},
+    '/api/companies/1': set(),
+    '/api/brands/1': set(),
+    '/api/invoices?brand_id=1': set(),
+    '/api/invoices?company_id=1': set(),
+}
+
+SCAN = re.compile(r'^SCAN (\w+)')
+
+def seed_extra():
+    """Tasks, gifts and an API key on top of the rows seed() creates"""
+    from app import db
+    from app.api_auth import hash_api_key
+    from app.models import User, Brand, ClientContact, TaskTemplate, BrandTask, TaskCompletion, Gift, APIKey
+
+    user = User.query.filter_by(email='check@example.com').one()
+    db.session.add(APIKey(name='check', key_hash=hash_api_key(API_KEY), user_id=user.id))
+    template = TaskTemplate(name='Monthly report')
+    for brand in Brand.query:
+        task = BrandTask(brand=brand, task_template=template, frequency='monthly', start_date=date.today(),
+                         created_by=user)
+        db.session.add(TaskCompletion(brand_task=task, completion_date=date.today(), completed_by=user))
+    for contact in ClientContact.query:
+        contact.birthday_month = date.today().month
+        contact.birthday_day = 1
+        contact.should_get_gift = True
+        db.session.add(Gift(contact=contact, year=date.today().year, gift_description='Wine', created_by_id=user.id))
+    db.session.commit()
+
+def full_scans(connection, statement, parameters):
+    """Tables a statement reads in full, and its plan"""
+    cursor = connection.cursor()
+    plan = [row[3] for row in cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+    cursor.close()
+    tables = set()
+    for line in plan:
+        match = SCAN.match(line)
+        # Aliases such as users_1 stand for their table; subqueries have their own entry
+        if match and not match.group(1).startswith('anon_'):
+            tables.add(re.sub(r'_\d+$', '', match.group(1)))
+    return tables, plan
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5, help='Rows per collection')
+    parser.add_argument('--verbose', action='store_true', help='Print the plan of every query')
+    args = parser.parse_args()
+
+    from app import db
+    from app.query_log import count_queries
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_test_app(tmp)
+        with app.app_context():
+            seed(args.rows)
+            seed_extra()
+            engine = db.engine
+
+        client = app.test_client()
+        client.post('/auth/login', data={'email': 'check@example.com', 'password': 'check'})
+        connection = engine.raw_connection()
+        for url, allowed in HOT_PAGES.items():
+            client.get(url, headers={'X-API-Key': API_KEY})
+            with count_queries(engine) as log:
+                client.get(url, headers={'X-API-Key': API_KEY})
+
+            problems = []
+            for statement, parameters in log.queries:
+                if not statement.lstrip().upper().startswith('SELECT'):
+                    continue
+                tables, plan = full_scans(connection, statement, parameters)
+                scanned = tables - allowed
+                if scanned:
+                    problems.append((sorted(scanned), statement, plan))
+                elif args.verbose:
+                    print(f"    {' '.join(statement.split())[:120]}\n      " + '\n      '.join(plan))
+
+            print(f"{url:<42} {log.count:>3} queries" + (f"  FAIL: full scan of "
+                  f"{', '.join(sorted({t for tables, _, _ in problems for t in tables}))}" if problems else ''))
+            for tables, statement, plan in problems:
+                failed = True
+                print(f"    {' '.join(statement.split())[:160]}\n      " + '\n      '.join(plan))
+        connection.close()
+        engine.dispose()
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -4,14 +4,98 @@ from dotenv import load_dotenv
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+def database_url(url):
+    # postgres:// (as hosting providers write it) and postgresql:// both go through psycopg 3
+    for scheme in ('postgres://', 'postgresql://'):
+        if url.startswith(scheme):
+            return 'postgresql+psycopg://' + url[len(scheme):]
+    return url
+
+def engine_options(url):
+    """Connection pool settings for database servers; SQLite is set up in app/sqlite_tuning.py"""
+    if url.startswith('sqlite'):
+        return {}
+    return {
+        # Per process: keep workers x (pool size + overflow) below the server's max_connections
+        'pool_size': int(os.environ.get('DATABASE_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DATABASE_MAX_OVERFLOW', 5)),
+        'pool_timeout': int(os.environ.get('DATABASE_POOL_TIMEOUT', 30)),
+        # Replace connections before a proxy or the server drops them as idle
+        'pool_recycle': int(os.environ.get('DATABASE_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': True,
+    }
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-please-change'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
-        'sqlite:///' + os.path.join(basedir, 'instance', 'agency_crm.db')
+    SQLALCHEMY_DATABASE_URI = database_url(os.environ.get('DATABASE_URL') or
+                                           'sqlite:///' + os.path.join(basedir, 'instance', 'agency_crm.db'))
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Read replica for the dashboard, exports and API GETs (app/db_routing.py); unset reads from the primary
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': {'url': database_url(DATABASE_REPLICA_URL), **engine_options(DATABASE_REPLICA_URL)}} \
+        if DATABASE_REPLICA_URL else {}
+    # How long a browser session that wrote something keeps reading from the primary
+    READ_REPLICA_STICKY_SECONDS = int(os.environ.get('READ_REPLICA_STICKY_SECONDS', 10))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # SQLite connection settings (app/sqlite_tuning.py): 'tuned' (WAL, busy timeout, foreign keys)
+    # or 'default' (SQLite's own, as before)
+    SQLITE_PROFILE = os.environ.get('SQLITE_PROFILE', 'tuned')
+    SQLITE_CACHE_SIZE_MB = int(os.environ.get('SQLITE_CACHE_SIZE_MB', 64))  # per connection
+    SQLITE_MMAP_SIZE_MB = int(os.environ.get('SQLITE_MMAP_SIZE_MB', 256))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    # Per-request SQL statistics (app/sql_stats.py): Server-Timing header, a warning when a request runs
+    # one statement more than SQL_REPEAT_WARNING times, and the statement panel ('true', 'false' or
+    # 'debug': only in debug mode)
+    SQL_STATS = os.environ.get('SQL_STATS', 'true').lower() == 'true'
+    SQL_SERVER_TIMING = os.environ.get('SQL_SERVER_TIMING', 'true').lower() == 'true'
+    SQL_REPEAT_WARNING = int(os.environ.get('SQL_REPEAT_WARNING', 10))
+    SQL_DEBUG_PANEL = os.environ.get('SQL_DEBUG_PANEL', 'debug')
+    # Prometheus metrics at /metrics (app/metrics.py): scrapers must send "Authorization: Bearer <METRICS_TOKEN>".
+    # Without a token the endpoint refuses every request, unless METRICS_PUBLIC opts out of authentication.
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false').lower() == 'true'
     UPLOAD_FOLDER = os.path.join(basedir, os.environ.get('UPLOAD_FOLDER', 'app/static/uploads'))
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
     ALLOWED_EXTENSIONS = {'pdf', 'doc', 'docx', 'ppt', 'pptx', 'xls', 'xlsx', 'png', 'jpg', 'jpeg', 'gif'}
+    BLOB_GC_GRACE_HOURS = int(os.environ.get('BLOB_GC_GRACE_HOURS', 24))
+    # Where uploads and export files live: 'local' (UPLOAD_FOLDER) or 's3' (any S3-compatible store, e.g. MinIO)
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_PREFIX = os.environ.get('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    S3_URL_EXPIRES_SECONDS = int(os.environ.get('S3_URL_EXPIRES_SECONDS', 300))
+    # Let the web server send local files: 'x-sendfile' (Apache, lighttpd) or 'x-accel-redirect' (nginx)
+    SENDFILE_MODE = os.environ.get('SENDFILE_MODE')
+    X_ACCEL_REDIRECT_PREFIX = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '/protected-uploads/')
+    # Upload checks: refuse files whose content does not match the extension, and the virus scanner
+    # to use: None, 'signature' (EICAR test file only, for development) or 'clamd'
+    UPLOAD_REJECT_MISMATCHED_TYPES = os.environ.get('UPLOAD_REJECT_MISMATCHED_TYPES', 'true').lower() == 'true'
+    UPLOAD_SCANNER = os.environ.get('UPLOAD_SCANNER')
+    CLAMD_ADDRESS = os.environ.get('CLAMD_ADDRESS', 'unix:/var/run/clamav/clamd.ctl')  # or host:port
+    CLAMD_TIMEOUT_SECONDS = int(os.environ.get('CLAMD_TIMEOUT_SECONDS', 30))
+    # Chunked uploads: parts must stay below MAX_CONTENT_LENGTH; staging defaults to UPLOAD_FOLDER/.chunks
+    CHUNKED_UPLOAD_CHUNK_SIZE = int(os.environ.get('CHUNKED_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024))
+    CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024))
+    CHUNKED_UPLOAD_EXPIRE_HOURS = int(os.environ.get('CHUNKED_UPLOAD_EXPIRE_HOURS', 24))
+    CHUNKED_UPLOAD_FOLDER = os.environ.get('CHUNKED_UPLOAD_FOLDER')
+    # Attachment previews: longest side in pixels, and poppler's pdftoppm for the first page of PDFs
+    PREVIEW_SIZE = int(os.environ.get('PREVIEW_SIZE', 320))
+    PDFTOPPM_PATH = os.environ.get('PDFTOPPM_PATH', 'pdftoppm')
+    PREVIEW_TIMEOUT_SECONDS = int(os.environ.get('PREVIEW_TIMEOUT_SECONDS', 30))
+    # Attachment text search: poppler's pdftotext for PDFs, and how much text to index per file
+    PDFTOTEXT_PATH = os.environ.get('PDFTOTEXT_PATH', 'pdftotext')
+    TEXT_EXTRACT_TIMEOUT_SECONDS = int(os.environ.get('TEXT_EXTRACT_TIMEOUT_SECONDS', 60))
+    TEXT_INDEX_MAX_CHARS = int(os.environ.get('TEXT_INDEX_MAX_CHARS', 1000000))
+    EXPORT_JOB_TTL_HOURS = int(os.environ.get('EXPORT_JOB_TTL_HOURS', 24))
+    EXPORT_JOB_REUSE_SECONDS = int(os.environ.get('EXPORT_JOB_REUSE_SECONDS', 300))
+    # A running export job that has not finished a batch of rows for this long is marked failed
+    EXPORT_JOB_TIMEOUT_MINUTES = int(os.environ.get('EXPORT_JOB_TIMEOUT_MINUTES', 15))
+    EXPORT_WORKER_POLL_SECONDS = float(os.environ.get('EXPORT_WORKER_POLL_SECONDS', 2))
+    REFERENCE_DATA_STAMP = os.environ.get('REFERENCE_DATA_STAMP') or \
+        os.path.join(basedir, 'instance', 'reference_data.version')
     
     @staticmethod
     def init_app(app):
@@ -0,0 +1,65 @@
+"""gunicorn settings for production: `gunicorn -c gunicorn.conf.py`.
+
+The app is imported once, in the master (preload_app), and the workers are
+forked from it. A worker then starts in milliseconds instead of importing
+everything again, and the imported code is shared between workers rather
+than loaded into each. The schema is not touched at start-up; run
+`flask --app run.py db upgrade` as a separate deploy step.
+
+Reloading:
+- `kill -HUP <master>` starts new workers and lets the old ones finish
+  their requests for up to graceful_timeout. With preload_app the new
+  workers are forked from the same master, so this picks up configuration
+  changes but not new code.
+- After deploying new code, `kill -USR2 <master>` starts a new master with
+  it next to the old one; once it serves, `kill -TERM <old master>` stops
+  the old one gracefully. Restarting the service works too but drops
+  connections for the few hundred milliseconds the new master takes to load
+  (`python benchmark_startup.py` measures it).
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# Where the workers keep their metrics for /metrics to add up (app/metrics.py). Set before the app is
+# imported, as prometheus_client reads it when the metrics are created. Background workers started with
+# the same directory are reported too.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'agency-crm-metrics'))
+
+wsgi_app = 'run:app'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:' + os.environ.get('PORT', '5000'))
+# WEB_CONCURRENCY is what most hosting platforms set; gunicorn recommends 2 x CPUs + 1 otherwise.
+# With PostgreSQL, each worker keeps its own connection pool (see DATABASE_POOL_SIZE in config.py).
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+# Synchronous exports stream for a while; the background export worker handles the large ones
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+accesslog = '-'
+# Worker heartbeats on a tmpfs, as container filesystems can stall them
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+
+def post_fork(server, worker):
+    # A connection opened in the master must not be shared by the forked workers; each opens its own
+    from app import db
+    from run import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def on_starting(server):
+    # Values left by an earlier run would be added to this one's
+    directory = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, '*.db')):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
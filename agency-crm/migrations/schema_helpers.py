@@ -0,0 +1,60 @@
+"""Steps shared by the revisions that bring older databases up to date.
+
+Databases created before migrations were built with db.create_all() and a
+series of one-off update scripts, so depending on which scripts ran a
+table may lack columns, indexes or data that newer databases have. These
+helpers look at the live schema first, so a revision does nothing where
+there is nothing to do and can run on any of those databases. Backfills
+work through a table BATCH_SIZE ids at a time and commit each batch, so a
+large table is never locked for the whole upgrade and an interrupted
+upgrade resumes where it stopped.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+BATCH_SIZE = 5000
+
+def inspector():
+    return sa.inspect(op.get_bind())
+
+def has_table(table):
+    return inspector().has_table(table)
+
+def column_names(table):
+    return {column['name'] for column in inspector().get_columns(table)}
+
+def index_names(table):
+    return {index['name'] for index in inspector().get_indexes(table)}
+
+def add_missing_columns(table, *columns):
+    """Add the columns `table` lacks, all in one batch (a single rebuild where SQLite needs one)"""
+    if not has_table(table):
+        return
+    missing = [column for column in columns if column.name not in column_names(table)]
+    if missing:
+        with op.batch_alter_table(table) as batch_op:
+            for column in missing:
+                batch_op.add_column(column)
+
+def create_missing_indexes(table, indexes):
+    """Create the (name, columns, options) indexes `table` lacks"""
+    if not has_table(table):
+        return
+    existing = index_names(table)
+    for name, columns, options in indexes:
+        if name not in existing:
+            op.create_index(name, table, columns, **options)
+
+def backfill(table, step, batch_size=BATCH_SIZE):
+    """Call step(connection, low, high) for consecutive id ranges [low, high) of `table`
+
+    Runs outside the revision's transaction: every statement the step executes commits on its own,
+    so a step should make each batch's change with a single statement.
+    """
+    connection = op.get_bind()
+    low, high = connection.execute(sa.text(f'SELECT MIN(id), MAX(id) FROM {table}')).one()
+    if low is None:
+        return
+    with op.get_context().autocommit_block():
+        for start in range(low, high + 1, batch_size):
+            step(connection, start, start + batch_size)
@@ -0,0 +1,56 @@
+"""Add the columns the old update scripts added
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 18:05:12.408113
+
+Replaces update_database.py, update_database_v2.py, update_birthday_fields.py,
+update_company_agreement.py, update_company_subcompanies.py,
+update_planning_info.py and the column part of create_blob_store.py. Tables
+created by 0001 already have every column, so this only changes databases
+that predate migrations.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from schema_helpers import add_missing_columns
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Foreign keys are named because batch mode adds them as separate constraints
+    add_missing_columns('client_contacts',
+                        sa.Column('responsibility_description', sa.Text(), nullable=True),
+                        sa.Column('birthday_month', sa.Integer(), nullable=True),
+                        sa.Column('birthday_day', sa.Integer(), nullable=True))
+    add_missing_columns('companies',
+                        sa.Column('agency_fees', sa.Text(), nullable=True),
+                        sa.Column('registration_number', sa.String(length=100), nullable=True),
+                        sa.Column('parent_company_id', sa.Integer(),
+                                  sa.ForeignKey('companies.id', name='fk_companies_parent_company_id'), nullable=True))
+    add_missing_columns('agreements', sa.Column('valid_until', sa.Date(), nullable=True))
+    # Nullable until 0003 has filled in the rows written before the columns existed
+    add_missing_columns('planning_info',
+                        sa.Column('created_at', sa.DateTime(), nullable=True),
+                        sa.Column('created_by_id', sa.Integer(),
+                                  sa.ForeignKey('users.id', name='fk_planning_info_created_by_id'), nullable=True))
+    for table in ('agreements', 'planning_attachments', 'meeting_attachments', 'invoice_attachments'):
+        add_missing_columns(table, sa.Column('blob_sha256', sa.String(length=64),
+                                             sa.ForeignKey('blobs.sha256', name=f'fk_{table}_blob_sha256'), nullable=True))
+    add_missing_columns('blobs',
+                        sa.Column('preview_status', sa.String(length=20), nullable=True),
+                        sa.Column('text_status', sa.String(length=20), nullable=True),
+                        sa.Column('detected_type', sa.String(length=100), nullable=True),
+                        sa.Column('scan_status', sa.String(length=20), nullable=True),
+                        sa.Column('scanner', sa.String(length=50), nullable=True),
+                        sa.Column('scanned_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    # Nothing to undo: the columns are part of the schema 0001 creates
+    pass
@@ -0,0 +1,77 @@
+"""Fill in the data the old update scripts filled in
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 18:21:40.772950
+
+Replaces the data steps of update_birthday_fields.py, update_planning_info.py,
+create_invoice_attachments.py and create_recurring_tasks.py. Every step only
+touches rows that still need it, in batches of schema_helpers.BATCH_SIZE.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from schema_helpers import backfill
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+DEFAULT_TASK_TEMPLATES = [
+    ('Client day meeting', 'Regular client day meeting'),
+    ('Invoices', 'Send invoices to client'),
+    ('Results presentation meeting', 'Present campaign/project results'),
+    ('Monitoring', 'Regular monitoring activities'),
+    ('Media landscape', 'Media landscape analysis and presentation'),
+    ('Media news presentation', 'Present latest media news and updates'),
+    ('Media strategy presentation', 'Present media strategy'),
+]
+
+
+def birthday_part(part):
+    """SQL for the month or day of client_contacts.birthday"""
+    if op.get_bind().dialect.name == 'sqlite':
+        return f"CAST(strftime('{'%m' if part == 'month' else '%d'}', birthday) AS INTEGER)"
+    return f'CAST(EXTRACT({part.upper()} FROM birthday) AS INTEGER)'
+
+
+def upgrade():
+    # The birthday list looks contacts up by month and day, which contacts from before those columns lack
+    month, day = birthday_part('month'), birthday_part('day')
+    backfill('client_contacts', lambda connection, low, high: connection.execute(sa.text(
+        f'UPDATE client_contacts SET birthday_month = {month}, birthday_day = {day} '
+        'WHERE birthday IS NOT NULL AND birthday_month IS NULL AND id >= :low AND id < :high'
+    ), {'low': low, 'high': high}))
+
+    # Planning records from before created_at and created_by_id are attributed to the first user
+    now = datetime.utcnow()
+    backfill('planning_info', lambda connection, low, high: connection.execute(sa.text(
+        'UPDATE planning_info SET created_at = COALESCE(created_at, :now), '
+        'created_by_id = COALESCE(created_by_id, (SELECT MIN(id) FROM users)) '
+        'WHERE (created_at IS NULL OR created_by_id IS NULL) AND id >= :low AND id < :high'
+    ), {'now': now, 'low': low, 'high': high}))
+
+    # Invoices from before multiple files kept their file on the invoice itself
+    backfill('invoices', lambda connection, low, high: connection.execute(sa.text(
+        'INSERT INTO invoice_attachments (invoice_id, filename, file_path, created_at) '
+        "SELECT id, COALESCE(filename, 'Invoice File'), file_path, created_at FROM invoices "
+        'WHERE file_path IS NOT NULL AND id >= :low AND id < :high AND NOT EXISTS '
+        '(SELECT 1 FROM invoice_attachments WHERE invoice_attachments.invoice_id = invoices.id)'
+    ), {'low': low, 'high': high}))
+
+    task_templates = sa.table('task_templates', sa.column('name', sa.String), sa.column('description', sa.Text),
+                              sa.column('is_default', sa.Boolean), sa.column('created_at', sa.DateTime))
+    existing = set(op.get_bind().execute(sa.select(task_templates.c.name)).scalars())
+    op.bulk_insert(task_templates, [
+        {'name': name, 'description': description, 'is_default': True, 'created_at': now}
+        for name, description in DEFAULT_TASK_TEMPLATES if name not in existing
+    ])
+
+
+def downgrade():
+    # The filled-in values are indistinguishable from ones entered in the app, so they are kept
+    pass
@@ -0,0 +1,85 @@
+"""Rebuild the tables the old scripts created by hand
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 18:34:03.115482
+
+Replaces fix_planning_info_constraint.py. Early databases had a unique
+brand_id on planning_info, from when a brand had a single planning record
+instead of a history. Databases that got created_by_id from
+update_planning_info.py also have it nullable; 0003 has filled it in, so it
+becomes NOT NULL like in newer databases. create_invoice_attachments.py
+wrote its own CREATE TABLE for SQLite, which differs from the model in
+column types and its foreign key, so that table is rebuilt too.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from schema_helpers import has_table, inspector
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+# The tables as app.models declares them; SQLite rebuilds them from these instead of the reflected
+# tables, whose unnamed constraints could not be dropped by name
+PLANNING_INFO = sa.Table(
+    'planning_info', sa.MetaData(),
+    sa.Column('id', sa.Integer(), primary_key=True),
+    sa.Column('brand_id', sa.Integer(), sa.ForeignKey('brands.id'), nullable=False),
+    sa.Column('comments', sa.Text(), nullable=True),
+    sa.Column('kpis', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('created_by_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+    sa.Index('ix_planning_info_brand_created', 'brand_id', 'created_at'),
+)
+
+INVOICE_ATTACHMENTS = sa.Table(
+    'invoice_attachments', sa.MetaData(),
+    sa.Column('id', sa.Integer(), primary_key=True),
+    sa.Column('invoice_id', sa.Integer(), sa.ForeignKey('invoices.id'), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('blob_sha256', sa.String(length=64), sa.ForeignKey('blobs.sha256'), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Index('ix_invoice_attachments_blob_sha256', 'blob_sha256'),
+    sa.Index('ix_invoice_attachments_invoice_id', 'invoice_id'),
+)
+
+
+def upgrade():
+    allow_planning_history()
+    if op.get_bind().dialect.name == 'sqlite' and has_table('invoice_attachments'):
+        # Recognised by the script's ON DELETE CASCADE
+        if any(fk['options'].get('ondelete') for fk in inspector().get_foreign_keys('invoice_attachments')):
+            with op.batch_alter_table('invoice_attachments', copy_from=INVOICE_ATTACHMENTS, recreate='always'):
+                pass
+
+
+def allow_planning_history():
+    if not has_table('planning_info'):
+        return
+    for index in inspector().get_indexes('planning_info'):
+        # PostgreSQL also lists a unique constraint's own index, which goes with the constraint below
+        if index['unique'] and index['column_names'] == ['brand_id'] and not index.get('duplicates_constraint'):
+            op.drop_index(index['name'], table_name='planning_info')
+    constraints = [constraint for constraint in inspector().get_unique_constraints('planning_info')
+                   if constraint['column_names'] == ['brand_id']]
+    nullable = any(column['name'] == 'created_by_id' and column['nullable']
+                   for column in inspector().get_columns('planning_info'))
+    if op.get_bind().dialect.name == 'sqlite':
+        if constraints or nullable:
+            with op.batch_alter_table('planning_info', copy_from=PLANNING_INFO, recreate='always'):
+                pass
+        return
+    for constraint in constraints:
+        op.drop_constraint(constraint['name'], 'planning_info', type_='unique')
+    if nullable:
+        op.alter_column('planning_info', 'created_by_id', existing_type=sa.Integer(), nullable=False)
+
+
+def downgrade():
+    # A brand with several planning records would break the old constraint, so it is not restored
+    pass
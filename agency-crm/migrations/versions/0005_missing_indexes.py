@@ -0,0 +1,83 @@
+"""Create the indexes older databases lack
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 18:47:26.590317
+
+Replaces create_indexes.py and the index steps of create_blob_store.py.
+Tables created by 0001 already have these indexes; tables created with
+db.create_all() before an index was declared in app/models.py get it here.
+"""
+from alembic import op
+
+from schema_helpers import create_missing_indexes
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'blobs': [
+        ('ix_blobs_preview_status', ['preview_status'], {}),
+        ('ix_blobs_text_status', ['text_status'], {}),
+        ('ix_blobs_unreferenced_at', ['unreferenced_at'], {}),
+    ],
+    'client_contacts': [('ix_client_contacts_birthday', ['birthday_month', 'birthday_day'], {})],
+    'companies': [('ix_companies_parent_company_id', ['parent_company_id'], {})],
+    'agreements': [
+        ('ix_agreements_blob_sha256', ['blob_sha256'], {}),
+        ('ix_agreements_company_type', ['company_id', 'type'], {}),
+    ],
+    'brands': [('ix_brands_company_id', ['company_id'], {})],
+    'chunked_uploads': [('ix_chunked_uploads_status', ['status'], {})],
+    'commitments': [('ix_commitments_company_year', ['company_id', 'year'], {})],
+    'export_jobs': [
+        ('ix_export_jobs_params_hash', ['params_hash'], {}),
+        ('ix_export_jobs_status', ['status'], {}),
+    ],
+    'brand_contacts': [('ix_brand_contacts_contact_id', ['contact_id'], {})],
+    'invoices': [
+        ('ix_invoices_brand_invoice_date', ['brand_id', 'invoice_date'], {}),
+        ('ix_invoices_company_invoice_date', ['company_id', 'invoice_date'], {}),
+    ],
+    'key_links': [('ix_key_links_brand_created', ['brand_id', 'created_at'], {})],
+    'key_meetings': [('ix_key_meetings_brand_date', ['brand_id', 'date'], {})],
+    'planning_info': [('ix_planning_info_brand_created', ['brand_id', 'created_at'], {})],
+    'status_updates': [('ix_status_updates_brand_date', ['brand_id', 'date'], {})],
+    'subbrands': [('ix_subbrands_brand_name', ['brand_id', 'name'], {})],
+    'invoice_attachments': [
+        ('ix_invoice_attachments_blob_sha256', ['blob_sha256'], {}),
+        ('ix_invoice_attachments_invoice_id', ['invoice_id'], {}),
+    ],
+    'meeting_attachments': [
+        ('ix_meeting_attachments_blob_sha256', ['blob_sha256'], {}),
+        ('ix_meeting_attachments_meeting_id', ['meeting_id'], {}),
+    ],
+    'planning_attachments': [
+        ('ix_planning_attachments_blob_sha256', ['blob_sha256'], {}),
+        ('ix_planning_attachments_planning_info_id', ['planning_info_id'], {}),
+    ],
+    'task_completions': [('ix_task_completions_task_date', ['brand_task_id', 'completion_date'], {})],
+}
+
+# GIN indexes of app.models.gin_index, PostgreSQL only
+GIN_INDEXES = {
+    table: [(f'ix_{table}_{column}', [column], {'postgresql_using': 'gin',
+                                                 'postgresql_ops': {column: 'jsonb_path_ops'}})]
+    for table, column in [('api_keys', 'permissions'), ('webhooks', 'events'), ('webhook_logs', 'payload')]
+}
+
+
+def upgrade():
+    for table, indexes in INDEXES.items():
+        create_missing_indexes(table, indexes)
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, indexes in GIN_INDEXES.items():
+            create_missing_indexes(table, indexes)
+
+
+def downgrade():
+    # The indexes are part of the schema 0001 creates
+    pass
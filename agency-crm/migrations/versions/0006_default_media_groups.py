@@ -0,0 +1,34 @@
+"""Add the default media groups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 19:32:10.561208
+
+run.py used to add them on every start while the table was empty.
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+DEFAULT_MEDIA_GROUPS = ['TV3 Group', 'M-1 Group', 'LRT', 'Radio Center', 'Clear Channel']
+
+
+def upgrade():
+    media_groups = sa.table('media_groups', sa.column('name', sa.String), sa.column('created_at', sa.DateTime))
+    # As before, only into an empty table: groups renamed or deleted in the app stay that way
+    if op.get_bind().execute(sa.select(sa.func.count()).select_from(media_groups)).scalar():
+        return
+    now = datetime.utcnow()
+    op.bulk_insert(media_groups, [{'name': name, 'created_at': now} for name in DEFAULT_MEDIA_GROUPS])
+
+
+def downgrade():
+    # Media groups are referenced by commitments, so the defaults are kept
+    pass
@@ -0,0 +1,27 @@
+"""Record when an export job last made progress
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 20:14:37.302518
+
+The export worker updates heartbeat_at after every batch of rows, and a
+running job is only treated as abandoned once it has stopped doing so.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('export_jobs', schema=None) as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Move uploads from before the blob store into it.
+
+Every upload a row still points at directly is hashed into the blob store,
+the row is pointed at its blob, and the old flat file is deleted once no
+row refers to it. Identical files stored several times end up as one blob.
+The blob store's tables and columns come from `flask --app run.py db upgrade`,
+which has to run first.
+"""
+import os
+import sys
+from app import create_app, db
+from app.models import Invoice
+from app.storage import store_stream, guess_content_type, REFERENCING_MODELS
+from app.upload_pipeline import UploadRejected
+
+app = create_app()
+app.app_context().push()
+
+def move_files():
+    upload_folder = app.config['UPLOAD_FOLDER']
+    moved = {}
+    missing = 0
+    rejected = 0
+    
+    for model in REFERENCING_MODELS:
+        for row in model.query.filter(model.blob_sha256.is_(None)).all():
+            old_path = row.file_path
+            if old_path not in moved:
+                full_path = os.path.join(upload_folder, old_path)
+                if not os.path.exists(full_path):
+                    missing += 1
+                    continue
+                try:
+                    with open(full_path, 'rb') as stream:
+                        moved[old_path] = store_stream(stream, guess_content_type(row.filename), row.filename)
+                except UploadRejected as e:
+                    print(f"Skipping {old_path}: {e}")
+                    rejected += 1
+                    continue
+            
+            blob = moved[old_path]
+            row.file_path = blob.path
+            row.blob_sha256 = blob.sha256
+        db.session.commit()
+    
+    # Invoices keep their first file in file_path for backward compatibility
+    for invoice in Invoice.query.filter(Invoice.file_path.in_(list(moved))).all():
+        invoice.file_path = moved[invoice.file_path].path
+    db.session.commit()
+    
+    for old_path in moved:
+        os.remove(os.path.join(upload_folder, old_path))
+    
+    blob_count = len({blob.sha256 for blob in moved.values()})
+    print(f"✓ Moved {len(moved)} files into {blob_count} blobs ({missing} rows point at missing files, "
+          f"{rejected} failed the upload checks and were left in place)")
+
+if __name__ == '__main__':
+    try:
+        move_files()
+        print("\n✅ Blob store ready!")
+    except Exception as e:
+        db.session.rollback()
+        print(f"\n❌ Error during migration: {str(e)}")
+        sys.exit(1)
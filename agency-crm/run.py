@@ -1,5 +1,8 @@
 #!/usr/bin/env python
-import os
+"""Entry point of the app: `run:app` for gunicorn (see gunicorn.conf.py), `python run.py` for development.
+
+The schema is not created here; run `flask --app run.py db upgrade` before starting.
+"""
 from app import create_app, db
 from app.models import User, Company, Brand, ClientContact, MediaGroup
 
@@ -11,16 +14,4 @@ def make_shell_context():
             'ClientContact': ClientContact, 'MediaGroup': MediaGroup}
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()
-        
-        # Create default media groups if they don't exist
-        if MediaGroup.query.count() == 0:
-            default_groups = ['TV3 Group', 'M-1 Group', 'LRT', 'Radio Center', 'Clear Channel']
-            for group_name in default_groups:
-                mg = MediaGroup(name=group_name)
-                db.session.add(mg)
-            db.session.commit()
-            print("Default media groups created.")
-    
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)